@@ -0,0 +1,1065 @@
+"""Benchmark suite for the recorder, player, key translator and storage layers.
+
+Runs headless on any OS: capture, injection and window access use fake
+backends. Usage:
+
+    python benchmark.py                      # every benchmark, human readable
+    python benchmark.py --quick database     # smaller sizes, one benchmark
+    python benchmark.py --json results.json  # also write results for later comparison
+    python benchmark.py --compare old.json   # show the change against an earlier run
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from bisect import bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from input_backends import PollingCaptureBackend, ReplayCaptureBackend, HookCaptureBackend, RecordingInjectionBackend
+from playback_stats import PlaybackStats
+from compiled_macro import CompiledMacro, MOUSE_MOVE
+from key_translator import KeyTranslator
+from macro_codec import encode_macro, decode_macro
+from database_manager import DatabaseManager
+from path_simplify import PathSimplifier, decimate_events
+from macro_optimizer import MacroOptimizer
+from timing_humanizer import TimingHumanizer, fit_profile
+from playback_engine import PlaybackEngine
+from window_targeting import FakeWindowBackend, WindowTargeter, WindowTitleCache
+from hotkey_registry import HotkeyRegistry, HotkeyLauncher
+from update_checker import UpdateChecker, RateLimited
+from update_download import Download, ChecksumMismatch, fetch_update
+from binary_delta import make_delta
+from update_apply import apply_package, wait_for_exit
+
+KEY_NAMES = [chr(ord('A') + i) for i in range(26)]
+
+
+def synthetic_key_events(rate, seconds, vk_code=0x41):
+    """Build alternating down/up events at `rate` key presses per second."""
+    events = []
+    period = 1.0 / rate
+    for i in range(int(rate * seconds)):
+        offset = i * period
+        events.append((vk_code, True, offset))
+        events.append((vk_code, False, offset + period / 2))
+    return events
+
+
+def measure_capture_cpu(backend, seconds):
+    """Return (cpu seconds per wall second, events delivered) while capturing."""
+    received = [0]
+
+    def on_event(vk_code, is_down, timestamp):
+        received[0] += 1
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    backend.start(on_event)
+    time.sleep(seconds)
+    backend.stop()
+    wall = time.perf_counter() - wall_start
+    return (time.process_time() - cpu_start) / wall, received[0]
+
+
+class _FakeKeyState:
+    """GetAsyncKeyState stand-in that toggles one key `rate` times per second."""
+
+    def __init__(self, rate, vk_code=0x41):
+        self.rate = rate
+        self.vk_code = vk_code
+        self.start = time.perf_counter()
+
+    def __call__(self, vk_code):
+        if vk_code != self.vk_code:
+            return 0
+        phase = int((time.perf_counter() - self.start) * self.rate * 2)
+        return 0x8000 if phase % 2 == 0 else 0
+
+
+def _cpu_result(measurement, seconds):
+    cpu, events = measurement
+    return {'cpu_percent': cpu * 100, 'events_per_sec': events / seconds}
+
+
+def recorder_cpu_report(seconds=2.0, rate=50):
+    """Capture CPU use per wall second, idle and under a synthetic `rate` presses/sec load."""
+    results = {}
+    active = synthetic_key_events(rate, seconds)
+    results['polling'] = {
+        'idle': _cpu_result(measure_capture_cpu(PollingCaptureBackend(get_key_state=lambda vk: 0), seconds), seconds),
+        'active': _cpu_result(measure_capture_cpu(PollingCaptureBackend(get_key_state=_FakeKeyState(rate)), seconds), seconds),
+    }
+    results['replay'] = {
+        'idle': _cpu_result(measure_capture_cpu(ReplayCaptureBackend(), seconds), seconds),
+        'active': _cpu_result(measure_capture_cpu(ReplayCaptureBackend(active), seconds), seconds),
+    }
+    try:
+        results['hook'] = {'idle': _cpu_result(measure_capture_cpu(HookCaptureBackend(), seconds), seconds)}
+    except Exception as e:
+        print(f"Hook backend unavailable: {e}", file=sys.stderr)
+    return results
+
+
+class _EngineWatcher:
+    def __init__(self):
+        self.summaries = []
+        self.done = threading.Semaphore(0)
+
+    def job_started(self, job_id, name):
+        pass
+
+    def job_progress(self, job_id, done, total):
+        pass
+
+    def job_paused(self, job_id, paused):
+        pass
+
+    def timing_updated(self, job_id, summary):
+        self.summaries.append(summary)
+
+    def job_finished(self, job_id, reason):
+        self.done.release()
+
+
+def _play_on_engine(macro, stats=None):
+    """Play macro once on a fresh PlaybackEngine into a RecordingInjectionBackend; returns the injector."""
+    injector = RecordingInjectionBackend()
+    watcher = _EngineWatcher()
+    engine = PlaybackEngine(injector, watcher)
+    engine.start()
+    engine.submit(macro, stats=stats)
+    watcher.done.acquire()
+    engine.shutdown()
+    return injector
+
+
+def playback_timing_report(actions=2000, spacing=0.005, hold=0.012):
+    """Lateness percentiles from the engine's own instrumentation, plus its per-event overhead."""
+    macro = CompiledMacro.from_actions((KEY_NAMES[i % 26], i * spacing, hold) for i in range(actions))
+    stats = PlaybackStats()
+    _play_on_engine(macro, stats)
+    summary = stats.loop_summaries()[-1]._asdict()
+    timing = stats.loop_timings()[-1]
+    start = time.perf_counter()
+    for i in range(len(macro)):
+        timing.record(i, 0.0)
+    summary['record_ns'] = (time.perf_counter() - start) / len(macro) * 1e9
+    return summary
+
+
+def player_throughput_report(rates=(1000, 5000, 20000, 50000), seconds=0.5, turbo_events=200000, budget=0.001):
+    """Schedule accuracy at increasing event rates, and raw injection throughput with no waiting.
+
+    max_sustained_rate is the highest rate whose p99 lateness stayed within budget seconds.
+    """
+    results = {}
+    sustained = 0
+    for rate in rates:
+        count = int(rate * seconds)
+        macro = CompiledMacro.from_events([(i / rate, i % 2, 0x41, 0, 0) for i in range(count)])
+        stats = PlaybackStats()
+        _play_on_engine(macro, stats)
+        summary = stats.loop_summaries()[-1]
+        results[f'{rate}_per_sec'] = {'p50_ms': summary.p50 * 1000, 'p99_ms': summary.p99 * 1000,
+                                      'max_ms': summary.max * 1000}
+        if summary.p99 <= budget:
+            sustained = rate
+    results['max_sustained_rate'] = sustained
+
+    macro = CompiledMacro.from_events([(0.0, i % 2, 0x41, 0, 0) for i in range(turbo_events)])
+    start = time.perf_counter()
+    _play_on_engine(macro)
+    results['unthrottled_events_per_sec'] = turbo_events / (time.perf_counter() - start)
+    return results
+
+
+def engine_concurrency_report(macro_counts=(1, 10, 50), seconds=1.0, rate=200):
+    """Lateness and CPU use of one PlaybackEngine thread running many overlapping macros."""
+    results = {}
+    for count in macro_counts:
+        watcher = _EngineWatcher()
+        engine = PlaybackEngine(RecordingInjectionBackend(), watcher)
+        engine.start()
+        rng = random.Random(count)
+        macros = [CompiledMacro.from_actions((rng.choice(KEY_NAMES), rng.uniform(0, 0.005) + i / rate, 0.5 / rate)
+                                             for i in range(int(seconds * rate))) for _ in range(count)]
+        threads_before = threading.active_count()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for macro in macros:
+            engine.submit(macro)
+        for _ in macros:
+            watcher.done.acquire()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        engine.shutdown()
+        worst = max(watcher.summaries, key=lambda summary: summary.p99)
+        results[f'{count}_macros'] = {
+            'events_per_sec': sum(len(macro) for macro in macros) / wall,
+            'cpu_percent': cpu / wall * 100,
+            'worst_p99_ms': worst.p99 * 1000,
+            'worst_max_ms': max(summary.max for summary in watcher.summaries) * 1000,
+            'threads': threads_before,
+        }
+    return results
+
+
+def _stuck_keys(sent):
+    """VK codes left down by a RecordingInjectionBackend's key events."""
+    down = set()
+    for vk_code, is_down, _ in sent:
+        if isinstance(vk_code, int):
+            (down.add if is_down else down.discard)(vk_code)
+    return down
+
+
+def stop_latency_report(trials=200, spacing=0.001, pause=0.05):
+    """Stop-request-to-halt latency of PlaybackEngine.cancel(), and schedule accuracy after pause/resume.
+
+    Each trial plays a dense chord-heavy macro, cancels it at a random
+    point and checks that nothing was injected for it afterwards and no
+    key was left down.
+    """
+    rng = random.Random(1)
+    injector = RecordingInjectionBackend()
+    engine = PlaybackEngine(injector)
+    engine.start()
+    macro = CompiledMacro.from_actions((KEY_NAMES[i % 26], i * spacing, 8 * spacing) for i in range(5000))
+    latencies, late_events, stuck = [], 0, 0
+    for _ in range(trials):
+        injector.sent.clear()
+        job_id = engine.submit(macro)
+        time.sleep(rng.uniform(0.005, 0.03))
+        requested = time.perf_counter()
+        engine.cancel(job_id)
+        halted = time.perf_counter()
+        latencies.append(halted - requested)
+        late_events += sum(1 for vk_code, is_down, sent_at in injector.sent if is_down and sent_at > halted)
+        stuck += bool(_stuck_keys(injector.sent))
+    latencies.sort()
+
+    stats = PlaybackStats()
+    injector.sent.clear()
+    job_id = engine.submit(macro, stats=stats)
+    time.sleep(0.02)
+    engine.pause(job_id)
+    paused_stuck = len(_stuck_keys(injector.sent))
+    time.sleep(pause)
+    engine.resume(job_id)
+    time.sleep(0.02)
+    engine.cancel(job_id)
+    engine.shutdown()
+    resumed = sorted(stats.loops[-1].lateness())
+    return {
+        'stop_p50_us': latencies[len(latencies) // 2] * 1e6,
+        'stop_p99_us': latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+        'stop_max_us': latencies[-1] * 1e6,
+        'events_after_stop': late_events,
+        'trials_with_stuck_keys': stuck,
+        'keys_down_while_paused': paused_stuck,
+        'resume_p99_ms': resumed[int(len(resumed) * 0.99) - 1] * 1000 if resumed else 0.0,
+    }
+
+
+def hotkey_dispatch_report(chords=300, events=100000, triggers=500):
+    """Per-key cost of matching against many hotkeys, and trigger-to-dispatch latency through the worker queue.
+
+    The linear figure checks every chord on each key-down, as a listener
+    that walks its hotkey list does.
+    """
+    modifiers = [(0x11,), (0x12,), (0x10,), (0x11, 0x10), (0x11, 0x12), (0x12, 0x10), (0x11, 0x12, 0x10)]
+    keys = list(range(0x70, 0x7C)) + list(range(0x30, 0x3A)) + list(range(0x41, 0x5B))
+    chord_sets = [frozenset(modifiers[i % len(modifiers)] + (keys[i // len(modifiers) % len(keys)],))
+                  for i in range(chords)]
+    delays = []
+    registry = HotkeyRegistry(lambda name, trigger_time: delays.append(time.perf_counter() - trigger_time), debounce=0)
+    for i, chord in enumerate(chord_sets):
+        registry.add(chord, f"macro {i}")
+    rng = random.Random(1)
+    typed = [0x41 + rng.randrange(26) for _ in range(events // 2)]
+    stream = [(vk_code, is_down) for vk_code in typed for is_down in (True, False)]  # Typing that matches nothing
+
+    start = time.perf_counter()
+    for vk_code, is_down in stream:
+        registry.on_key(vk_code, is_down, 0.0)
+    indexed = time.perf_counter() - start
+    pressed = set()
+    start = time.perf_counter()
+    for vk_code, is_down in stream:
+        (pressed.add if is_down else pressed.discard)(vk_code)
+        if is_down:
+            any(chord == pressed for chord in chord_sets)
+    linear = time.perf_counter() - start
+
+    registry.start()
+    for i in range(triggers):
+        chord = sorted(chord_sets[i % len(chord_sets)])
+        for vk_code in chord:
+            registry.on_key(vk_code, True, time.perf_counter())
+        for vk_code in chord:
+            registry.on_key(vk_code, False, time.perf_counter())
+        time.sleep(0.0005)
+    while len(delays) < triggers:
+        time.sleep(0.001)
+    registry.stop()
+    delays.sort()
+    return {
+        'chords': chords,
+        'indexed_ns_per_key': indexed / events * 1e9,
+        'linear_ns_per_key': linear / events * 1e9,
+        'dispatch_p50_us': delays[len(delays) // 2] * 1e6,
+        'dispatch_p99_us': delays[int(len(delays) * 0.99) - 1] * 1e6,
+        'dispatch_max_us': delays[-1] * 1e6,
+    }
+
+
+def hotkey_launch_report(triggers=200, events=50, spacing=0.001):
+    """Hotkey-press-to-first-injected-key latency through the registry, the launcher and a running engine.
+
+    The macro is prepared in advance, as HotkeyAssigner does for every
+    bound macro; before that a trigger read the database, built a player
+    thread and slept 0.5 s for the target window.
+    """
+    engine = PlaybackEngine(RecordingInjectionBackend())
+    engine.start()
+    launcher = HotkeyLauncher(engine)
+    launcher.prepare('combo', CompiledMacro.from_actions((KEY_NAMES[i % 26], i * spacing, spacing / 2)
+                                                         for i in range(events)))
+    registry = HotkeyRegistry(launcher.launch, debounce=0)
+    registry.add('Ctrl + F9', 'combo')
+    registry.start()
+    for i in range(triggers):
+        registry.on_key(0x11, True, time.perf_counter())
+        registry.on_key(0x78, True, time.perf_counter())
+        registry.on_key(0x78, False, time.perf_counter())
+        registry.on_key(0x11, False, time.perf_counter())
+        while len(engine.trigger_latencies) <= i or engine.jobs:  # Let it finish so the next press starts it again
+            time.sleep(0.0005)
+    registry.stop()
+    engine.shutdown()
+    latency = engine.trigger_latency_summary()
+    return {
+        'triggers': latency['count'],
+        'first_key_p50_ms': latency['p50'] * 1000,
+        'first_key_p99_ms': latency['p99'] * 1000,
+        'first_key_max_ms': latency['max'] * 1000,
+        'previous_ms': 500.0,
+    }
+
+
+def window_targeting_report(loops=20, activation_delay=0.03, events=20, spacing=0.001):
+    """Per-loop overhead of focusing a target window, which used to be a fixed 0.5 s sleep plus a window scan."""
+    backend = FakeWindowBackend(['Notepad', 'Target Game - Level 1', 'Browser'], activation_delay)
+    watcher = _EngineWatcher()
+    engine = PlaybackEngine(RecordingInjectionBackend(), watcher, WindowTargeter(backend))
+    engine.start()
+    macro = CompiledMacro.from_actions((KEY_NAMES[i % 26], i * spacing, spacing / 2) for i in range(events))
+    start = time.perf_counter()
+    engine.submit(macro, app_name='Target Game', loop=True)
+    while len(watcher.summaries) < 1:
+        time.sleep(0.001)
+    first_loop = time.perf_counter() - start
+    while len(watcher.summaries) < loops:
+        time.sleep(0.001)
+    total = time.perf_counter() - start
+    engine.cancel_all()
+    scans = backend.enumerations
+
+    backend.close(engine.windows.resolve('Target Game'))
+    reopened = backend.open('Target Game - Level 2')
+    engine.shutdown()
+    return {
+        'first_loop_ms': first_loop * 1000,
+        'later_loop_overhead_ms': ((total - first_loop) / (loops - 1) - macro.duration) * 1000,
+        'previous_loop_overhead_ms': 500.0,
+        'window_scans': scans,
+        'reresolved_after_close': engine.windows.resolve('Target Game') == reopened,
+    }
+
+
+def window_list_report(windows=2000, scan_delay=0.2, batch_size=50):
+    """Cost of filling the Settings app selector from a large desktop.
+
+    scan_delay simulates a slow full window enumeration; the cache pays
+    it once per TTL, and the model deduplicates each batch with a set.
+    """
+    titles = [f"Window {i % (windows * 4 // 5)}" for i in range(windows)]  # 20% duplicates
+    backend = FakeWindowBackend(titles, scan_delay=scan_delay)
+    cache = WindowTitleCache(backend, ttl=2.0)
+    start = time.perf_counter()
+    cache.get()
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    cached = cache.get()
+    warm = time.perf_counter() - start
+    results = {'cold_scan_ms': cold * 1000, 'cached_ms': warm * 1000, 'scans': backend.enumerations}
+    try:
+        from PySide6.QtCore import QCoreApplication
+        from window_list_model import WindowTitleModel
+    except ImportError as e:
+        results['model'] = f"skipped: {e}"
+        return results
+    app = QCoreApplication.instance() or QCoreApplication([])
+    model = WindowTitleModel()
+    start = time.perf_counter()
+    for i in range(0, len(cached), batch_size):
+        model.add_titles(cached[i:i + batch_size])
+    results['model_fill_ms'] = (time.perf_counter() - start) * 1000
+    results['model_rows'] = model.rowCount()
+    return results
+
+
+def playback_drift_report(actions=2000, spacing=0.005, hold=0.012):
+    """Play an overlapping-chord macro on the engine into a fake sink and measure lateness."""
+    macro = CompiledMacro.from_actions((0x41 + i % 26, i * spacing, hold) for i in range(actions))
+    stats = PlaybackStats()
+    _play_on_engine(macro, stats)
+    lateness = stats.loop_timings()[-1].lateness()
+    return {
+        'events': len(lateness),
+        'mean_lateness': sum(lateness) / len(lateness),
+        'max_lateness': max(lateness),
+        'end_drift': lateness[-1],
+    }
+
+
+def macro_memory_report(actions=100000):
+    """Compare the footprint of tuple-list macros with CompiledMacro."""
+    tuples = [(KEY_NAMES[i % 26], i * 0.01, 0.05) for i in range(actions)]
+    tuple_bytes = sys.getsizeof(tuples) + sum(sys.getsizeof(t) + sys.getsizeof(t[1]) + sys.getsizeof(t[2]) for t in tuples)
+    compiled = CompiledMacro.from_actions(tuples)
+    return {'actions': actions, 'tuple_list_bytes': tuple_bytes, 'compiled_bytes': compiled.nbytes}
+
+
+def translator_lookup_report(number=200000):
+    """Nanoseconds per KeyTranslator lookup, single and batched."""
+    names = ['A', 'Shift', '!', 'F12', 'Numpad 5', ';:']
+    vk_codes = [0x41, 0x10, 0x31, 0x7B, 0x65, 0xBA]
+    results = {}
+    for label, func, args in (('string_to_vk', KeyTranslator.string_to_vk, names),
+                              ('vk_to_string', KeyTranslator.vk_to_string, vk_codes),
+                              ('is_shift_key', KeyTranslator.is_shift_key, vk_codes)):
+        per_arg = [timeit.timeit('func(arg)', globals={'func': func, 'arg': arg}, number=number) / number
+                   for arg in args]
+        results[label] = sum(per_arg) / len(per_arg) * 1e9
+    batch = names * 1000
+    repeats = max(1, number // len(batch))
+    seconds = timeit.timeit(lambda: KeyTranslator.strings_to_vks(batch), number=repeats)
+    results['strings_to_vks'] = seconds / (repeats * len(batch)) * 1e9
+    return results
+
+def storage_codec_report(actions=25000):
+    """Decode time and size of one 2*actions-event macro, legacy JSON vs binary codec."""
+    rng = random.Random(1)
+    legacy = [[rng.choice(KEY_NAMES), i * 0.12 + rng.uniform(0, 0.05), rng.uniform(0.03, 0.2)] for i in range(actions)]
+    legacy_json = json.dumps(legacy)
+    binary = encode_macro(legacy)
+    json_seconds = timeit.timeit(lambda: CompiledMacro.from_actions(json.loads(legacy_json)), number=5) / 5
+    binary_seconds = timeit.timeit(lambda: decode_macro(binary), number=5) / 5
+    return {
+        'events': 2 * actions,
+        'json_bytes': len(legacy_json),
+        'binary_bytes': len(binary),
+        'json_load_ms': json_seconds * 1000,
+        'binary_load_ms': binary_seconds * 1000,
+    }
+
+
+def database_throughput_report(counts=(1000, 10000, 100000), actions_per_macro=20):
+    """Insert/read throughput of DatabaseManager at different library sizes."""
+    macro = CompiledMacro.from_actions((KEY_NAMES[i % 26], i * 0.1, 0.05) for i in range(actions_per_macro))
+    results = {}
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(db_file=os.path.join(tmp, 'bench.db'), cache_size=0)
+            start = time.perf_counter()
+            db.save_many((f"macro {i:06d}", macro) for i in range(count))
+            bulk_seconds = time.perf_counter() - start
+
+            single = min(500, count)
+            start = time.perf_counter()
+            for i in range(single):
+                db.save_macro(f"macro {i:06d}", macro)
+            single_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            names = db.get_macro_names()
+            names_seconds = time.perf_counter() - start
+
+            rng = random.Random(1)
+            sample = [rng.choice(names) for _ in range(1000)]
+            start = time.perf_counter()
+            for name in sample:
+                db.get_macro(name)
+            read_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            db.delete_many(names[:count // 10])
+            delete_seconds = time.perf_counter() - start
+            db.close()
+        results[count] = {
+            'save_many_per_sec': count / bulk_seconds,
+            'save_macro_per_sec': single / single_seconds,
+            'list_names_ms': names_seconds * 1000,
+            'get_macro_per_sec': len(sample) / read_seconds,
+            'delete_many_per_sec': (count // 10) / delete_seconds,
+        }
+    return results
+
+
+def _segment_distance(px, py, x1, y1, x2, y2):
+    dx, dy = x2 - x1, y2 - y1
+    length_sq = dx * dx + dy * dy
+    if not length_sq:
+        return math.hypot(px - x1, py - y1)
+    t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length_sq))
+    return math.hypot(px - x1 - t * dx, py - y1 - t * dy)
+
+
+def path_simplification_report(seconds=5.0, rate=1000, tolerance=2.0, flush_interval=0.2):
+    """Sample reduction and worst-case error of streaming path decimation on a synthetic 1 kHz cursor curve."""
+    rng = random.Random(1)
+    raw = []
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        x = 960 + 400 * math.sin(t * 1.3) + 60 * math.sin(t * 7.1)
+        y = 540 + 300 * math.cos(t * 0.9) + rng.choice((-1, 0, 0, 1))
+        raw.append((MOUSE_MOVE, 0, t, round(x), round(y)))
+
+    simplifier = PathSimplifier(tolerance)
+    kept = []
+    batch_size = int(flush_interval * rate)
+    start = time.perf_counter()
+    for i in range(0, len(raw), batch_size):
+        kept.extend(decimate_events(raw[i:i + batch_size], simplifier))
+    elapsed = time.perf_counter() - start
+
+    kept_times = [event[2] for event in kept]
+    max_error = 0.0
+    for _, _, t, x, y in raw:
+        i = bisect_right(kept_times, t)
+        if i == 0 or i == len(kept):
+            continue
+        a, b = kept[i - 1], kept[i]
+        max_error = max(max_error, _segment_distance(x, y, a[3], a[4], b[3], b[4]))
+    return {
+        'raw_samples': len(raw),
+        'kept_samples': len(kept),
+        'reduction': 1 - len(kept) / len(raw),
+        'max_error_px': max_error,
+        'within_tolerance': max_error <= tolerance,
+        'us_per_sample': elapsed / len(raw) * 1e6,
+        'playback_samples': len(CompiledMacro.from_events([(t, kind, vk, x, y) for kind, vk, t, x, y in kept]).interpolated()),
+    }
+
+
+def optimizer_report(actions=2000):
+    """Duration of a hesitant synthetic recording after each optimizer setting."""
+    rng = random.Random(1)
+    press_time, recorded = 0.0, []
+    for _ in range(actions):
+        press_time += rng.uniform(0.08, 0.3) + (rng.uniform(1.0, 4.0) if rng.random() < 0.05 else 0.0)
+        recorded.append((rng.choice(KEY_NAMES), press_time, rng.uniform(0.04, 0.15)))
+    macro = CompiledMacro.from_actions(recorded)
+    settings = {
+        'recorded': MacroOptimizer(),
+        'max_gap_0.25': MacroOptimizer(max_gap=0.25),
+        'speed_2x': MacroOptimizer(speed=2.0),
+        'gap_and_2x': MacroOptimizer(max_gap=0.25, speed=2.0, min_spacing=0.01),
+        'turbo': MacroOptimizer(turbo=True),
+    }
+    results = {}
+    for name, optimizer in settings.items():
+        start = time.perf_counter()
+        optimized = optimizer.optimize(macro)
+        results[name] = {'duration_s': optimized.duration, 'optimize_ms': (time.perf_counter() - start) * 1000}
+    return results
+
+
+def humanizer_report(actions=20000, repeats=5):
+    """Per-event cost of batch jitter for each distribution vs the old per-event random.uniform transform."""
+    rng = random.Random(1)
+    macro = CompiledMacro.from_actions([(rng.choice(KEY_NAMES), i * 0.15 + rng.uniform(0, 0.04), rng.uniform(0.05, 0.12))
+                                        for i in range(actions)])
+    events = len(macro)
+
+    def per_event_transform(value):
+        return max(0.01, value * (1 + random.uniform(-0.2, 0.2)))
+
+    results = {'per_event_uniform': timeit.timeit(lambda: macro.with_timing(per_event_transform), number=repeats) / repeats / events * 1e6}
+    profile = fit_profile(macro)
+    for distribution in ('uniform', 'gaussian', 'lognormal', 'fitted'):
+        humanizer = TimingHumanizer(distribution, seed=1, profile=profile)
+        results[distribution] = timeit.timeit(lambda: humanizer.apply(macro), number=repeats) / repeats / events * 1e6
+    first, second = TimingHumanizer(seed=7).apply(macro), TimingHumanizer(seed=7).apply(macro)
+    results['deterministic'] = list(first.times) == list(second.times)
+    return results
+
+
+_COLD_START_SCRIPT = r"""
+import json, time
+start = time.perf_counter()
+try:
+    import win32api
+except ImportError:
+    # pywin32 only exists on Windows; stand in headless injection and window backends
+    import input_backends, window_targeting
+    input_backends.Win32InjectionBackend = input_backends.RecordingInjectionBackend
+    window_targeting.Win32WindowBackend = window_targeting.FakeWindowBackend
+from PySide6.QtWidgets import QApplication
+from macro_tool import MacroTool
+imported = time.perf_counter()
+app = QApplication([])
+window = MacroTool()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'window_s': shown - imported}))
+"""
+
+
+class _LocalServer:
+    """Stand-in for GitHub on 127.0.0.1: serves `files` with ETags and counts requests, 304s and connections.
+
+    Supports Range / If-Range. While `rate_limited` is set every request
+    gets a 429 with Retry-After; if `drop_after` is set, the next response
+    body is cut off after that many bytes.
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+        self.ports = set()
+        self.not_modified = 0
+        self.sent = 0
+        self.rate_limited = False
+        self.drop_after = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                server.ports.add(self.client_address[1])
+                body = server.files.get(self.path)
+                if server.rate_limited:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '30')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = f'"{hash(body) & 0xffffffff:08x}"'
+                if self.headers.get('If-None-Match') == etag:
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                offset = 0
+                requested = self.headers.get('Range', '')
+                if requested.startswith('bytes=') and self.headers.get('If-Range', etag) == etag:
+                    offset = int(requested[len('bytes='):].split('-')[0])
+                    if offset >= len(body):
+                        self.send_response(416)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {offset}-{len(body) - 1}/{len(body)}")
+                else:
+                    self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body) - offset))
+                self.end_headers()
+                payload = memoryview(body)[offset:]
+                if server.drop_after is not None:
+                    payload, server.drop_after = payload[:server.drop_after], None
+                    self.close_connection = True
+                self.wfile.write(payload)
+                server.sent += len(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def update_check_report(checks=50):
+    """Update checks against a local stand-in for the GitHub releases API.
+
+    After the first full fetch every check is a conditional request that
+    gets a bodiless 304, including from a new checker that only has the
+    on-disk cache. Checks share pooled connections.
+    """
+    release = {'tag_name': 'v1.0.2', 'assets': [{'browser_download_url': 'https://example.invalid/update.zip'}],
+               'body': 'x' * 20000}
+    server = _LocalServer({'/releases/latest': json.dumps(release).encode()})
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, 'release_cache.json')
+        checker = UpdateChecker('1.0.1', None, cache_path, api_url=server.url + '/releases/latest')
+        start = time.perf_counter()
+        is_newer, _ = checker.check()
+        full = time.perf_counter() - start
+        samples = []
+        for _ in range(checks):
+            start = time.perf_counter()
+            checker.check()
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        restarted = UpdateChecker('1.0.1', None, cache_path, api_url=server.url + '/releases/latest')
+        restarted_newer, _ = restarted.check()
+
+        server.rate_limited = True
+        try:
+            restarted.check()
+        except RateLimited:
+            pass
+        limited_requests = len(server.requests)
+        try:
+            restarted.check()
+        except RateLimited:
+            pass
+        backoff = restarted.next_delay()
+        server.close()
+    return {
+        'update_found': is_newer and restarted_newer,
+        'full_fetch_ms': full * 1000,
+        'conditional_p50_ms': samples[len(samples) // 2] * 1000,
+        'conditional_max_ms': samples[-1] * 1000,
+        'connections': len(server.ports),
+        'requests': len(server.requests),
+        'not_modified_responses': server.not_modified,  # checks + 1 when the restarted checker used the disk cache
+        'requests_while_rate_limited': len(server.requests) - limited_requests,
+        'rate_limit_backoff_s': backoff,
+    }
+
+
+def update_download_report(size_mb=32, drop_at=0.5):
+    """Update download throughput, resume after a dropped connection and checksum rejection, from a local server.
+
+    The baseline streams with requests' 1 KB iter_content and a progress
+    call per block, as the updaters did before.
+    """
+    import hashlib
+    import requests
+    body = random.Random(1).randbytes(size_mb * 1024 * 1024)
+    sha256 = hashlib.sha256(body).hexdigest()
+    server = _LocalServer({'/update.zip': body})
+    url = server.url + '/update.zip'
+    results = {'size_mb': size_mb}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'update.zip')
+        calls = []
+        start = time.perf_counter()
+        with requests.get(url, stream=True) as response, open(path, 'wb') as f:
+            for data in response.iter_content(1024):
+                f.write(data)
+                calls.append(len(data))
+        baseline = time.perf_counter() - start
+        results['baseline_mb_s'] = size_mb / baseline
+        results['baseline_progress_calls'] = len(calls)
+        os.remove(path)
+
+        calls = []
+        download = Download(url, path, sha256, progress=lambda done, total: calls.append(done))
+        start = time.perf_counter()
+        download.run()
+        elapsed = time.perf_counter() - start
+        results['engine_mb_s'] = size_mb / elapsed
+        results['engine_progress_calls'] = len(calls)
+        results['final_chunk_kb'] = download.chunk_size // 1024
+        os.remove(path)
+
+        server.sent = 0
+        server.drop_after = int(len(body) * drop_at)
+        download = Download(url, path, sha256)
+        download.run()
+        results['resume_transferred_ratio'] = server.sent / len(body)  # 1.0 means nothing was fetched twice
+        results['resumed_from_mb'] = download.resumed_from / (1024 * 1024)
+        os.remove(path)
+
+        try:
+            Download(url, path, '0' * 64).run()
+            results['corrupt_rejected'] = False
+        except ChecksumMismatch:
+            results['corrupt_rejected'] = not os.path.exists(path) and not os.path.exists(path + '.part')
+    server.close()
+    return results
+
+
+def update_delta_report(size_mb=10, changes=20):
+    """Delta update against a full download of a synthetic build, served by a local HTTP server.
+
+    The new build is the old one with `changes` scattered edits,
+    insertions and deletions, which shift everything after them, as a
+    rebuilt PyInstaller archive does.
+    """
+    import hashlib
+    rng = random.Random(3)
+    old = rng.randbytes(size_mb * 1024 * 1024)
+    new = bytearray(old)
+    for _ in range(changes):
+        at = rng.randrange(len(new))
+        action = rng.randrange(3)
+        if action == 0:
+            new[at:at + 2000] = rng.randbytes(2000)
+        elif action == 1:
+            new[at:at] = rng.randbytes(rng.randrange(1, 3000))
+        else:
+            del new[at:at + rng.randrange(1, 3000)]
+    new = bytes(new)
+    start = time.perf_counter()
+    delta = make_delta(old, new)
+    make_time = time.perf_counter() - start
+    sha256 = hashlib.sha256(new).hexdigest()
+    server = _LocalServer({'/dark_macro_tool.exe': new, '/update.delta': delta})
+    server.files['/version.json'] = json.dumps({
+        'version': '1.0.2', 'sha256': sha256, 'download_url': server.url + '/dark_macro_tool.exe',
+        'deltas': [{'from_version': '1.0.1', 'from_sha256': hashlib.sha256(old).hexdigest(),
+                    'url': server.url + '/update.delta', 'sha256': hashlib.sha256(delta).hexdigest()}],
+    }).encode()
+    results = {'delta_ratio': len(delta) / len(new), 'make_delta_s': make_time}
+    with tempfile.TemporaryDirectory() as tmp:
+        installed = os.path.join(tmp, 'installed.exe')
+        with open(installed, 'wb') as f:
+            f.write(old)
+        target = os.path.join(tmp, 'installed.exe.new')
+        for label, installed_path in (('delta', installed), ('full', None)):
+            server.sent = 0
+            start = time.perf_counter()
+            method = fetch_update(server.url + '/dark_macro_tool.exe', target, sha256, server.url + '/version.json',
+                                  installed_path)
+            results[f'{label}_s'] = time.perf_counter() - start
+            results[f'{label}_bytes'] = server.sent
+            with open(target, 'rb') as f:
+                results[f'{label}_ok'] = method == label and f.read() == new
+            os.remove(target)
+        with open(installed, 'r+b') as f:
+            f.write(b'patched')  # A modified install has no matching delta
+        results['mismatch_fell_back'] = fetch_update(server.url + '/dark_macro_tool.exe', target, sha256,
+                                                     server.url + '/version.json', installed) == 'full'
+        server.files['/dark_macro_tool.exe'] = new[::-1]  # Without a release sha256 the manifest's still applies
+        try:
+            fetch_update(server.url + '/dark_macro_tool.exe', target, None, server.url + '/version.json', installed)
+            results['manifest_checksum_checked'] = False
+        except ChecksumMismatch:
+            results['manifest_checksum_checked'] = True
+    server.close()
+    return results
+
+
+def _build_update_package(path, files, config_extra=None):
+    import hashlib
+    import zipfile
+    config = {'version': 'v1.0.2', 'file_updates': [
+        {'src': name, 'dest': name, 'sha256': hashlib.sha256(data).hexdigest()} for name, data in files.items()]}
+    config.update(config_extra or {})
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+        archive.writestr('update_config.json', json.dumps(config))
+    return config
+
+
+def _legacy_apply(zip_path, install_dir):
+    """The extract-everything apply that OTAUpdater used to do, for comparison."""
+    import zipfile
+    update_dir = os.path.join(install_dir, 'update')
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(update_dir)
+    with open(os.path.join(update_dir, 'update_config.json'), 'r') as config_file:
+        update_config = json.load(config_file)
+    for file_update in update_config['file_updates']:
+        dest = os.path.join(install_dir, file_update['dest'])
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(os.path.join(update_dir, file_update['src']), dest)
+    for root, dirs, files in os.walk(update_dir, topdown=False):
+        for name in files:
+            os.remove(os.path.join(root, name))
+        for name in dirs:
+            os.rmdir(os.path.join(root, name))
+    os.rmdir(update_dir)
+
+
+def update_apply_report(size_mb=10, extra_files=200):
+    """Applying an update package: the streaming, staged apply against the old extract-and-move one.
+
+    Also checks that a failed swap or a corrupt entry leaves the install
+    exactly as it was, and how quickly the updater notices the app has
+    exited (it used to sleep a fixed 2 s).
+    """
+    rng = random.Random(4)
+    files = {'dark_macro_tool.exe': rng.randbytes(size_mb * 1024 * 1024)}
+    files.update((f"data/file_{i}.bin", rng.randbytes(4096)) for i in range(extra_files))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        package = os.path.join(tmp, 'update.zip')
+        _build_update_package(package, files)
+        for label, apply in (('legacy', _legacy_apply), ('streaming', apply_package)):
+            install_dir = os.path.join(tmp, label)
+            os.makedirs(install_dir)
+            start = time.perf_counter()
+            apply(package, install_dir)
+            results[f'{label}_s'] = time.perf_counter() - start
+        installed = os.path.join(tmp, 'streaming')
+
+        def intact():
+            for name, data in files.items():
+                with open(os.path.join(installed, name), 'rb') as f:
+                    if f.read() != data:
+                        return False
+            return not os.path.exists(os.path.join(installed, '.update_staging'))
+
+        newer = {name: data[::-1] for name, data in files.items()}
+        newer['blocked/file.bin'] = b'x'
+        with open(os.path.join(installed, 'blocked'), 'wb'):  # A file where a folder should be makes the last swap fail
+            pass
+        _build_update_package(package, newer)
+        try:
+            apply_package(package, installed)
+            results['failed_swap_rolled_back'] = False
+        except OSError:
+            results['failed_swap_rolled_back'] = intact()
+
+        config = _build_update_package(package, newer)
+        config['file_updates'][-1]['sha256'] = '0' * 64
+        _build_update_package(package, newer, {'file_updates': config['file_updates']})
+        try:
+            apply_package(package, installed)
+            results['corrupt_entry_rejected'] = False
+        except Exception:
+            results['corrupt_entry_rejected'] = intact()
+
+    import psutil
+    app = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(0.3)'])
+    process = psutil.Process(app.pid)
+    start = time.perf_counter()
+    wait_for_exit(process)
+    results['restart_wait_s'] = time.perf_counter() - start
+    results['previous_restart_wait_s'] = 2.0
+    return results
+
+
+def macro_tool_cold_start_report(runs=3):
+    """Median MacroTool cold start in a fresh process on Qt's offscreen platform with an empty data dir."""
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, QT_QPA_PLATFORM='offscreen', XDG_DATA_HOME=tmp, HOME=tmp,
+                       LOCALAPPDATA=tmp, APPDATA=tmp)
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, '-c', _COLD_START_SCRIPT], env=env, capture_output=True,
+                                       text=True, timeout=120, cwd=os.path.dirname(os.path.abspath(__file__)))
+            wall = time.perf_counter() - start
+            if completed.returncode != 0:
+                raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+            sample = json.loads(completed.stdout.strip().splitlines()[-1])
+            sample['process_s'] = wall
+            samples.append(sample)
+    return {key: sorted(sample[key] for sample in samples)[len(samples) // 2] for key in samples[0]}
+
+
+# name: (report, arguments for --quick)
+REPORTS = {
+    'recorder': (recorder_cpu_report, {'seconds': 0.5}),
+    'player': (player_throughput_report, {'rates': (1000, 5000), 'seconds': 0.2, 'turbo_events': 20000}),
+    'engine': (engine_concurrency_report, {'macro_counts': (1, 10), 'seconds': 0.3}),
+    'window_targeting': (window_targeting_report, {'loops': 5}),
+    'window_list': (window_list_report, {'windows': 500, 'scan_delay': 0.05}),
+    'stop_latency': (stop_latency_report, {'trials': 30}),
+    'hotkey_dispatch': (hotkey_dispatch_report, {'chords': 100, 'events': 20000, 'triggers': 100}),
+    'hotkey_launch': (hotkey_launch_report, {'triggers': 30}),
+    'playback_timing': (playback_timing_report, {'actions': 200}),
+    'playback_drift': (playback_drift_report, {'actions': 200}),
+    'macro_memory': (macro_memory_report, {'actions': 10000}),
+    'translator': (translator_lookup_report, {'number': 20000}),
+    'storage_codec': (storage_codec_report, {'actions': 2500}),
+    'database': (database_throughput_report, {'counts': (1000, 10000)}),
+    'path_simplification': (path_simplification_report, {'seconds': 1.0}),
+    'optimizer': (optimizer_report, {'actions': 200}),
+    'humanizer': (humanizer_report, {'actions': 2000}),
+    'update_check': (update_check_report, {'checks': 10}),
+    'update_download': (update_download_report, {'size_mb': 8}),
+    'update_delta': (update_delta_report, {'size_mb': 2}),
+    'update_apply': (update_apply_report, {'size_mb': 2, 'extra_files': 20}),
+    'cold_start': (macro_tool_cold_start_report, {'runs': 1}),
+}
+
+
+def run_benchmarks(names, quick=False):
+    results = {}
+    for name in names:
+        report, quick_args = REPORTS[name]
+        print(f"Running {name}...", file=sys.stderr)
+        try:
+            results[name] = report(**(quick_args if quick else {}))
+        except Exception as e:
+            print(f"Benchmark {name} failed: {e}", file=sys.stderr)
+            results[name] = {'error': str(e)}
+    return results
+
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def print_results(results, baseline=None):
+    baseline = dict(flatten(baseline)) if baseline else {}
+    for key, value in flatten(results):
+        line = f"{key:55} {value:14.4f}" if isinstance(value, float) else f"{key:55} {value!s:>14}"
+        previous = baseline.get(key)
+        if isinstance(value, (int, float)) and isinstance(previous, (int, float)) and previous and not isinstance(value, bool):
+            line += f"  ({(value - previous) / abs(previous) * 100:+.1f}%)"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dark Macro Tool benchmark suite")
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help=f"benchmarks to run (default: all of {', '.join(REPORTS)})")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes, for a fast smoke run")
+    parser.add_argument('--json', metavar='PATH', help="write the results to PATH as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="show the change against results from an earlier --json run")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in REPORTS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.benchmarks or list(REPORTS), args.quick)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'quick': args.quick,
+                       'python': platform.python_version(), 'platform': platform.platform(),
+                       'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
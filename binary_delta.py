@@ -0,0 +1,156 @@
+import hashlib
+import os
+import struct
+import sys
+import zlib
+
+MAGIC = b'DMD1'
+BLOCK_SIZE = 4096
+_HEADER = struct.Struct('<4sQQI32s32s')  # magic, old size, new size, block size, old SHA-256, new SHA-256
+_COPY = struct.Struct('<BQI')  # op, offset in old file, length
+_DATA = struct.Struct('<BI')   # op, length of the literal bytes that follow
+OP_COPY = 0
+OP_DATA = 1
+_ADLER_MOD = 65521
+
+
+class DeltaError(ValueError):
+    pass
+
+
+def file_sha256(path, buffer_size=1024 * 1024):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(buffer_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def make_delta(old, new, block_size=BLOCK_SIZE):
+    """Encode new (bytes) as copies of blocks of old plus literal data, zlib-compressed.
+
+    Blocks of old are indexed by Adler-32 at block_size boundaries, and a
+    rolling Adler-32 slides over new one byte at a time, so shared data
+    is found at any offset: a PyInstaller build that only changed a few
+    modules mostly becomes a short list of copies.
+    """
+    index = {}
+    for offset in range(0, len(old) - block_size + 1, block_size):
+        index.setdefault(zlib.adler32(old[offset:offset + block_size]), []).append(offset)
+
+    ops = []
+    pending_copy = None  # (offset, length), merged while matches stay contiguous
+    literal_start = pos = 0
+    end = len(new) - block_size
+    weak = zlib.adler32(new[:block_size]) if end >= 0 else None
+    while pos <= end:
+        match = None
+        for offset in index.get(weak, ()):
+            if old[offset:offset + block_size] == new[pos:pos + block_size]:
+                match = offset
+                break
+        if match is None:
+            out_byte, in_byte = new[pos], new[pos + block_size] if pos < end else 0
+            a = ((weak & 0xffff) - out_byte + in_byte) % _ADLER_MOD
+            b = ((weak >> 16) - block_size * out_byte - 1 + a) % _ADLER_MOD
+            weak = (b << 16) | a
+            pos += 1
+            continue
+        if literal_start < pos:
+            if pending_copy:
+                ops.append(_COPY.pack(OP_COPY, *pending_copy))
+                pending_copy = None
+            ops.append(_DATA.pack(OP_DATA, pos - literal_start) + new[literal_start:pos])
+        if pending_copy and pending_copy[0] + pending_copy[1] == match:
+            pending_copy = (pending_copy[0], pending_copy[1] + block_size)
+        else:
+            if pending_copy:
+                ops.append(_COPY.pack(OP_COPY, *pending_copy))
+            pending_copy = (match, block_size)
+        pos += block_size
+        literal_start = pos
+        if pos <= end:
+            weak = zlib.adler32(new[pos:pos + block_size])
+    if pending_copy:
+        ops.append(_COPY.pack(OP_COPY, *pending_copy))
+    if literal_start < len(new):
+        ops.append(_DATA.pack(OP_DATA, len(new) - literal_start) + new[literal_start:])
+
+    header = _HEADER.pack(MAGIC, len(old), len(new), block_size,
+                          hashlib.sha256(old).digest(), hashlib.sha256(new).digest())
+    return header + zlib.compress(b''.join(ops), 9)
+
+
+def read_header(delta):
+    if len(delta) < _HEADER.size:
+        raise DeltaError("Delta is truncated")
+    magic, old_size, new_size, block_size, old_sha256, new_sha256 = _HEADER.unpack_from(delta)
+    if magic != MAGIC:
+        raise DeltaError("Not a delta file")
+    return old_size, new_size, old_sha256.hex(), new_sha256.hex()
+
+
+def apply_delta(old_path, delta, out_path):
+    """Rebuild the new file from old_path and delta (bytes) into out_path; returns its SHA-256.
+
+    Raises DeltaError if old_path is not the file the delta was made
+    from or the result does not hash to the expected value; out_path is
+    removed in that case.
+    """
+    old_size, new_size, old_sha256, new_sha256 = read_header(delta)
+    if os.path.getsize(old_path) != old_size or file_sha256(old_path) != old_sha256:
+        raise DeltaError("Installed file does not match the delta's base version")
+    try:
+        ops = memoryview(zlib.decompress(delta[_HEADER.size:]))
+    except zlib.error as e:
+        raise DeltaError(f"Corrupt delta: {str(e)}")
+    sha256 = hashlib.sha256()
+    written = 0
+    try:
+        with open(old_path, 'rb') as old, open(out_path, 'wb') as out:
+            pos = 0
+            while pos < len(ops):
+                if ops[pos] == OP_COPY:
+                    _, offset, length = _COPY.unpack_from(ops, pos)
+                    pos += _COPY.size
+                    old.seek(offset)
+                    data = old.read(length)
+                    if len(data) != length:
+                        raise DeltaError("Delta copies past the end of the base file")
+                else:
+                    _, length = _DATA.unpack_from(ops, pos)
+                    pos += _DATA.size
+                    data = ops[pos:pos + length]
+                    pos += length
+                out.write(data)
+                sha256.update(data)
+                written += length
+        if written != new_size or sha256.hexdigest() != new_sha256:
+            raise DeltaError("Rebuilt file does not match the new version")
+    except (DeltaError, struct.error, OSError):
+        try:
+            os.remove(out_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return new_sha256
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 5 and sys.argv[1] == 'make':
+        with open(sys.argv[2], 'rb') as f:
+            old_data = f.read()
+        with open(sys.argv[3], 'rb') as f:
+            new_data = f.read()
+        delta_data = make_delta(old_data, new_data)
+        with open(sys.argv[4], 'wb') as f:
+            f.write(delta_data)
+        print(f"Delta {sys.argv[4]}: {len(delta_data)} bytes for a {len(new_data)} byte file")
+    elif len(sys.argv) == 5 and sys.argv[1] == 'apply':
+        with open(sys.argv[3], 'rb') as f:
+            delta_data = f.read()
+        print(f"Rebuilt {sys.argv[4]}, SHA-256 {apply_delta(sys.argv[2], delta_data, sys.argv[4])}")
+    else:
+        print("Usage: python binary_delta.py make <old> <new> <delta>\n"
+              "       python binary_delta.py apply <old> <delta> <new>")
+        sys.exit(1)
@@ -1,11 +1,16 @@
 import hashlib
+import sys
 
-def calculate_checksum(file_path, algorithm='sha256'):
+def calculate_checksum(file_path, algorithm='sha256', buffer_size=1024 * 1024):
     hash_func = hashlib.new(algorithm)
     with open(file_path, 'rb') as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        for chunk in iter(lambda: f.read(buffer_size), b""):
             hash_func.update(chunk)
     return hash_func.hexdigest()
 
-checksum = calculate_checksum('D:\Projects\macro_tool_python\file.zip')
-print(f"SHA-256 Checksum: {checksum}")
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python calculate_sha256.py <file> [<file> ...]")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        print(f"SHA-256 Checksum of {path}: {calculate_checksum(path)}")
@@ -0,0 +1,159 @@
+from array import array
+from key_translator import KeyTranslator
+
+KEY_UP = 0
+KEY_DOWN = 1
+MOUSE_MOVE = 2   # x, y hold the absolute cursor position
+MOUSE_WHEEL = 3  # x, y hold the horizontal and vertical scroll amounts
+
+POINTER_KINDS = (MOUSE_MOVE, MOUSE_WHEEL)
+
+# Tie-break for events sharing a timestamp: the cursor moves before a button
+# goes down or up, and a release comes before a re-press of the same key
+_SORT_ORDER = {MOUSE_MOVE: 0, KEY_UP: 1, MOUSE_WHEEL: 2, KEY_DOWN: 3}
+
+PLAYBACK_MOVE_STEP = 1 / 120  # Spacing of interpolated cursor samples during playback
+PLAYBACK_MAX_GLIDE = 0.25  # Longer gaps between samples were the cursor resting, so it jumps
+
+
+class MacroAction:
+    __slots__ = ('vk_code', 'press_time', 'duration')
+
+    def __init__(self, vk_code, press_time, duration):
+        self.vk_code = vk_code
+        self.press_time = press_time
+        self.duration = duration
+
+    def __iter__(self):
+        yield self.vk_code
+        yield self.press_time
+        yield self.duration
+
+    def __repr__(self):
+        return f"MacroAction({KeyTranslator.vk_to_string(self.vk_code)!r}, {self.press_time:.3f}, {self.duration:.3f})"
+
+
+class CompiledMacro:
+    """A macro flattened into one time-sorted timeline of input events.
+
+    Events live in parallel typed arrays (VK code, event kind, float64 time,
+    int32 x and y) so playback reads plain numbers with no per-event key
+    lookups. x and y are only meaningful for pointer events.
+    """
+
+    __slots__ = ('vk_codes', 'kinds', 'times', 'xs', 'ys')
+
+    def __init__(self, vk_codes=None, kinds=None, times=None, xs=None, ys=None):
+        self.vk_codes = vk_codes if vk_codes is not None else array('B')
+        self.kinds = kinds if kinds is not None else array('B')
+        self.times = times if times is not None else array('d')
+        self.xs = xs if xs is not None else array('i', bytes(4 * len(self.times)))
+        self.ys = ys if ys is not None else array('i', bytes(4 * len(self.times)))
+
+    @classmethod
+    def from_actions(cls, actions, pointer_events=()):
+        """Compile (key, press_time, duration) actions plus (kind, time, x, y) pointer events.
+
+        Keys may be VK codes or key names.
+        """
+        if isinstance(actions, cls) and not pointer_events:
+            return actions
+        events = []
+        for key, press_time, duration in actions:
+            vk_code = KeyTranslator.string_to_vk(key) if isinstance(key, str) else key
+            if vk_code is None:
+                print(f"Skipping unsupported key: {key}")
+                continue
+            events.append((press_time, KEY_DOWN, vk_code, 0, 0))
+            events.append((press_time + duration, KEY_UP, vk_code, 0, 0))
+        for kind, event_time, x, y in pointer_events:
+            events.append((event_time, kind, 0, x, y))
+        return cls.from_events(events)
+
+    @classmethod
+    def from_events(cls, events):
+        """Build from (time, kind, vk_code, x, y) tuples in any order."""
+        events = sorted(events, key=lambda event: (event[0], _SORT_ORDER[event[1]]))
+        return cls(array('B', [event[2] for event in events]),
+                   array('B', [event[1] for event in events]),
+                   array('d', [event[0] for event in events]),
+                   array('i', [event[3] for event in events]),
+                   array('i', [event[4] for event in events]))
+
+    def events(self):
+        return zip(self.times, self.kinds, self.vk_codes, self.xs, self.ys)
+
+    def to_actions(self):
+        """Pair key-downs with their key-ups, returning MacroActions in press order."""
+        actions = []
+        pending = {}
+        for vk_code, kind, event_time in zip(self.vk_codes, self.kinds, self.times):
+            if kind == KEY_DOWN:
+                action = MacroAction(vk_code, event_time, 0.0)
+                pending.setdefault(vk_code, []).append(action)
+                actions.append(action)
+            elif kind == KEY_UP and pending.get(vk_code):
+                action = pending[vk_code].pop(0)
+                action.duration = event_time - action.press_time
+        return actions
+
+    def pointer_events(self):
+        """Return the (kind, time, x, y) cursor move and wheel events."""
+        return [(kind, event_time, x, y) for event_time, kind, _, x, y in self.events() if kind in POINTER_KINDS]
+
+    def with_timing(self, transform):
+        """Recompile with transform() applied to every press time, duration and pointer time."""
+        return CompiledMacro.from_actions(
+            [(vk_code, transform(press_time), transform(duration))
+             for vk_code, press_time, duration in self.to_actions()],
+            [(kind, transform(event_time), x, y) for kind, event_time, x, y in self.pointer_events()],
+        )
+
+    def interpolated(self, step=PLAYBACK_MOVE_STEP, max_glide=PLAYBACK_MAX_GLIDE):
+        """Insert linearly interpolated cursor samples so simplified paths play back smoothly."""
+        if self.kinds.count(MOUSE_MOVE) < 2:
+            return self
+        events = list(self.events())
+        extra = []
+        previous = None
+        for event_time, kind, _, x, y in events:
+            if kind != MOUSE_MOVE:
+                continue
+            if previous is not None and event_time - previous[0] <= max_glide:
+                start_time, start_x, start_y = previous
+                span = event_time - start_time
+                steps = int(span / step)
+                for i in range(1, steps):
+                    fraction = i * step / span
+                    extra.append((start_time + i * step, MOUSE_MOVE, 0,
+                                  round(start_x + (x - start_x) * fraction),
+                                  round(start_y + (y - start_y) * fraction)))
+            previous = (event_time, x, y)
+        if not extra:
+            return self
+        return CompiledMacro.from_events(events + extra)
+
+    @property
+    def action_count(self):
+        return self.kinds.count(KEY_DOWN)
+
+    @property
+    def has_pointer_events(self):
+        return bool(self.kinds.count(MOUSE_MOVE) or self.kinds.count(MOUSE_WHEEL))
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.times else 0.0
+
+    @property
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in (self.vk_codes, self.kinds, self.times, self.xs, self.ys))
+
+    def __len__(self):
+        return len(self.times)
+
+    def __bool__(self):
+        return len(self.times) > 0
+
+    def __repr__(self):
+        return f"CompiledMacro({self.action_count} actions, {self.duration:.3f}s)"
@@ -1,15 +1,31 @@
 import sqlite3
-import json
 import os
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
 from appdirs import user_data_dir
+from compiled_macro import CompiledMacro
+from macro_codec import encode_macro, decode_macro
+import macro_library
+
+MacroSummary = namedtuple('MacroSummary', ['name', 'event_count', 'action_count', 'duration', 'size', 'updated_at'])
 
 class DatabaseManager:
-    def __init__(self, app_name='MacroTool', app_author='YourCompanyName'):
+    # 1: JSON actions TEXT column, 2: binary data BLOB column, 3: summary columns,
+    # 4: hotkeys cascade on macro delete and are indexed by macro_id, 5: action_count summary column
+    SCHEMA_VERSION = 5
+
+    def __init__(self, app_name='MacroTool', app_author='YourCompanyName', db_file=None, cache_size=32):
         self.app_data_dir = user_data_dir(app_name, app_author)
-        if not os.path.exists(self.app_data_dir):
-            os.makedirs(self.app_data_dir)
-        
-        self.db_file = os.path.join(self.app_data_dir, 'macros.db')
+        if db_file is None:
+            if not os.path.exists(self.app_data_dir):
+                os.makedirs(self.app_data_dir)
+            db_file = os.path.join(self.app_data_dir, 'macros.db')
+
+        self.db_file = db_file
+        self.cache_size = cache_size
+        self.macro_cache = OrderedDict()
+        self.transaction_depth = 0
         self.conn = None
         self.cursor = None
         self.connect()
@@ -18,13 +34,36 @@ class DatabaseManager:
     def connect(self):
         self.conn = sqlite3.connect(self.db_file)
         self.cursor = self.conn.cursor()
+        self.cursor.execute('PRAGMA journal_mode = WAL')
+        self.cursor.execute('PRAGMA synchronous = NORMAL')
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one commit; nested uses join the outermost transaction."""
+        self.transaction_depth += 1
+        try:
+            yield self.cursor
+        except BaseException:
+            self.transaction_depth -= 1
+            if self.transaction_depth == 0:
+                self.conn.rollback()
+                self.macro_cache.clear()
+            raise
+        self.transaction_depth -= 1
+        if self.transaction_depth == 0:
+            self.conn.commit()
 
     def create_tables(self):
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS macros (
                 id INTEGER PRIMARY KEY,
                 name TEXT UNIQUE NOT NULL,
-                actions TEXT NOT NULL
+                data BLOB NOT NULL,
+                event_count INTEGER NOT NULL DEFAULT 0,
+                duration REAL NOT NULL DEFAULT 0,
+                size INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL DEFAULT 0,
+                action_count INTEGER NOT NULL DEFAULT 0
             )
         ''')
         self.cursor.execute('''
@@ -32,38 +71,291 @@ class DatabaseManager:
                 id INTEGER PRIMARY KEY,
                 macro_id INTEGER,
                 hotkey TEXT UNIQUE NOT NULL,
-                FOREIGN KEY (macro_id) REFERENCES macros (id)
+                FOREIGN KEY (macro_id) REFERENCES macros (id) ON DELETE CASCADE
             )
         ''')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_hotkeys_macro_id ON hotkeys (macro_id)')
         self.conn.commit()
+        self.migrate()
+        # Enabled only after migrating, table rebuilds must not trigger cascades
+        self.cursor.execute('PRAGMA foreign_keys = ON')
+
+    def get_schema_version(self):
+        self.cursor.execute('PRAGMA user_version')
+        version = self.cursor.fetchone()[0]
+        if version == 0:
+            # Databases created before versioning have the JSON actions column
+            self.cursor.execute('PRAGMA table_info(macros)')
+            columns = {row[1] for row in self.cursor.fetchall()}
+            version = 1 if 'actions' in columns else self.SCHEMA_VERSION
+        return version
 
-    def save_macro(self, name, actions):
-        actions_json = json.dumps(actions)
-        self.cursor.execute('INSERT OR REPLACE INTO macros (name, actions) VALUES (?, ?)', (name, actions_json))
+    def migrate(self):
+        version = self.get_schema_version()
+        if version < 2:
+            self.migrate_json_actions_to_blob()
+        if version < 3:
+            self.migrate_add_summary_columns()
+        if version < 4:
+            self.migrate_cascading_hotkeys()
+        if version < 5:
+            self.migrate_add_action_count()
+        self.cursor.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
         self.conn.commit()
 
+    def migrate_json_actions_to_blob(self):
+        # Rebuild the table keeping row ids so hotkeys.macro_id stays valid
+        self.cursor.execute('''
+            CREATE TABLE macros_v2 (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL,
+                data BLOB NOT NULL
+            )
+        ''')
+        rows = self.conn.execute('SELECT id, name, actions FROM macros').fetchall()
+        for macro_id, name, actions in rows:
+            try:
+                data = encode_macro(decode_macro(actions))
+            except ValueError as e:
+                print(f"Keeping macro '{name}' as JSON, could not convert it: {e}")
+                data = actions
+            self.cursor.execute('INSERT INTO macros_v2 (id, name, data) VALUES (?, ?, ?)', (macro_id, name, data))
+        self.cursor.execute('DROP TABLE macros')
+        self.cursor.execute('ALTER TABLE macros_v2 RENAME TO macros')
+
+    def migrate_add_summary_columns(self):
+        for column in ('event_count INTEGER NOT NULL DEFAULT 0', 'duration REAL NOT NULL DEFAULT 0',
+                       'size INTEGER NOT NULL DEFAULT 0', 'updated_at REAL NOT NULL DEFAULT 0'):
+            self.cursor.execute(f'ALTER TABLE macros ADD COLUMN {column}')
+        now = time.time()
+        rows = self.conn.execute('SELECT id, name, data FROM macros').fetchall()
+        for macro_id, name, data in rows:
+            try:
+                macro = decode_macro(data)
+            except ValueError as e:
+                print(f"Could not read macro '{name}' while building its summary: {e}")
+                continue
+            self.cursor.execute('UPDATE macros SET event_count = ?, duration = ?, size = ?, updated_at = ? WHERE id = ?',
+                                (len(macro), macro.duration, len(data), now, macro_id))
+
+    def migrate_cascading_hotkeys(self):
+        # Hotkeys left behind by the old delete_macro ordering are dropped here
+        self.cursor.execute('''
+            CREATE TABLE hotkeys_v4 (
+                id INTEGER PRIMARY KEY,
+                macro_id INTEGER,
+                hotkey TEXT UNIQUE NOT NULL,
+                FOREIGN KEY (macro_id) REFERENCES macros (id) ON DELETE CASCADE
+            )
+        ''')
+        self.cursor.execute('''
+            INSERT INTO hotkeys_v4 (id, macro_id, hotkey)
+            SELECT id, macro_id, hotkey FROM hotkeys WHERE macro_id IN (SELECT id FROM macros)
+        ''')
+        self.cursor.execute('DROP TABLE hotkeys')
+        self.cursor.execute('ALTER TABLE hotkeys_v4 RENAME TO hotkeys')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_hotkeys_macro_id ON hotkeys (macro_id)')
+
+    def migrate_add_action_count(self):
+        # Key presses; event_count also includes key releases and pointer events
+        self.cursor.execute('ALTER TABLE macros ADD COLUMN action_count INTEGER NOT NULL DEFAULT 0')
+        rows = self.conn.execute('SELECT id, name, data FROM macros').fetchall()
+        for macro_id, name, data in rows:
+            try:
+                macro = decode_macro(data)
+            except ValueError as e:
+                print(f"Could not read macro '{name}' while counting its actions: {e}")
+                continue
+            self.cursor.execute('UPDATE macros SET action_count = ? WHERE id = ?', (macro.action_count, macro_id))
+
+    def commit(self):
+        if self.transaction_depth == 0:
+            self.conn.commit()
+
+    @staticmethod
+    def _macro_row(name, macro, now):
+        if isinstance(macro, (bytes, bytearray)):
+            data = bytes(macro)
+            macro = decode_macro(data)  # Validates the blob and provides the summary columns
+        else:
+            macro = CompiledMacro.from_actions(macro)
+            data = encode_macro(macro)
+        return name, data, len(macro), macro.action_count, macro.duration, len(data), now
+
+    def save_macro(self, name, macro):
+        self.save_many([(name, macro)])
+
+    def save_many(self, macros):
+        """Upsert (name, macro) pairs in a single transaction.
+
+        A macro may be a CompiledMacro, an action list or an already encoded
+        blob. Upserting keeps the row id, so hotkeys survive a macro being
+        overwritten.
+        """
+        now = time.time()
+        saved = []
+
+        def rows():
+            for name, macro in macros:
+                saved.append(name)
+                yield self._macro_row(name, macro, now)
+
+        with self.transaction():
+            self.cursor.executemany('''
+                INSERT INTO macros (name, data, event_count, action_count, duration, size, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    data = excluded.data, event_count = excluded.event_count, action_count = excluded.action_count,
+                    duration = excluded.duration, size = excluded.size, updated_at = excluded.updated_at
+            ''', rows())
+        for name in saved:
+            self.macro_cache.pop(name, None)
+        return len(saved)
+
+    def iter_library_records(self, batch_size=1000):
+        """Yield (name, data, hotkeys) for every macro, reading batch_size rows at a time."""
+        after = ''
+        while True:
+            rows = self.conn.execute(
+                'SELECT id, name, data FROM macros WHERE name > ? ORDER BY name LIMIT ?', (after, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            hotkeys = {}
+            placeholders = ','.join('?' * len(rows))
+            for macro_id, hotkey in self.conn.execute(
+                    f'SELECT macro_id, hotkey FROM hotkeys WHERE macro_id IN ({placeholders})', [row[0] for row in rows]):
+                hotkeys.setdefault(macro_id, []).append(hotkey)
+            for macro_id, name, data in rows:
+                yield name, self._library_data(name, data), hotkeys.get(macro_id, [])
+            after = rows[-1][1]
+
+    @staticmethod
+    def _library_data(name, data):
+        # Rows the binary migration could not convert are still JSON text
+        if isinstance(data, bytes):
+            return data
+        try:
+            return encode_macro(decode_macro(data))
+        except ValueError as e:
+            print(f"Exporting macro '{name}' as JSON, could not convert it: {e}")
+            return data.encode('utf-8')
+
+    def count_macros(self):
+        self.cursor.execute('SELECT COUNT(*) FROM macros')
+        return self.cursor.fetchone()[0]
+
+    def export_library(self, path, progress=None, batch_size=1000):
+        """Stream every macro and its hotkeys to an NDJSON file or a .zip pack."""
+        total = self.count_macros()
+        return macro_library.write_library(path, self.iter_library_records(batch_size), total, progress)
+
+    def import_library(self, path, progress=None, batch_size=1000):
+        """Load a library written by export_library, committing every batch_size macros.
+
+        Macros with an existing name are overwritten, and an imported macro
+        that has hotkeys replaces the hotkeys of the local one. Records whose
+        macro cannot be read (legacy rows the migration had to keep as
+        JSON text) are skipped. Returns the number imported.
+        """
+        imported = read = 0
+        for batch, total in macro_library.read_library_batches(path, batch_size):
+            read += len(batch)
+            batch = [record for record in batch if self._readable(record[0], record[1])]
+            imported += len(batch)
+            with self.transaction():
+                self.save_many((name, data) for name, data, _ in batch)
+                self.cursor.executemany(
+                    'DELETE FROM hotkeys WHERE macro_id IN (SELECT id FROM macros WHERE name = ?)',
+                    ((name,) for name, _, hotkeys in batch if hotkeys))
+                self.cursor.executemany(
+                    'INSERT OR REPLACE INTO hotkeys (macro_id, hotkey) SELECT id, ? FROM macros WHERE name = ?',
+                    ((hotkey, name) for name, _, hotkeys in batch for hotkey in hotkeys))
+            if progress and progress(read, total) is False:
+                break
+        return imported
+
+    @staticmethod
+    def _readable(name, data):
+        try:
+            decode_macro(data)
+            return True
+        except ValueError as e:
+            print(f"Skipping macro '{name}', it could not be read: {e}")
+            return False
+
     def get_macro(self, name):
-        self.cursor.execute('SELECT actions FROM macros WHERE name = ?', (name,))
+        macro = self.macro_cache.get(name)
+        if macro is not None:
+            self.macro_cache.move_to_end(name)
+            return macro
+        self.cursor.execute('SELECT data FROM macros WHERE name = ?', (name,))
         result = self.cursor.fetchone()
         if result:
-            return json.loads(result[0])
+            macro = decode_macro(result[0])
+            self.macro_cache[name] = macro
+            if len(self.macro_cache) > self.cache_size:
+                self.macro_cache.popitem(last=False)
+            return macro
         return None
 
+    def get_macro_names(self):
+        self.cursor.execute('SELECT name FROM macros ORDER BY name')
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_macro_catalogue(self):
+        self.cursor.execute('SELECT name, event_count, action_count, duration, size, updated_at FROM macros ORDER BY name')
+        return [MacroSummary(*row) for row in self.cursor.fetchall()]
+
+    def get_macro_catalogue_page(self, after=None, limit=500, name_filter="", descending=False):
+        # Keyset pagination on the unique name index: each page starts after the last name seen
+        conditions = []
+        params = []
+        if after is not None:
+            conditions.append('name < ?' if descending else 'name > ?')
+            params.append(after)
+        if name_filter:
+            escaped = name_filter.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append("name LIKE ? ESCAPE '\\'")
+            params.append(f'%{escaped}%')
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        order = 'DESC' if descending else 'ASC'
+        self.cursor.execute(f'''
+            SELECT name, event_count, action_count, duration, size, updated_at FROM macros
+            {where} ORDER BY name {order} LIMIT ?
+        ''', params + [limit])
+        return [MacroSummary(*row) for row in self.cursor.fetchall()]
+
+    def get_macro_summary(self, name):
+        self.cursor.execute('SELECT name, event_count, action_count, duration, size, updated_at FROM macros WHERE name = ?', (name,))
+        result = self.cursor.fetchone()
+        return MacroSummary(*result) if result else None
+
     def delete_macro(self, name):
-        self.cursor.execute('DELETE FROM macros WHERE name = ?', (name,))
-        self.cursor.execute('DELETE FROM hotkeys WHERE macro_id IN (SELECT id FROM macros WHERE name = ?)', (name,))
-        self.conn.commit()
+        self.delete_many([name])
+
+    def delete_many(self, names):
+        names = list(names)
+        with self.transaction():
+            # Hotkeys go with their macro through ON DELETE CASCADE
+            self.cursor.executemany('DELETE FROM macros WHERE name = ?', ((name,) for name in names))
+        for name in names:
+            self.macro_cache.pop(name, None)
 
     def get_all_macros(self):
-        self.cursor.execute('SELECT name, actions FROM macros')
-        return {name: json.loads(actions) for name, actions in self.cursor.fetchall()}
+        self.cursor.execute('SELECT name, data FROM macros')
+        return {name: decode_macro(data) for name, data in self.cursor.fetchall()}
 
     def save_hotkey(self, macro_name, hotkey):
         self.cursor.execute('SELECT id FROM macros WHERE name = ?', (macro_name,))
         macro_id = self.cursor.fetchone()
         if macro_id:
             self.cursor.execute('INSERT OR REPLACE INTO hotkeys (macro_id, hotkey) VALUES (?, ?)', (macro_id[0], hotkey))
-            self.conn.commit()
+            self.commit()
+
+    def delete_hotkey(self, macro_name):
+        self.cursor.execute('DELETE FROM hotkeys WHERE macro_id IN (SELECT id FROM macros WHERE name = ?)', (macro_name,))
+        self.commit()
 
     def get_hotkey(self, macro_name):
         self.cursor.execute('''
@@ -84,4 +376,4 @@ class DatabaseManager:
 
     def close(self):
         if self.conn:
-            self.conn.close()
\ No newline at end of file
+            self.conn.close()
@@ -1,42 +1,90 @@
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
-from PySide6.QtCore import Qt
-from pynput import keyboard
-
-class HotkeyAssigner:
-    def __init__(self, macro_tool):
+from PySide6.QtCore import QObject, QTimer, Signal
+from input_backends import HookCaptureBackend
+from hotkey_registry import HotkeyRegistry, HotkeyLauncher, format_chord, normalize_vk
+
+class HotkeyAssigner(QObject):
+    """Global hotkeys for macros.
+
+    One keyboard hook runs for the life of the app and feeds a
+    HotkeyRegistry. Bound macros are kept prepared in a HotkeyLauncher, so
+    the registry's dispatch worker starts them on the playback engine
+    directly; only a macro that is not prepared yet is handed to the GUI
+    thread through `triggered(macro_name, trigger_time)`. Assigning or
+    clearing a hotkey only updates the registry.
+
+    The playback engine is started as soon as a hotkey is bound, so the
+    first press does not pay for starting it. If the engine cannot start
+    (pywin32 missing), nothing is prepared and every press goes through
+    `triggered` instead.
+    """
+
+    triggered = Signal(str, float)
+
+    def __init__(self, macro_tool, capture_backend=None):
+        super().__init__(macro_tool)
         self.macro_tool = macro_tool
         self.db_manager = macro_tool.db_manager
-        self.hotkeys = self.db_manager.get_all_hotkeys()
-        self.listener = None
-        self.create_listener()
-
-    def create_listener(self):
+        self.launcher = HotkeyLauncher()
+        self.prewarm = True
+        self.registry = HotkeyRegistry(self.dispatch)
+        self.reload()
+        self.capturing = None
+        self.listener = capture_backend or HookCaptureBackend(capture_mouse=False)
+        self.registry.start()
         try:
-            hotkey_dict = self.create_hotkey_dict()
-            if hotkey_dict:
-                self.listener = keyboard.GlobalHotKeys(hotkey_dict)
-                self.listener.start()
-            else:
-                print("No valid hotkeys to listen for.")
-        except ValueError as e:
+            self.listener.start(self.on_key)
+        except Exception as e:
+            self.listener = None
             print(f"Error creating hotkey listener: {e}")
             print("Continuing without global hotkey functionality.")
 
-    def update_listener(self):
-        if self.listener:
-            self.listener.stop()
-        self.create_listener()
-
-    def create_hotkey_dict(self):
-        valid_hotkeys = {}
-        for hotkey, macro_name in self.hotkeys.items():
-            try:
-                # Attempt to parse the hotkey
-                keyboard.HotKey.parse(hotkey)
-                valid_hotkeys[hotkey] = (lambda name=macro_name: lambda: self.macro_tool.play_macro(name))()
-            except ValueError:
-                print(f"Invalid hotkey '{hotkey}' for macro '{macro_name}'. Skipping.")
-        return valid_hotkeys
+    def reload(self):
+        """Re-read every hotkey from the database, e.g. after an import, and prepare the bound macros."""
+        self.registry.load(self.db_manager.get_all_hotkeys())
+        self.start_engine()
+        self.warm()
+
+    def start_engine(self):
+        """Start the playback engine once any hotkey is bound."""
+        if self.launcher.engine is not None or not self.prewarm or not self.registry.chords:
+            return
+        try:
+            self.launcher.engine = self.macro_tool.get_playback_engine()
+        except Exception as e:
+            self.prewarm = False
+            print(f"Error starting playback engine: {e}")
+            print("Hotkeys will start macros without pre-warming.")
+
+    def warm(self, macro_name=None):
+        """Re-prepare one bound macro, or all of them (after a settings change). Call from the GUI thread."""
+        if not self.prewarm:
+            return
+        bound = set(self.registry.chords.values())
+        if macro_name is None:
+            self.launcher.discard()
+            names = bound
+        else:
+            names = {macro_name} & bound
+        for name in names:
+            macro = self.db_manager.get_macro(name)
+            if macro:
+                macro, options = self.macro_tool.prepare_playback(macro)
+                self.launcher.prepare(name, macro, **options)
+            else:
+                self.launcher.discard(name)
+
+    def dispatch(self, macro_name, trigger_time):
+        """Registry worker callback."""
+        if self.launcher.launch(macro_name, trigger_time):
+            self.registry.record_latency(trigger_time)
+        else:
+            self.triggered.emit(macro_name, trigger_time)
+
+    def on_key(self, vk_code, is_down, timestamp):
+        if self.capturing is not None and is_down:
+            self.capturing.add(normalize_vk(vk_code))
+        self.registry.on_key(vk_code, is_down, timestamp)
 
     def assign_hotkey(self, macro_name):
         dialog = QDialog(self.macro_tool)
@@ -66,7 +114,8 @@ class HotkeyAssigner:
         label = QLabel(f"Press a key combination for '{macro_name}':")
         layout.addWidget(label)
 
-        key_label = QLabel("Pressed Keys: ")
+        current = self.get_hotkey_for_macro(macro_name)
+        key_label = QLabel("Pressed Keys: " + (current or ""))
         layout.addWidget(key_label)
 
         button_layout = QHBoxLayout()
@@ -80,64 +129,57 @@ class HotkeyAssigner:
 
         dialog.setLayout(layout)
 
+        # Keys arrive on the hook thread; the label is refreshed from the GUI thread
         pressed_keys = set()
+        shown = []
+
+        def refresh_label():
+            chord = frozenset(pressed_keys)
+            if chord and chord != frozenset(shown):
+                shown[:] = chord
+                key_label.setText("Pressed Keys: " + format_chord(chord))
 
-        def on_press(key):
-            try:
-                key_char = key.char
-            except AttributeError:
-                key_char = str(key)
-            pressed_keys.add(key_char)
-            key_label.setText("Pressed Keys: " + " + ".join(sorted(pressed_keys)))
-
-        def on_release(key):
-            pass
-            # try:
-            #     key_char = key.char
-            # except AttributeError:
-            #     key_char = str(key)
-            # if key_char in pressed_keys:
-            #     pressed_keys.remove(key_char)
-            # key_label.setText("Pressed Keys: " + " + ".join(sorted(pressed_keys)))
-
-        listener = keyboard.Listener(on_press=on_press, on_release=on_release)
-        listener.start()
+        timer = QTimer(dialog)
+        timer.timeout.connect(refresh_label)
+        timer.start(50)
 
         def save_hotkey():
-            hotkey = " + ".join(sorted(pressed_keys))
-            if hotkey:
+            chord = frozenset(pressed_keys)
+            if chord:
+                hotkey = format_chord(chord)
                 self.db_manager.save_hotkey(macro_name, hotkey)
-                self.hotkeys = self.db_manager.get_all_hotkeys()
-                self.update_listener()
+                self.reload()
                 dialog.accept()
 
         def clear_hotkey():
             self.db_manager.delete_hotkey(macro_name)
-            self.hotkeys = self.db_manager.get_all_hotkeys()
-            self.update_listener()
+            self.registry.remove(macro_name)
+            self.launcher.discard(macro_name)
             dialog.accept()
 
         save_button.clicked.connect(save_hotkey)
         cancel_button.clicked.connect(dialog.reject)
         clear_button.clicked.connect(clear_hotkey)
 
-        dialog.exec()
-        listener.stop()
+        self.registry.suspended = True
+        self.capturing = pressed_keys
+        try:
+            dialog.exec()
+        finally:
+            self.capturing = None
+            self.registry.suspended = False
+            timer.stop()
 
     def remove_hotkey(self, macro_name):
-        hotkey_to_remove = None
-        for hotkey, name in list(self.hotkeys.items()):  # Use list() to avoid runtime error
-            if name == macro_name:
-                hotkey_to_remove = hotkey
-                break
-        if hotkey_to_remove:
-            del self.hotkeys[hotkey_to_remove]
-            self.db_manager.delete_hotkey(macro_name)
-        self.update_listener()
+        self.registry.remove(macro_name)
+        self.launcher.discard(macro_name)
+        self.db_manager.delete_hotkey(macro_name)
 
     def get_hotkey_for_macro(self, macro_name):
         return self.db_manager.get_hotkey(macro_name)
 
     def stop_listener(self):
         if self.listener:
-            self.listener.stop()
\ No newline at end of file
+            self.listener.stop()
+            self.listener = None
+        self.registry.stop()
\ No newline at end of file
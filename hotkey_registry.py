@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+from collections import deque
+from key_translator import KeyTranslator
+from playback_stats import percentile
+
+# Left/right variants fire the same hotkey as the generic modifier
+_MODIFIER_ALIASES = {0xA0: 0x10, 0xA1: 0x10, 0xA2: 0x11, 0xA3: 0x11, 0xA4: 0x12, 0xA5: 0x12, 0x5C: 0x5B}
+_MODIFIER_ORDER = (0x11, 0x12, 0x10, 0x5B)  # Ctrl, Alt, Shift, Win
+_MODIFIER_NAMES = {0x5B: "Win"}
+
+# Key names written by the old pynput-based hotkey dialog ("Key.ctrl_l") that KeyTranslator does not know
+_LEGACY_NAMES = {
+    'ctrl': 0x11, 'shift': 0x10, 'alt': 0x12, 'cmd': 0x5B,
+    'up': 0x26, 'down': 0x28, 'left': 0x25, 'right': 0x27, 'page_up': 0x21, 'page_down': 0x22,
+    'caps_lock': 0x14, 'num_lock': 0x90, 'scroll_lock': 0x91, 'print_screen': 0x2C,
+}
+
+DEBOUNCE = 0.25  # A chord re-fires only after this many seconds
+
+
+def normalize_vk(vk_code):
+    return _MODIFIER_ALIASES.get(vk_code, vk_code)
+
+
+def _parse_key(part):
+    if part.startswith('Key.') or (part.startswith('<') and part.endswith('>') and len(part) > 2):
+        name = part[4:] if part.startswith('Key.') else part[1:-1]
+        for suffix in ('_l', '_r', '_gr'):
+            if name.endswith(suffix) and name[:-len(suffix)] in _LEGACY_NAMES:
+                name = name[:-len(suffix)]
+        if name in _LEGACY_NAMES:
+            return _LEGACY_NAMES[name]
+        part = name.replace('_', ' ').title()
+    vk_code = KeyTranslator.string_to_vk(part)
+    if vk_code is None:
+        raise ValueError(f"Unknown key '{part}'")
+    return vk_code
+
+
+def parse_chord(text):
+    """Parse "Ctrl + Shift + F5" (or the legacy "Key.ctrl_l + a") into a frozenset of VK codes."""
+    if ' + ' in text:
+        parts = text.split(' + ')
+    elif len(text) == 1 or text.endswith(' +'):  # "+" or "Numpad +" on its own
+        parts = [text]
+    else:
+        parts = text.split('+')
+    parts = [part.strip() for part in parts]
+    if not all(parts):
+        raise ValueError(f"Invalid hotkey '{text}'")
+    return frozenset(normalize_vk(_parse_key(part)) for part in parts)
+
+
+def format_chord(chord):
+    modifiers = [vk for vk in _MODIFIER_ORDER if vk in chord]
+    others = sorted(vk for vk in chord if vk not in _MODIFIER_ORDER)
+    return " + ".join(_MODIFIER_NAMES.get(vk) or KeyTranslator.vk_to_string(vk) for vk in modifiers + others)
+
+
+class HotkeyRegistry:
+    """Matches hotkey chords against a live key stream.
+
+    Chords are indexed by their exact key set, so each key-down costs one
+    dict lookup no matter how many hotkeys exist, and add() / remove()
+    take effect immediately without restarting any listener. Matches are
+    put on a queue and handed to `dispatch(macro_name, trigger_time)` by a
+    worker thread, so the input hook callback never runs playback code.
+    A chord that fired less than `debounce` seconds ago is ignored.
+    """
+
+    def __init__(self, dispatch, debounce=DEBOUNCE, latency_samples=1000):
+        self.dispatch = dispatch
+        self.debounce = debounce
+        self.chords = {}
+        self.pressed = set()
+        self.last_fired = {}
+        self.suspended = False
+        self.latencies = deque(maxlen=latency_samples)
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='HotkeyDispatch', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def add(self, chord, macro_name):
+        """Register a chord (a set of VK codes or hotkey text) for macro_name, replacing its previous one."""
+        if isinstance(chord, str):
+            chord = parse_chord(chord)
+        chord = frozenset(normalize_vk(vk) for vk in chord)
+        self.remove(macro_name)
+        self.chords[chord] = macro_name
+
+    def remove(self, macro_name):
+        for chord, name in list(self.chords.items()):
+            if name == macro_name:
+                del self.chords[chord]
+                self.last_fired.pop(chord, None)
+
+    def load(self, hotkeys):
+        """Replace all chords from a {macro_name: hotkey text} mapping, skipping unparseable ones."""
+        chords = {}
+        for macro_name, hotkey in hotkeys.items():
+            try:
+                chords[parse_chord(hotkey)] = macro_name
+            except ValueError as e:
+                print(f"Invalid hotkey '{hotkey}' for macro '{macro_name}': {e}. Skipping.")
+        self.chords = chords  # Swapped in whole so the hook thread never sees a half-built index
+        self.last_fired = {}
+
+    def on_key(self, vk_code, is_down, timestamp):
+        """CaptureBackend callback; runs on the input hook thread."""
+        vk_code = normalize_vk(vk_code)
+        if not is_down:
+            self.pressed.discard(vk_code)
+            return
+        if vk_code in self.pressed:  # Auto-repeat
+            return
+        self.pressed.add(vk_code)
+        if self.suspended:
+            return
+        chord = frozenset(self.pressed)
+        macro_name = self.chords.get(chord)
+        if macro_name is None:
+            return
+        if timestamp - self.last_fired.get(chord, float('-inf')) < self.debounce:
+            return
+        self.last_fired[chord] = timestamp
+        self.queue.put((macro_name, timestamp))
+
+    def record_latency(self, trigger_time):
+        """Note how long a trigger took to reach playback; call when the macro has been submitted."""
+        self.latencies.append(time.perf_counter() - trigger_time)
+
+    def latency_summary(self):
+        ordered = sorted(self.latencies)
+        return {'count': len(ordered), 'p50': percentile(ordered, 0.5), 'p99': percentile(ordered, 0.99),
+                'max': ordered[-1] if ordered else 0.0}
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            try:
+                self.dispatch(*item)
+            except Exception as e:
+                print(f"Error dispatching hotkey for '{item[0]}': {str(e)}")
+
+
+class HotkeyLauncher:
+    """Starts hotkey-bound macros straight from the dispatch worker.
+
+    prepare() is called from the GUI thread whenever a bound macro or the
+    playback settings change, and keeps the macro already compiled and
+    optimized along with its engine.submit() options. launch() then only
+    submits to the running engine: no database read, decoding or GUI
+    thread hop between the trigger and the first keystroke. Pressing the
+    hotkey again while its macro is still playing stops it.
+
+    engine is the running PlaybackEngine. It can be set later (the owner
+    starts it once a hotkey is bound); until then launch() returns False
+    and the caller falls back to its own playback path.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.prepared = {}
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, macro_name, macro, **options):
+        self.prepared[macro_name] = (macro, options)
+
+    def discard(self, macro_name=None):
+        if macro_name is None:
+            self.prepared = {}
+        else:
+            self.prepared.pop(macro_name, None)
+
+    def launch(self, macro_name, trigger_time=None):
+        """Start (or stop) a prepared macro; False if it has not been prepared or there is no engine."""
+        entry = self.prepared.get(macro_name)
+        if entry is None or self.engine is None:
+            return False
+        macro, options = entry
+        with self._lock:
+            job_id = self.jobs.pop(macro_name, None)
+            if job_id is not None and self.engine.cancel(job_id):
+                return True
+            self.jobs[macro_name] = self.engine.submit(macro, macro_name, trigger_time=trigger_time, **options)
+        return True
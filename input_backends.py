@@ -0,0 +1,251 @@
+import threading
+import time
+from compiled_macro import MOUSE_MOVE, MOUSE_WHEEL
+
+MOUSE_BUTTON_VKS = {
+    'left': 0x01,
+    'right': 0x02,
+    'middle': 0x04,
+    'x1': 0x05,
+    'x2': 0x06,
+}
+
+
+class CaptureBackend:
+    """Source of raw input for MacroRecorder.
+
+    Backends call on_event(vk_code, is_down, timestamp) once per key or button
+    transition, with timestamps taken from time.perf_counter(). Backends
+    that support it also call on_pointer(kind, x, y, timestamp) for cursor
+    moves (absolute position) and wheel scrolls (dx, dy notches).
+    """
+
+    def start(self, on_event, on_pointer=None):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class HookCaptureBackend(CaptureBackend):
+    """Event-driven capture through the pynput keyboard and mouse hooks."""
+
+    def __init__(self, capture_mouse=True):
+        self.capture_mouse = capture_mouse
+        self.keyboard_listener = None
+        self.mouse_listener = None
+        self.on_event = None
+        self.on_pointer = None
+
+    def start(self, on_event, on_pointer=None):
+        from pynput import keyboard, mouse
+
+        self.on_event = on_event
+        self.on_pointer = on_pointer
+        self.keyboard_listener = keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
+        self.keyboard_listener.start()
+        if self.capture_mouse:
+            if on_pointer:
+                self.mouse_listener = mouse.Listener(on_click=self._on_click, on_move=self._on_move,
+                                                     on_scroll=self._on_scroll)
+            else:
+                self.mouse_listener = mouse.Listener(on_click=self._on_click)
+            self.mouse_listener.start()
+
+    def stop(self):
+        if self.keyboard_listener:
+            self.keyboard_listener.stop()
+            self.keyboard_listener = None
+        if self.mouse_listener:
+            self.mouse_listener.stop()
+            self.mouse_listener = None
+
+    @staticmethod
+    def key_to_vk(key):
+        vk = getattr(key, 'vk', None)
+        if vk is None:
+            vk = getattr(getattr(key, 'value', None), 'vk', None)
+        return vk
+
+    def _on_press(self, key):
+        vk = self.key_to_vk(key)
+        if vk is not None:
+            self.on_event(vk, True, time.perf_counter())
+
+    def _on_release(self, key):
+        vk = self.key_to_vk(key)
+        if vk is not None:
+            self.on_event(vk, False, time.perf_counter())
+
+    def _on_click(self, x, y, button, pressed):
+        vk = MOUSE_BUTTON_VKS.get(getattr(button, 'name', None))
+        if vk is not None:
+            self.on_event(vk, pressed, time.perf_counter())
+
+    def _on_move(self, x, y):
+        self.on_pointer(MOUSE_MOVE, x, y, time.perf_counter())
+
+    def _on_scroll(self, x, y, dx, dy):
+        self.on_pointer(MOUSE_WHEEL, dx, dy, time.perf_counter())
+
+
+class PollingCaptureBackend(CaptureBackend):
+    """Legacy capture that samples GetAsyncKeyState for every VK code (keys and buttons only)."""
+
+    def __init__(self, interval=0.001, get_key_state=None):
+        self.interval = interval
+        self.get_key_state = get_key_state
+        self.thread = None
+        self._stop_event = threading.Event()
+
+    def start(self, on_event, on_pointer=None):
+        if self.get_key_state is None:
+            import win32api
+            self.get_key_state = win32api.GetAsyncKeyState
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._poll, args=(on_event,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def _poll(self, on_event):
+        get_key_state = self.get_key_state
+        down = [False] * 256
+        while not self._stop_event.is_set():
+            for vk in range(1, 256):
+                is_down = bool(get_key_state(vk) & 0x8000)
+                if is_down != down[vk]:
+                    down[vk] = is_down
+                    on_event(vk, is_down, time.perf_counter())
+            self._stop_event.wait(self.interval)
+
+
+class ReplayCaptureBackend(CaptureBackend):
+    """Synthetic backend that replays (vk_code, is_down, offset) key events
+    and (kind, x, y, offset) pointer events.
+
+    Runs anywhere, so recorder behaviour can be exercised without a real
+    keyboard hook. Events can also be pushed directly with inject().
+    """
+
+    def __init__(self, events=(), realtime=True):
+        self.events = list(events)
+        self.realtime = realtime
+        self.on_event = None
+        self.on_pointer = None
+        self.thread = None
+        self._stop_event = threading.Event()
+
+    def start(self, on_event, on_pointer=None):
+        self.on_event = on_event
+        self.on_pointer = on_pointer
+        self._stop_event.clear()
+        if self.events:
+            self.thread = threading.Thread(target=self._replay, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def inject(self, vk_code, is_down):
+        if self.on_event:
+            self.on_event(vk_code, is_down, time.perf_counter())
+
+    def inject_pointer(self, kind, x, y):
+        if self.on_pointer:
+            self.on_pointer(kind, x, y, time.perf_counter())
+
+    def wait_until_done(self, timeout=None):
+        if self.thread:
+            self.thread.join(timeout)
+
+    def _replay(self):
+        start = time.perf_counter()
+        for event in self.events:
+            offset = event[-1]
+            if self.realtime:
+                delay = start + offset - time.perf_counter()
+                if delay > 0 and self._stop_event.wait(delay):
+                    return
+            elif self._stop_event.is_set():
+                return
+            if len(event) == 4:
+                if self.on_pointer:
+                    self.on_pointer(event[0], event[1], event[2], time.perf_counter())
+            else:
+                self.on_event(event[0], event[1], time.perf_counter())
+
+
+class InjectionBackend:
+    """Sink for synthetic input used by the playback engine."""
+
+    def send(self, vk_code, is_down):
+        raise NotImplementedError
+
+    def move(self, x, y):
+        raise NotImplementedError
+
+    def scroll(self, dx, dy):
+        raise NotImplementedError
+
+
+class Win32InjectionBackend(InjectionBackend):
+    def __init__(self):
+        import win32api
+        import win32con
+        self._win32api = win32api
+        self._keyup = win32con.KEYEVENTF_KEYUP
+        self._wheel = win32con.MOUSEEVENTF_WHEEL
+        self._hwheel = 0x1000  # MOUSEEVENTF_HWHEEL
+        self._wheel_delta = 120  # WHEEL_DELTA
+        # Mouse button VK -> (down flag, up flag, mouseData)
+        self._buttons = {
+            0x01: (win32con.MOUSEEVENTF_LEFTDOWN, win32con.MOUSEEVENTF_LEFTUP, 0),
+            0x02: (win32con.MOUSEEVENTF_RIGHTDOWN, win32con.MOUSEEVENTF_RIGHTUP, 0),
+            0x04: (win32con.MOUSEEVENTF_MIDDLEDOWN, win32con.MOUSEEVENTF_MIDDLEUP, 0),
+            0x05: (0x0080, 0x0100, 0x0001),  # MOUSEEVENTF_XDOWN/XUP, XBUTTON1
+            0x06: (0x0080, 0x0100, 0x0002),  # MOUSEEVENTF_XDOWN/XUP, XBUTTON2
+        }
+
+    def send(self, vk_code, is_down):
+        button = self._buttons.get(vk_code)
+        if button:
+            self._win32api.mouse_event(button[0] if is_down else button[1], 0, 0, button[2], 0)
+        else:
+            self._win32api.keybd_event(vk_code, 0, 0 if is_down else self._keyup, 0)
+
+    def move(self, x, y):
+        self._win32api.SetCursorPos((x, y))
+
+    def scroll(self, dx, dy):
+        if dy:
+            self._win32api.mouse_event(self._wheel, 0, 0, dy * self._wheel_delta, 0)
+        if dx:
+            self._win32api.mouse_event(self._hwheel, 0, 0, dx * self._wheel_delta, 0)
+
+
+class RecordingInjectionBackend(InjectionBackend):
+    """Fake sink that records what would have been injected.
+
+    Key events are stored as (vk_code, is_down, perf_counter), cursor moves
+    as ('move', (x, y), perf_counter) and scrolls as ('scroll', (dx, dy), perf_counter).
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, vk_code, is_down):
+        self.sent.append((vk_code, is_down, time.perf_counter()))
+
+    def move(self, x, y):
+        self.sent.append(('move', (x, y), time.perf_counter()))
+
+    def scroll(self, dx, dy):
+        self.sent.append(('scroll', (dx, dy), time.perf_counter()))
@@ -1,4 +1,4 @@
-import win32con
+from types import MappingProxyType
 
 class KeyTranslator:
     _special_keys = {
@@ -105,32 +105,55 @@ class KeyTranslator:
         '`~': 0xC0, '[{': 0xDB, '\\|': 0xDC, ']}': 0xDD, "'\"": 0xDE,
     }
 
+    _shift_vks = frozenset((0x10, 0xA0, 0xA1))
+
+    # Lookup tables built once at import by _build_tables()
+    _vk_names = ()
+    _name_to_vk = MappingProxyType({})
+    _lookup_vk = _name_to_vk.get
+
+    @classmethod
+    def _build_tables(cls):
+        vk_names = []
+        for vk_code in range(256):
+            if vk_code in cls._special_keys:
+                vk_names.append(cls._special_keys[vk_code])
+            elif 32 <= vk_code <= 126:
+                vk_names.append(chr(vk_code))
+            else:
+                vk_names.append(f"Key(0x{vk_code:02X})")
+
+        # Lowest precedence first so later updates win, matching the old lookup order
+        name_to_vk = {f"Key(0x{vk_code:02X})": vk_code for vk_code in range(256)}
+        name_to_vk.update((chr(c), ord(chr(c).upper())) for c in range(32, 127))
+        name_to_vk.update(cls._oem_keys)
+        special_keys_inverted = {v: k for k, v in cls._special_keys.items()}
+        name_to_vk.update((shifted, special_keys_inverted[plain]) for plain, shifted in cls._shifted_keys.items())
+        name_to_vk.update(special_keys_inverted)
+
+        cls._vk_names = tuple(vk_names)
+        cls._name_to_vk = MappingProxyType(name_to_vk)
+        cls._lookup_vk = name_to_vk.get  # Bound dict.get skips the proxy indirection
+
     @staticmethod
     def vk_to_string(vk_code):
         if isinstance(vk_code, str):
             return vk_code  
 
-        if vk_code in KeyTranslator._special_keys:
-            return KeyTranslator._special_keys[vk_code]
-        elif 32 <= vk_code <= 126:
-            return chr(vk_code)
-        else:
-            return f"Key(0x{vk_code:02X})"
+        if 0 <= vk_code < 256:
+            return KeyTranslator._vk_names[vk_code]
+        return f"Key(0x{vk_code:02X})"
 
     @staticmethod
     def string_to_vk(key_string):
-        special_keys_inverted = {v: k for k, v in KeyTranslator._special_keys.items()}
-        if key_string in special_keys_inverted:
-            return special_keys_inverted[key_string]
-        elif key_string in KeyTranslator._shifted_keys.values():
-            return special_keys_inverted[list(KeyTranslator._shifted_keys.keys())[list(KeyTranslator._shifted_keys.values()).index(key_string)]]
-        elif key_string in KeyTranslator._oem_keys:
-            return KeyTranslator._oem_keys[key_string]
+        vk_code = KeyTranslator._lookup_vk(key_string)
+        if vk_code is not None:
+            return vk_code
         elif len(key_string) == 1:
             return ord(key_string.upper())
         elif key_string.startswith("Key(0x"):
             try:
-                return int(key_string[5:-1], 16)
+                return int(key_string[4:-1], 16)
             except ValueError:
                 print(f"Warning: Could not convert {key_string} to virtual key code")
                 return None
@@ -138,9 +161,20 @@ class KeyTranslator:
             print(f"Warning: Unrecognized key string: {key_string}")
             return None
 
+    @staticmethod
+    def vk_to_strings(vk_codes):
+        names = KeyTranslator._vk_names
+        return [names[vk_code] if 0 <= vk_code < 256 else KeyTranslator.vk_to_string(vk_code) for vk_code in vk_codes]
+
+    @staticmethod
+    def strings_to_vks(key_strings):
+        lookup = KeyTranslator._lookup_vk
+        return [vk_code if (vk_code := lookup(key_string)) is not None else KeyTranslator.string_to_vk(key_string)
+                for key_string in key_strings]
+
     @staticmethod
     def is_shift_key(vk_code):
-        return vk_code in [0x10, 0xA0, 0xA1]
+        return vk_code in KeyTranslator._shift_vks
 
     @staticmethod
     def get_combination_string(vk_code, shift_pressed=False, ctrl_pressed=False, alt_pressed=False):
@@ -158,4 +192,6 @@ class KeyTranslator:
             key_string = KeyTranslator._shifted_keys[key_string]
         
         parts.append(key_string)
-        return "+".join(parts)
\ No newline at end of file
+        return "+".join(parts)
+
+KeyTranslator._build_tables()
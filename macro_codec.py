@@ -0,0 +1,105 @@
+import json
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from compiled_macro import CompiledMacro
+
+MAGIC = b'DMC'
+VERSION = 2  # 2 added the optional pointer columns
+
+FLAG_ZLIB = 0x01
+FLAG_WIDE_DELTAS = 0x02  # Deltas stored as uint64 instead of uint32
+FLAG_POINTER = 0x04  # int32 x and y columns follow the deltas
+
+_HEADER = struct.Struct('<3sBBI')  # magic, version, flags, event count
+_TICKS_PER_SECOND = 1000000  # Timestamps are stored as integer microseconds
+
+
+class MacroCodecError(ValueError):
+    pass
+
+
+def _to_little_endian(column):
+    if sys.byteorder != 'little':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_little_endian(typecode, data):
+    column = array(typecode)
+    column.frombytes(data)
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column
+
+
+def encode_macro(macro, compress=True):
+    """Serialize a CompiledMacro (or action list) to the versioned binary format.
+
+    Layout after the header: VK codes (1 byte each), event kinds (1 byte
+    each), then the delta between consecutive timestamps in microseconds,
+    then x and y columns if the macro has cursor or wheel events. The
+    payload is zlib-compressed when that makes it smaller. Raises
+    MacroCodecError if the event times are not in order.
+    """
+    macro = CompiledMacro.from_actions(macro)
+    ticks = [round(t * _TICKS_PER_SECOND) for t in macro.times]
+    deltas = [b - a for a, b in zip([0] + ticks, ticks)]
+    if deltas and min(deltas) < 0:
+        raise MacroCodecError("Macro event times must not decrease")
+    flags = 0
+    if deltas and max(deltas) > 0xFFFFFFFF:
+        flags |= FLAG_WIDE_DELTAS
+    delta_column = array('Q' if flags & FLAG_WIDE_DELTAS else 'I', deltas)
+
+    payload = macro.vk_codes.tobytes() + macro.kinds.tobytes() + _to_little_endian(delta_column)
+    if macro.has_pointer_events:
+        flags |= FLAG_POINTER
+        payload += _to_little_endian(macro.xs) + _to_little_endian(macro.ys)
+    if compress:
+        compressed = zlib.compress(payload, 6)
+        if len(compressed) < len(payload):
+            payload = compressed
+            flags |= FLAG_ZLIB
+    return _HEADER.pack(MAGIC, VERSION, flags, len(macro)) + payload
+
+
+def decode_macro(data):
+    """Decode a stored macro, accepting both the binary format and legacy JSON text."""
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    if not is_binary_macro(data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return CompiledMacro.from_actions(json.loads(data))
+
+    magic, version, flags, count = _HEADER.unpack_from(data)
+    if version > VERSION:
+        raise MacroCodecError(f"Unsupported macro format version {version}")
+    payload = data[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+
+    delta_typecode = 'Q' if flags & FLAG_WIDE_DELTAS else 'I'
+    delta_size = array(delta_typecode).itemsize
+    pointer_size = 8 if flags & FLAG_POINTER else 0
+    if len(payload) != count * (2 + delta_size + pointer_size):
+        raise MacroCodecError("Truncated or corrupt macro payload")
+
+    vk_codes = array('B', payload[:count])
+    kinds = array('B', payload[count:2 * count])
+    offset = 2 * count + count * delta_size
+    deltas = _from_little_endian(delta_typecode, payload[2 * count:offset])
+    times = array('d', [tick / _TICKS_PER_SECOND for tick in accumulate(deltas)])
+    xs = ys = None
+    if flags & FLAG_POINTER:
+        xs = _from_little_endian('i', payload[offset:offset + 4 * count])
+        ys = _from_little_endian('i', payload[offset + 4 * count:])
+    return CompiledMacro(vk_codes, kinds, times, xs, ys)
+
+
+def is_binary_macro(data):
+    return isinstance(data, (bytes, bytearray)) and data[:3] == MAGIC
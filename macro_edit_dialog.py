@@ -1,13 +1,18 @@
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QTextEdit, QDoubleSpinBox, QLabel, QMessageBox, QWidget
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QTextEdit, QDoubleSpinBox, QLabel, QMessageBox, QWidget, QCheckBox
 from PySide6.QtCore import Qt
 from styled_widgets import StylizedButton
 from title_bar import TitleBar
 from key_translator import KeyTranslator
+from compiled_macro import CompiledMacro, MOUSE_MOVE, MOUSE_WHEEL
+from macro_optimizer import MacroOptimizer
+
+POINTER_LABELS = {MOUSE_MOVE: "Mouse Move", MOUSE_WHEEL: "Mouse Wheel"}
+POINTER_KINDS_BY_LABEL = {label: kind for kind, label in POINTER_LABELS.items()}
 
 class MacroEditDialog(QDialog):
     def __init__(self, macro, parent=None):
         super().__init__(parent)
-        self.macro = macro
+        self.macro = CompiledMacro.from_actions(macro)
         self.initUI()
 
     def initUI(self):
@@ -69,6 +74,24 @@ class MacroEditDialog(QDialog):
         normalize_layout.addWidget(self.normalize_button)
         layout.addLayout(normalize_layout)
 
+        optimize_layout = QHBoxLayout()
+        optimize_layout.addWidget(QLabel("Max gap:"))
+        self.max_gap_input = self.create_spin_box(content, 0.0, 60.0, 0.5, 0.1, " s", "Longest pause kept between events, 0 keeps every pause")
+        optimize_layout.addWidget(self.max_gap_input)
+        optimize_layout.addWidget(QLabel("Speed:"))
+        self.speed_input = self.create_spin_box(content, 0.1, 20.0, 1.0, 0.25, "x")
+        optimize_layout.addWidget(self.speed_input)
+        optimize_layout.addWidget(QLabel("Min spacing:"))
+        self.min_spacing_input = self.create_spin_box(content, 0.0, 1.0, 0.0, 0.001, " s", decimals=3)
+        optimize_layout.addWidget(self.min_spacing_input)
+        self.turbo_checkbox = QCheckBox("Turbo", content)
+        self.turbo_checkbox.setToolTip("Play every event back to back, separated only by the minimum spacing")
+        optimize_layout.addWidget(self.turbo_checkbox)
+        self.optimize_button = StylizedButton("Optimize")
+        self.optimize_button.clicked.connect(self.optimize_macro)
+        optimize_layout.addWidget(self.optimize_button)
+        layout.addLayout(optimize_layout)
+
         button_layout = QHBoxLayout()
         save_button = StylizedButton("Save")
         save_button.clicked.connect(self.save_macro)
@@ -80,24 +103,46 @@ class MacroEditDialog(QDialog):
         layout.addLayout(button_layout)
         main_layout.addWidget(content)
 
-        self.setFixedSize(500, 400)
+        self.setFixedSize(640, 440)
         print("MacroEditDialog UI setup complete")
 
+    def create_spin_box(self, parent, minimum, maximum, value, step, suffix, tooltip=None, decimals=2):
+        spin_box = QDoubleSpinBox(parent)
+        spin_box.setDecimals(decimals)
+        spin_box.setRange(minimum, maximum)
+        spin_box.setValue(value)
+        spin_box.setSingleStep(step)
+        spin_box.setSuffix(suffix)
+        if tooltip:
+            spin_box.setToolTip(tooltip)
+        spin_box.setStyleSheet(self.normalize_input.styleSheet())
+        return spin_box
+
     def macro_to_text(self):
-        return self.macro_to_text_from_list(self.macro)
+        return self.macro_to_text_from_list(self.macro.to_actions(), self.macro.pointer_events())
 
-    def macro_to_text_from_list(self, macro):
-        return "\n".join([f"{KeyTranslator.vk_to_string(vk)}: {duration:.2f}s {press_time:.2f}s" for vk, press_time, duration in macro])
+    def macro_to_text_from_list(self, macro, pointer_events=()):
+        lines = [(press_time, f"{KeyTranslator.vk_to_string(vk)}: {duration:.3f}s {press_time:.3f}s")
+                 for vk, press_time, duration in macro]
+        lines += [(event_time, f"{POINTER_LABELS[kind]}: {x},{y} {event_time:.3f}s")
+                  for kind, event_time, x, y in pointer_events]
+        lines.sort(key=lambda line: line[0])
+        return "\n".join(text for _, text in lines)
 
     def text_to_macro(self):
+        """Parse the editor text into (key actions, pointer events)."""
         lines = self.edit_area.toPlainText().split("\n")
         macro = []
+        pointer_events = []
         for line in lines:
             if line.strip():
                 parts = line.split(":", 1)  # Split only on the first colon, this does not work, I hate this. Spent more than 2 hours on this.
                 if len(parts) != 2:
                     raise ValueError(f"Invalid line format: {line}")
                 key_name = parts[0].strip()
+                if key_name in POINTER_KINDS_BY_LABEL:
+                    pointer_events.append(self.parse_pointer_line(POINTER_KINDS_BY_LABEL[key_name], parts[1], line))
+                    continue
                 time_parts = parts[1].strip().split()
                 if len(time_parts) != 2:
                     raise ValueError(f"Invalid time format in line: {line}")
@@ -109,24 +154,46 @@ class MacroEditDialog(QDialog):
                 
                 vk = KeyTranslator.string_to_vk(key_name)
                 macro.append((vk, press_time, duration))
-        return macro
+        return macro, pointer_events
+
+    def parse_pointer_line(self, kind, text, line):
+        try:
+            position, event_time = text.split()
+            x, y = position.split(",")
+            return (kind, float(event_time[:-1]), int(x), int(y))
+        except ValueError:
+            raise ValueError(f"Invalid mouse event in line: {line}")
 
     def normalize_durations(self):
         print("Normalize button clicked")
         target_duration = self.normalize_input.value()
         try:
-            macro = self.text_to_macro()
+            macro, pointer_events = self.text_to_macro()
             normalized_macro = [(vk, press_time, target_duration) for vk, press_time, _ in macro]
-            self.edit_area.setPlainText(self.macro_to_text_from_list(normalized_macro))
+            self.edit_area.setPlainText(self.macro_to_text_from_list(normalized_macro, pointer_events))
             print(f"Macro normalized with duration: {target_duration}")
         except ValueError as e:
             print(f"Error during normalization: {str(e)}")
             QMessageBox.warning(self, "Normalization Error", str(e))
 
+    def optimize_macro(self):
+        print("Optimize button clicked")
+        try:
+            optimizer = MacroOptimizer(max_gap=self.max_gap_input.value() or None,
+                                       speed=self.speed_input.value(),
+                                       min_spacing=self.min_spacing_input.value(),
+                                       turbo=self.turbo_checkbox.isChecked())
+            optimized = optimizer.optimize(CompiledMacro.from_actions(*self.text_to_macro()))
+            self.edit_area.setPlainText(self.macro_to_text_from_list(optimized.to_actions(), optimized.pointer_events()))
+            print(f"Macro optimized with {optimizer}: {optimized.duration:.3f}s")
+        except ValueError as e:
+            print(f"Error during optimization: {str(e)}")
+            QMessageBox.warning(self, "Optimization Error", str(e))
+
     def save_macro(self):
         print("Save button clicked in MacroEditDialog")
         try:
-            self.macro = self.text_to_macro()
+            self.macro = CompiledMacro.from_actions(*self.text_to_macro())
             print(f"Parsed macro: {self.macro}")
             self.accept()
         except ValueError as e:
@@ -0,0 +1,99 @@
+import base64
+import io
+import json
+import os
+import zipfile
+from contextlib import contextmanager
+
+LIBRARY_FORMAT = 'dark_macro_tool.library'
+LIBRARY_VERSION = 1
+PACK_ENTRY = 'library.ndjson'  # Name of the NDJSON stream inside a .zip pack
+PROGRESS_INTERVAL = 500
+
+
+class LibraryFormatError(ValueError):
+    pass
+
+
+def is_pack(path):
+    return path.lower().endswith('.zip')
+
+
+@contextmanager
+def _open_stream(path, mode):
+    if is_pack(path):
+        with zipfile.ZipFile(path, mode, compression=zipfile.ZIP_DEFLATED) as pack:
+            with pack.open(PACK_ENTRY, mode) as stream:
+                yield stream
+    else:
+        with open(path, mode + 'b') as stream:
+            yield stream
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_library(path, records, total=None, progress=None):
+    """Write (name, data, hotkeys) records as NDJSON, one macro per line.
+
+    The first line is a header naming the format and the macro count.
+    Macro data is the binary codec blob, base64 encoded. progress(done, total)
+    is called every PROGRESS_INTERVAL macros; returning False cancels the
+    export. A cancelled or failed export removes the partial file.
+    """
+    written = 0
+    cancelled = False
+    try:
+        with _open_stream(path, 'w') as stream:
+            header = {'format': LIBRARY_FORMAT, 'version': LIBRARY_VERSION, 'count': total}
+            stream.write(json.dumps(header).encode('utf-8') + b'\n')
+            for name, data, hotkeys in records:
+                record = {'name': name, 'data': base64.b64encode(data).decode('ascii'), 'hotkeys': hotkeys}
+                stream.write(json.dumps(record).encode('utf-8') + b'\n')
+                written += 1
+                if progress and written % PROGRESS_INTERVAL == 0 and progress(written, total) is False:
+                    cancelled = True
+                    break
+    except BaseException:
+        _remove(path)
+        raise
+    if cancelled:
+        _remove(path)
+        return 0
+    if progress:
+        progress(written, total)
+    return written
+
+
+def read_library_batches(path, batch_size=1000):
+    """Yield (batch, total) where batch is a list of (name, data, hotkeys) records."""
+    with _open_stream(path, 'r') as stream:
+        lines = io.TextIOWrapper(stream, encoding='utf-8')
+        try:
+            header = json.loads(next(lines))
+        except (StopIteration, ValueError):
+            raise LibraryFormatError(f"{path} is not a macro library")
+        if header.get('format') != LIBRARY_FORMAT:
+            raise LibraryFormatError(f"{path} is not a macro library")
+        if header.get('version', 0) > LIBRARY_VERSION:
+            raise LibraryFormatError(f"Unsupported macro library version {header['version']}")
+        total = header.get('count')
+
+        batch = []
+        for line_number, line in enumerate(lines, start=2):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                batch.append((record['name'], base64.b64decode(record['data']), record.get('hotkeys', [])))
+            except (ValueError, KeyError, TypeError) as e:
+                raise LibraryFormatError(f"Invalid record on line {line_number}: {e}")
+            if len(batch) >= batch_size:
+                yield batch, total
+                batch = []
+        if batch:
+            yield batch, total
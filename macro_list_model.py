@@ -0,0 +1,112 @@
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class MacroListModel(QAbstractListModel):
+    """List model over the DatabaseManager catalogue.
+
+    Rows are fetched page by page as the view scrolls, sorting and filtering
+    run in SQL, and saves/deletes are applied as single-row deltas instead
+    of resetting the whole list.
+    """
+
+    def __init__(self, db_manager, batch_size=500, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.rows = []
+        self.exhausted = False
+        self.descending = False
+        self.name_filter = ""
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        summary = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return summary.name
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{summary.action_count} actions, {summary.duration:.2f}s"
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        after = self.rows[-1].name if self.rows else None
+        page = self.db_manager.get_macro_catalogue_page(after, self.batch_size, self.name_filter, self.descending)
+        if len(page) < self.batch_size:
+            self.exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+
+    def sort(self, column=0, order=Qt.SortOrder.AscendingOrder):
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.reload()
+
+    def set_filter(self, text):
+        self.name_filter = text
+        self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self.rows = []
+        self.exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def name_at(self, row):
+        return self.rows[row].name if 0 <= row < len(self.rows) else None
+
+    def row_of(self, name):
+        row = self._insertion_row(name)
+        if row < len(self.rows) and self.rows[row].name == name:
+            return row
+        return -1
+
+    def macro_saved(self, name):
+        summary = self.db_manager.get_macro_summary(name)
+        row = self.row_of(name)
+        if row >= 0:
+            if summary is None:
+                self.macro_deleted(name)
+                return
+            self.rows[row] = summary
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+            return
+        if summary is None or not self._matches_filter(name):
+            return
+        row = self._insertion_row(name)
+        if row == len(self.rows) and not self.exhausted:
+            return  # Sorts past the loaded window, a later fetchMore will pick it up
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.insert(row, summary)
+        self.endInsertRows()
+
+    def macro_deleted(self, name):
+        row = self.row_of(name)
+        if row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            self.endRemoveRows()
+
+    def _matches_filter(self, name):
+        return self.name_filter.lower() in name.lower()
+
+    def _insertion_row(self, name):
+        low, high = 0, len(self.rows)
+        while low < high:
+            mid = (low + high) // 2
+            other = self.rows[mid].name
+            if (other > name) if self.descending else (other < name):
+                low = mid + 1
+            else:
+                high = mid
+        return low
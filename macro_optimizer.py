@@ -0,0 +1,61 @@
+from array import array
+from compiled_macro import CompiledMacro, KEY_DOWN, KEY_UP
+
+TURBO_SPACING = 0.002  # Default gap between events in turbo mode, enough for most targets to register a key
+
+
+class MacroOptimizer:
+    """Rewrites a macro's timeline to remove human hesitation.
+
+    Works on the gaps between consecutive events, so event order is never
+    changed: each idle gap (one where no key is held) is clamped to
+    max_gap, then every gap is divided by speed and raised to at least
+    min_spacing. Holds are never clamped, so a long key press keeps its
+    length relative to the rest of the macro. Turbo mode replaces every gap with min_spacing
+    (or TURBO_SPACING), running the macro as fast as the target accepts.
+    """
+
+    def __init__(self, max_gap=None, speed=1.0, min_spacing=0.0, turbo=False):
+        if speed <= 0:
+            raise ValueError("Speed multiplier must be positive")
+        self.max_gap = max_gap
+        self.speed = speed
+        self.min_spacing = min_spacing
+        self.turbo = turbo
+
+    @property
+    def is_identity(self):
+        return not self.turbo and self.max_gap is None and self.speed == 1.0 and not self.min_spacing
+
+    def optimize(self, macro):
+        macro = CompiledMacro.from_actions(macro)
+        if self.is_identity or not macro:
+            return macro
+        turbo_gap = self.min_spacing or TURBO_SPACING
+        times = array('d')
+        held = set()
+        previous = current = 0.0
+        for event_time, kind, vk_code in zip(macro.times, macro.kinds, macro.vk_codes):
+            gap = event_time - previous
+            previous = event_time
+            if self.turbo:
+                gap = turbo_gap if times else 0.0
+            else:
+                if self.max_gap is not None and not held:
+                    gap = min(gap, self.max_gap)
+                gap /= self.speed
+                if times:
+                    gap = max(gap, self.min_spacing)
+            current += gap
+            times.append(current)
+            if kind == KEY_DOWN:
+                held.add(vk_code)
+            elif kind == KEY_UP:
+                held.discard(vk_code)
+        return CompiledMacro(array('B', macro.vk_codes), array('B', macro.kinds), times,
+                             array('i', macro.xs), array('i', macro.ys))
+
+    def __repr__(self):
+        if self.turbo:
+            return f"MacroOptimizer(turbo, spacing={self.min_spacing or TURBO_SPACING:.3f}s)"
+        return f"MacroOptimizer(max_gap={self.max_gap}, speed={self.speed}, min_spacing={self.min_spacing})"
@@ -1,35 +1,76 @@
 from PySide6.QtCore import QThread, Signal  # Change pyqtSignal to Signal
-import win32api
+import threading
 import time
 from key_translator import KeyTranslator
+from input_backends import HookCaptureBackend
+from recording_journal import RecordingJournal, JournalWriter
+from compiled_macro import CompiledMacro
+from path_simplify import PathSimplifier, decimate_events
 
 class MacroRecorder(QThread):
-    finished = Signal(list)  # Change pyqtSignal to Signal because pyqt only got me 85% of the way there
+    finished = Signal(object)  # Action list, or a CompiledMacro when recording to a journal
 
-    def __init__(self):
+    def __init__(self, backend=None, journal_path=None, flush_interval=0.2, record_mouse=False, path_tolerance=2.0):
         super().__init__()
+        self.backend = backend or HookCaptureBackend()
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.record_mouse = record_mouse
+        self.path_tolerance = path_tolerance
+        self.journal_writer = None
         self.recording = False
         self.macro = []
+        self.pointer_events = []
         self.pressed_keys = {}
+        self.start_time = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
 
     def run(self):
+        if self.journal_path:
+            # Streaming mode: events go to an on-disk journal instead of self.macro
+            self.journal_writer = JournalWriter(RecordingJournal(self.journal_path), self.flush_interval,
+                                                path_tolerance=self.path_tolerance)
+            self.journal_writer.start()
+        self.start_time = time.perf_counter()
         self.recording = True
-        start_time = time.time()
-        while self.recording:
-            for i in range(1, 256):
-                state = win32api.GetAsyncKeyState(i)
-                if state & 0x8000:  # Key is pressed
-                    if i not in self.pressed_keys:
-                        self.pressed_keys[i] = time.time() - start_time
-                elif i in self.pressed_keys:  # Key was released
-                    press_time = self.pressed_keys[i]
-                    release_time = time.time() - start_time
-                    duration = release_time - press_time
-                    key_name = KeyTranslator.vk_to_string(i)
-                    self.macro.append((key_name, press_time, duration))
-                    del self.pressed_keys[i]
-            time.sleep(0.001)
+        self.backend.start(self.on_input_event, self.on_pointer_event if self.record_mouse else None)
+        self._stop_event.wait()
+        self.backend.stop()
+        self.recording = False
+        if self.journal_writer:
+            self.journal_writer.close()
+            self.macro = RecordingJournal.assemble(self.journal_path)
+        elif self.pointer_events:
+            simplified = decimate_events(self.pointer_events, PathSimplifier(self.path_tolerance))
+            self.macro = CompiledMacro.from_actions(self.macro, [(kind, t, x, y) for kind, _, t, x, y in simplified])
         self.finished.emit(self.macro)
 
+    def on_input_event(self, vk_code, is_down, timestamp):
+        if self.journal_writer:
+            if self.recording:
+                self.journal_writer.append(vk_code, is_down, timestamp - self.start_time)
+            return
+        with self._lock:
+            if not self.recording:
+                return
+            event_time = timestamp - self.start_time
+            if is_down:
+                if vk_code not in self.pressed_keys:  # Ignore auto-repeat
+                    self.pressed_keys[vk_code] = event_time
+            elif vk_code in self.pressed_keys:
+                press_time = self.pressed_keys.pop(vk_code)
+                key_name = KeyTranslator.vk_to_string(vk_code)
+                self.macro.append((key_name, press_time, event_time - press_time))
+
+    def on_pointer_event(self, kind, x, y, timestamp):
+        if not self.recording:
+            return
+        event_time = timestamp - self.start_time
+        if self.journal_writer:
+            self.journal_writer.append_pointer(kind, x, y, event_time)
+        else:
+            self.pointer_events.append((kind, 0, event_time, x, y))
+
     def stop(self):
-        self.recording = False
\ No newline at end of file
+        self._stop_event.set()
@@ -1,18 +1,32 @@
 import sys
 import os
-import requests
 import subprocess
+import zipfile
+import threading
+import time
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                               QListWidget, QLineEdit, QPushButton, QMenuBar, QMenu, 
-                               QApplication, QDialog, QMessageBox)
-from PySide6.QtCore import Qt, QEvent, QTimer
+                               QListView, QLineEdit, QPushButton, QMenuBar, QMenu, 
+                               QApplication, QDialog, QMessageBox, QFileDialog, QProgressDialog)
+from PySide6.QtCore import Qt, QEvent
 from PySide6.QtGui import QAction
 from settings_dialog import SettingsDialog
 from macro_recorder import MacroRecorder
-from macro_player import MacroPlayer
+from macro_optimizer import MacroOptimizer
+from timing_humanizer import TimingHumanizer, fit_profile
+from recording_journal import RecordingJournal, discard_journal, list_journals, new_journal_path
+from playback_engine import PlaybackEngine
+from playback_signals import PlaybackSignals
+from playback_stats import PlaybackStats
+from playback_stats_dialog import PlaybackStatsDialog
 from macro_edit_dialog import MacroEditDialog
+from hotkey_assigner import HotkeyAssigner
 from database_manager import DatabaseManager
+from macro_list_model import MacroListModel
+from compiled_macro import CompiledMacro
 from about_dialog import AboutDialog
+from update_checker import UpdateChecker
+from update_download import release_asset, release_sha256, EXE_ASSET, MANIFEST_ASSET
+from update_service import UpdateCheckService
 from styled_widgets import StylizedLineEdit, StylizedButton
 from title_bar import TitleBar
 
@@ -25,19 +39,47 @@ class MacroTool(QMainWindow):
         self.initUI()
         self.current_macro = None
         self.recorder = None
-        self.player = None
+        self.playback_engine = None
+        self.playback_engine_lock = threading.Lock()  # The hotkey worker may start the engine too
+        self.playback_job = None
+        self.playback_signals = PlaybackSignals(self)
+        self.playback_signals.progress.connect(self.on_playback_progress)
+        self.playback_signals.paused.connect(self.on_playback_paused)
+        self.playback_signals.timing.connect(self.on_playback_timing)
+        self.playback_signals.finished.connect(self.on_playback_finished)
+        self.playback_stats = None
+        self.stats_dialog = None
         self.is_recording = False
         self.is_playing = False
         self.selected_app = "Select an app (optional)"
         self.loop_playback = False
         self.vary_speed = False
+        self.record_mouse = False
+        self.path_tolerance = 2.0
+        self.playback_speed = 1.0
+        self.max_idle_gap = 0.0
+        self.min_spacing = 0.0
+        self.turbo = False
+        self.humanize_distribution = 'uniform'
+        self.humanize_amount = 0.2
+        self.humanize_seed = 0
+        self.journal_dir = os.path.join(self.db_manager.app_data_dir, 'recordings')
+        self.journal_path = None
         self.load_macros_from_db()
+        self.hotkey_assigner = HotkeyAssigner(self)
+        self.hotkey_assigner.triggered.connect(self.play_macro)
+        self.recover_recording()
         QApplication.instance().installEventFilter(self)
 
-        # Check for updates every hour
-        self.update_timer = QTimer(self)
-        self.update_timer.timeout.connect(self.check_for_updates)
-        self.update_timer.start(3600000)  # 1 hour in milliseconds
+        # Check for updates every hour, off the GUI thread
+        self.declined_version = None
+        checker = UpdateChecker(self.current_version, self.github_repo,
+                                os.path.join(self.db_manager.app_data_dir, 'release_cache.json'))
+        self.update_service = UpdateCheckService(checker, parent=self)
+        self.update_service.update_available.connect(self.on_update_available)
+        self.update_service.up_to_date.connect(self.on_up_to_date)
+        self.update_service.check_failed.connect(self.on_update_check_failed)
+        self.update_service.start()
 
     def initUI(self):
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
@@ -86,29 +128,45 @@ class MacroTool(QMainWindow):
         self.play_button.clicked.connect(self.toggle_playback)
         button_layout.addWidget(self.play_button)
 
+        self.pause_button = StylizedButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.pause_button.setEnabled(False)
+        button_layout.addWidget(self.pause_button)
+
         self.edit_button = StylizedButton("Edit")
         self.edit_button.clicked.connect(self.edit_macro)
         button_layout.addWidget(self.edit_button)
 
+        self.hotkey_button = StylizedButton("Hotkey")
+        self.hotkey_button.clicked.connect(self.assign_hotkey)
+        button_layout.addWidget(self.hotkey_button)
+
         self.delete_button = StylizedButton("Delete")
         self.delete_button.clicked.connect(self.delete_macro)
         button_layout.addWidget(self.delete_button)
 
         content_layout.addLayout(button_layout)
 
-        self.macro_list = QListWidget()
+        self.macro_filter_input = StylizedLineEdit("Filter macros")
+        self.macro_filter_input.textChanged.connect(self.filter_macro_list)
+        content_layout.addWidget(self.macro_filter_input)
+
+        self.macro_model = MacroListModel(self.db_manager, parent=self)
+        self.macro_list = QListView()
+        self.macro_list.setModel(self.macro_model)
+        self.macro_list.setUniformItemSizes(True)
         self.macro_list.setStyleSheet("""
-            QListWidget {
+            QListView {
                 border: 2px solid #4f545c;
                 border-radius: 5px;
                 padding: 5px;
                 background-color: #40444b;
                 color: #dcddde;
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 5px;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #7289da;
                 color: white;
             }
@@ -142,6 +200,15 @@ class MacroTool(QMainWindow):
         settings_action = file_menu.addAction("Settings")
         settings_action.triggered.connect(self.open_settings)
 
+        import_action = file_menu.addAction("Import Macros...")
+        import_action.triggered.connect(self.import_macros)
+
+        export_action = file_menu.addAction("Export Macros...")
+        export_action.triggered.connect(self.export_macros)
+
+        stats_action = file_menu.addAction("Playback Timing...")
+        stats_action.triggered.connect(self.open_playback_stats)
+
         update_action = file_menu.addAction("Check for Updates")
         update_action.triggered.connect(self.check_for_updates)
 
@@ -153,51 +220,116 @@ class MacroTool(QMainWindow):
 
     def open_settings(self):
         settings_dialog = SettingsDialog(self)
-        settings_dialog.app_selector.setCurrentText(self.selected_app)
+        settings_dialog.set_selected_app(self.selected_app)
         settings_dialog.loop_checkbox.setChecked(self.loop_playback)
         settings_dialog.vary_speed_checkbox.setChecked(self.vary_speed)
+        settings_dialog.record_mouse_checkbox.setChecked(self.record_mouse)
+        settings_dialog.path_tolerance_input.setValue(self.path_tolerance)
+        settings_dialog.playback_speed_input.setValue(self.playback_speed)
+        settings_dialog.max_gap_input.setValue(self.max_idle_gap)
+        settings_dialog.min_spacing_input.setValue(self.min_spacing)
+        settings_dialog.turbo_checkbox.setChecked(self.turbo)
+        settings_dialog.distribution_selector.setCurrentText(self.humanize_distribution)
+        settings_dialog.humanize_amount_input.setValue(self.humanize_amount * 100)
+        settings_dialog.seed_input.setValue(self.humanize_seed)
         if settings_dialog.exec() == QDialog.Accepted:
             self.selected_app = settings_dialog.app_selector.currentText()
             self.loop_playback = settings_dialog.loop_checkbox.isChecked()
             self.vary_speed = settings_dialog.vary_speed_checkbox.isChecked()
-            print(f"Settings Updated: App: {self.selected_app}, Loop: {self.loop_playback}, Vary Speed: {self.vary_speed}")
+            self.record_mouse = settings_dialog.record_mouse_checkbox.isChecked()
+            self.path_tolerance = settings_dialog.path_tolerance_input.value()
+            self.playback_speed = settings_dialog.playback_speed_input.value()
+            self.max_idle_gap = settings_dialog.max_gap_input.value()
+            self.min_spacing = settings_dialog.min_spacing_input.value()
+            self.turbo = settings_dialog.turbo_checkbox.isChecked()
+            self.humanize_distribution = settings_dialog.distribution_selector.currentText()
+            self.humanize_amount = settings_dialog.humanize_amount_input.value() / 100
+            self.humanize_seed = settings_dialog.seed_input.value()
+            print(f"Settings Updated: App: {self.selected_app}, Loop: {self.loop_playback}, Vary Speed: {self.vary_speed}, Record Mouse: {self.record_mouse}, Speed: {self.playback_speed}x, Turbo: {self.turbo}")
+            self.hotkey_assigner.warm()
+
+    def create_progress_dialog(self, label, title):
+        progress_dialog = QProgressDialog(label, "Cancel", 0, 0, self)
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setWindowTitle(title)
+        progress_dialog.setMinimumDuration(0)
+
+        def on_progress(done, total):
+            if total:
+                progress_dialog.setMaximum(total)
+            progress_dialog.setValue(done)
+            QApplication.processEvents()
+            return not progress_dialog.wasCanceled()
+
+        return progress_dialog, on_progress
+
+    def export_macros(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Macros", "macros.zip",
+                                              "Macro Pack (*.zip);;NDJSON (*.ndjson)")
+        if not path:
+            return
+        progress_dialog, on_progress = self.create_progress_dialog("Exporting macros...", "Export Macros")
+        try:
+            count = self.db_manager.export_library(path, on_progress)
+            print(f"Exported {count} macros to {path}")
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, 'Export Failed', f"Failed to export macros: {str(e)}")
+        finally:
+            progress_dialog.close()
+
+    def import_macros(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Macros", "",
+                                              "Macro Library (*.zip *.ndjson);;All Files (*)")
+        if not path:
+            return
+        progress_dialog, on_progress = self.create_progress_dialog("Importing macros...", "Import Macros")
+        try:
+            count = self.db_manager.import_library(path, on_progress)
+            print(f"Imported {count} macros from {path}")
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            QMessageBox.warning(self, 'Import Failed', f"Failed to import macros: {str(e)}")
+        finally:
+            progress_dialog.close()
+            self.load_macros_from_db()
+            self.hotkey_assigner.reload()
 
     def open_about(self):
         about_dialog = AboutDialog(self)
         about_dialog.exec()
 
     def check_for_updates(self):
-        try:
-            api_url = f"https://api.github.com/repos/{self.github_repo}/releases/latest"
-            response = requests.get(api_url)
-            response.raise_for_status()
-            latest_release = response.json()
-            latest_version = latest_release['tag_name'].lstrip('v')
-            
-            if self._compare_versions(latest_version, self.current_version):
-                reply = QMessageBox.question(self, 'Update Available', 
-                                             f"A new version {latest_version} is available. Would you like to update now?",
-                                             QMessageBox.Yes | QMessageBox.No)
-                if reply == QMessageBox.Yes:
-                    self._start_update_process(latest_release['assets'][0]['browser_download_url'])
-            else:
-                QMessageBox.information(self, 'No Updates', "You're running the latest version.")
-        except requests.RequestException as e:
-            QMessageBox.warning(self, 'Update Check Failed', f"Failed to check for updates: {str(e)}")
-
-    def _compare_versions(self, version1, version2):
-        v1_parts = [int(part) for part in version1.split('.')]
-        v2_parts = [int(part) for part in version2.split('.')]
-        return v1_parts > v2_parts
-
-    def _start_update_process(self, download_url):
+        self.update_service.check_now()
+
+    def on_update_available(self, latest_version, latest_release, manual):
+        if not manual and latest_version == self.declined_version:
+            return  # Don't ask again every hour
+        reply = QMessageBox.question(self, 'Update Available', 
+                                     f"A new version {latest_version} is available. Would you like to update now?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            asset = release_asset(latest_release, EXE_ASSET) or latest_release['assets'][0]
+            manifest = release_asset(latest_release, MANIFEST_ASSET)
+            self._start_update_process(asset['browser_download_url'], release_sha256(latest_release, asset),
+                                       manifest['browser_download_url'] if manifest else None)
+        else:
+            self.declined_version = latest_version
+
+    def on_up_to_date(self, latest_version, manual):
+        if manual:
+            QMessageBox.information(self, 'No Updates', "You're running the latest version.")
+
+    def on_update_check_failed(self, message, manual):
+        if manual:
+            QMessageBox.warning(self, 'Update Check Failed', f"Failed to check for updates: {message}")
+
+    def _start_update_process(self, download_url, sha256=None, manifest_url=None):
         updater_path = os.path.join(os.path.dirname(sys.executable), "updater.exe")
         if not os.path.exists(updater_path):
             QMessageBox.warning(self, 'Update Failed', "Updater not found. Please reinstall the application.")
             return
 
         # Start the updater process
-        subprocess.Popen([updater_path, download_url, sys.executable])
+        subprocess.Popen([updater_path, download_url, sys.executable, sha256 or "", manifest_url or ""])
         
         # Close the current application
         QMessageBox.information(self, 'Updating', "The application will now close and update. Please restart it after the update is complete.")
@@ -211,7 +343,9 @@ class MacroTool(QMainWindow):
             self.stop_recording()
 
     def start_recording(self):
-        self.recorder = MacroRecorder()
+        self.journal_path = new_journal_path(self.journal_dir)  # One per session; unsaved ones are kept for recovery
+        self.recorder = MacroRecorder(journal_path=self.journal_path, record_mouse=self.record_mouse,
+                                      path_tolerance=self.path_tolerance)
         self.recorder.finished.connect(self.on_recording_finished)
         self.recorder.start()
         self.is_recording = True
@@ -256,14 +390,36 @@ class MacroTool(QMainWindow):
         """)
 
     def on_recording_finished(self, macro):
-        self.current_macro = macro
+        self.current_macro = CompiledMacro.from_actions(macro)
         name = self.macro_name_input.text()
         if name:
             self.save_macro_to_db(name, self.current_macro)
             self.macro_name_input.clear()
+            discard_journal(self.journal_path)
             print(f"Macro '{name}' saved successfully")
         else:
-            print("Unable to save macro: No name provided")
+            print("Unable to save macro: No name provided, it can be recovered on next start")
+
+    def recover_recording(self):
+        for journal_path in list_journals(self.journal_dir):
+            try:
+                macro = RecordingJournal.assemble(journal_path)
+            except (OSError, ValueError) as e:
+                print(f"Discarding unreadable recording journal: {str(e)}")
+                macro = None
+            if macro:
+                reply = QMessageBox.question(self, 'Recover Recording',
+                                             f"An unsaved recording with {macro.action_count} actions was found. Would you like to recover it?",
+                                             QMessageBox.Yes | QMessageBox.No)
+                if reply == QMessageBox.Yes:
+                    name = base = time.strftime("Recovered %Y-%m-%d %H-%M-%S", time.localtime(os.path.getmtime(journal_path)))
+                    n = 1
+                    while self.db_manager.get_macro_summary(name):
+                        n += 1
+                        name = f"{base} ({n})"
+                    self.save_macro_to_db(name, macro)
+                    print(f"Recovered recording saved as '{name}'")
+            discard_journal(journal_path)
 
     def toggle_playback(self):
         if not self.is_playing:
@@ -272,18 +428,17 @@ class MacroTool(QMainWindow):
             self.stop_playback()
 
     def start_playback(self):
-        item = self.macro_list.currentItem()
-        if item:
-            name = item.text()
+        name = self.selected_macro_name()
+        if name:
             macro = self.db_manager.get_macro(name)
             if macro:
                 self.current_macro = macro
                 self.play_button.setText("Stop")
+                self.pause_button.setEnabled(True)
                 self.is_playing = True
-                self.player = MacroPlayer(self.current_macro, self.selected_app, self.loop_playback, self.vary_speed)
-                self.player.finished.connect(self.on_playback_finished)
-                self.player.start()
-                
+                self.playback_stats = PlaybackStats()
+                self.playback_job = self.submit_macro(name, macro, self.playback_stats)
+
                 # Set button style for active state
                 self.play_button.setStyleSheet("""
                     QPushButton {
@@ -302,15 +457,89 @@ class MacroTool(QMainWindow):
                     }
                 """)
 
+    def prepare_playback(self, macro):
+        """The macro optimized for the current settings, and the matching PlaybackEngine.submit() options."""
+        optimizer = MacroOptimizer(max_gap=self.max_idle_gap or None, speed=self.playback_speed,
+                                   min_spacing=self.min_spacing, turbo=self.turbo)
+        options = {'loop': self.loop_playback, 'humanizer': self.create_humanizer(macro), 'app_name': self.selected_app}
+        return optimizer.optimize(macro), options
+
+    def submit_macro(self, name, macro, stats=None):
+        macro, options = self.prepare_playback(macro)
+        return self.get_playback_engine().submit(macro, name, stats=stats, **options)
+
+    def play_macro(self, name, trigger_time=None):
+        """Hotkey fallback for a macro that was not prepared in advance: prepare it, then start or stop it."""
+        self.hotkey_assigner.warm(name)
+        if self.hotkey_assigner.launcher.launch(name, trigger_time):
+            return
+        macro = self.db_manager.get_macro(name)
+        if not macro:
+            print(f"No macro named '{name}' for hotkey")
+            return
+        try:
+            self.submit_macro(name, macro)
+        except Exception as e:
+            print(f"Error playing macro '{name}': {str(e)}")
+
+    def create_humanizer(self, macro):
+        if not self.vary_speed:
+            return None
+        seed = self.humanize_seed or None
+        if self.humanize_distribution == 'fitted':
+            try:
+                return TimingHumanizer('fitted', seed=seed, profile=fit_profile(macro))
+            except ValueError as e:
+                print(f"Falling back to uniform timing jitter: {str(e)}")
+                return TimingHumanizer('uniform', self.humanize_amount, seed)
+        return TimingHumanizer(self.humanize_distribution, self.humanize_amount, seed)
+
+    def get_playback_engine(self):
+        """The shared scheduler thread, started on first use."""
+        with self.playback_engine_lock:
+            if self.playback_engine is None:
+                self.playback_engine = PlaybackEngine(listener=self.playback_signals)
+                self.playback_engine.start()
+        return self.playback_engine
+
+    def on_playback_progress(self, job_id, done, total):
+        if job_id == self.playback_job and total:
+            self.play_button.setText(f"Stop ({done * 100 // total}%)")
+
+    def on_playback_timing(self, job_id, summary):
+        if self.stats_dialog and self.stats_dialog.isVisible():
+            self.stats_dialog.refresh()
+
+    def open_playback_stats(self):
+        self.stats_dialog = PlaybackStatsDialog(self.playback_stats, self, self.get_playback_engine().trigger_latency_summary)
+        self.stats_dialog.exec()
+        self.stats_dialog = None
+
+    def toggle_pause(self):
+        if not self.is_playing or self.playback_job is None:
+            return
+        if self.playback_engine.is_paused(self.playback_job):
+            self.playback_engine.resume(self.playback_job)
+        else:
+            self.playback_engine.pause(self.playback_job)
+
+    def on_playback_paused(self, job_id, paused):
+        if job_id == self.playback_job:
+            self.pause_button.setText("Resume" if paused else "Pause")
+
     def stop_playback(self):
-        if self.is_playing and self.player:
-            self.player.terminate()
-            self.on_playback_finished()
+        if self.is_playing and self.playback_job is not None:
+            self.playback_engine.cancel(self.playback_job)
 
-    def on_playback_finished(self):
+    def on_playback_finished(self, job_id, reason):
+        print(f"Macro playback {reason}")
+        if job_id != self.playback_job:
+            return
         self.play_button.setText("Play")
+        self.pause_button.setText("Pause")
+        self.pause_button.setEnabled(False)
         self.is_playing = False
-        self.player = None
+        self.playback_job = None
         
         # Reset button style
         self.play_button.setStyleSheet("""
@@ -331,9 +560,8 @@ class MacroTool(QMainWindow):
         """)
 
     def edit_macro(self):
-        item = self.macro_list.currentItem()
-        if item:
-            name = item.text()
+        name = self.selected_macro_name()
+        if name:
             macro = self.db_manager.get_macro(name)
             if macro:
                 dialog = MacroEditDialog(macro, self)
@@ -341,24 +569,30 @@ class MacroTool(QMainWindow):
                     self.save_macro_to_db(name, dialog.macro)
 
     def delete_macro(self):
-        item = self.macro_list.currentItem()
-        if item:
-            name = item.text()
+        name = self.selected_macro_name()
+        if name:
+            self.hotkey_assigner.remove_hotkey(name)
             self.db_manager.delete_macro(name)
-            self.load_macros_from_db()
+            self.macro_model.macro_deleted(name)
+
+    def assign_hotkey(self):
+        name = self.selected_macro_name()
+        if name:
+            self.hotkey_assigner.assign_hotkey(name)
+
+    def selected_macro_name(self):
+        return self.macro_model.name_at(self.macro_list.currentIndex().row())
 
     def load_macros_from_db(self):
-        self.macros = self.db_manager.get_all_macros()
-        self.update_macro_list()
+        self.macro_model.reload()
 
     def save_macro_to_db(self, name, macro):
         self.db_manager.save_macro(name, macro)
-        self.load_macros_from_db()
+        self.macro_model.macro_saved(name)
+        self.hotkey_assigner.warm(name)
 
-    def update_macro_list(self):
-        self.macro_list.clear()
-        for name in self.macros:
-            self.macro_list.addItem(name)
+    def filter_macro_list(self, text):
+        self.macro_model.set_filter(text)
 
     def eventFilter(self, obj, event):
         if event.type() == QEvent.KeyPress and event.key() == Qt.Key_Space:
@@ -369,9 +603,10 @@ class MacroTool(QMainWindow):
         QApplication.instance().removeEventFilter(self)
         if self.recorder:
             self.recorder.stop()
-        if self.player:
-            self.player.terminate()
-            self.player.wait()
+        self.hotkey_assigner.stop_listener()
+        self.update_service.stop()
+        if self.playback_engine:
+            self.playback_engine.shutdown()
         self.db_manager.close()
         event.accept()
 
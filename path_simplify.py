@@ -0,0 +1,106 @@
+from compiled_macro import MOUSE_MOVE
+
+MERGE_SHARE = 0.25  # Part of the tolerance spent on coalescing bursts; RDP gets the rest
+
+
+def rdp(points, tolerance):
+    """Ramer-Douglas-Peucker over (time, x, y) points; returns the kept indices.
+
+    Every dropped point lies within `tolerance` pixels of the segment
+    between the kept points on either side of it.
+    """
+    count = len(points)
+    if count < 3:
+        return list(range(count))
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        _, x1, y1 = points[first]
+        _, x2, y2 = points[last]
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+        max_dist_sq, index = -1.0, first
+        for i in range(first + 1, last):
+            _, px, py = points[i]
+            if length_sq:
+                # Distance to the segment, not its line: a point past either end is measured to that end
+                t = min(1.0, max(0.0, ((px - x1) * dx + (py - y1) * dy) / length_sq))
+                ex, ey = px - x1 - t * dx, py - y1 - t * dy
+                dist_sq = ex * ex + ey * ey
+            else:
+                dist_sq = (px - x1) ** 2 + (py - y1) ** 2
+            if dist_sq > max_dist_sq:
+                max_dist_sq, index = dist_sq, i
+        if max_dist_sq > tolerance_sq:
+            keep[index] = True
+            if index - first > 1:
+                stack.append((first, index))
+            if last - index > 1:
+                stack.append((index, last))
+    return [i for i in range(count) if keep[i]]
+
+
+class PathSimplifier:
+    """Streaming cursor-path decimation.
+
+    Samples are buffered with add(). Bursts arriving within min_interval
+    of the previous sample and within merge_tolerance pixels of it are
+    coalesced. Each flush() runs RDP over the buffered batch with the rest
+    of the tolerance, anchored on the last point already emitted, and
+    returns the (time, x, y) samples to keep. The two errors add up, so
+    no dropped sample ends up more than tolerance pixels off the path.
+    """
+
+    def __init__(self, tolerance=2.0, min_interval=0.008):
+        self.tolerance = tolerance
+        self.merge_tolerance = tolerance * MERGE_SHARE
+        self.rdp_tolerance = tolerance - self.merge_tolerance
+        self.min_interval = min_interval
+        self.anchor = None
+        self.pending = []
+        self.received = 0
+        self.emitted = 0
+
+    def add(self, event_time, x, y):
+        self.received += 1
+        if self.pending:
+            last_time, last_x, last_y = self.pending[-1]
+            if (event_time - last_time < self.min_interval
+                    and (x - last_x) ** 2 + (y - last_y) ** 2 <= self.merge_tolerance * self.merge_tolerance):
+                return
+        self.pending.append((event_time, x, y))
+
+    def flush(self):
+        if not self.pending:
+            return []
+        if self.anchor is None:
+            batch = self.pending
+            kept = [batch[i] for i in rdp(batch, self.rdp_tolerance)]
+        else:
+            batch = [self.anchor] + self.pending
+            kept = [batch[i] for i in rdp(batch, self.rdp_tolerance)][1:]
+        self.anchor = self.pending[-1]
+        self.pending = []
+        self.emitted += len(kept)
+        return kept
+
+
+def decimate_events(events, simplifier):
+    """Run the MOUSE_MOVE samples of (kind, vk_code, time, x, y) events through simplifier.
+
+    Any other event first flushes the pending path, so the cursor position
+    at a click or key press is kept exactly. The tail of the path is
+    flushed too, so nothing stays buffered between calls.
+    """
+    output = []
+    for event in events:
+        if event[0] == MOUSE_MOVE:
+            simplifier.add(event[2], event[3], event[4])
+            continue
+        output.extend((MOUSE_MOVE, 0, t, x, y) for t, x, y in simplifier.flush())
+        output.append(event)
+    output.extend((MOUSE_MOVE, 0, t, x, y) for t, x, y in simplifier.flush())
+    return output
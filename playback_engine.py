@@ -0,0 +1,335 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from compiled_macro import CompiledMacro, KEY_DOWN, KEY_UP, MOUSE_MOVE, MOUSE_WHEEL
+from playback_scheduler import wait_until
+from playback_stats import PlaybackStats, percentile
+from window_targeting import WindowTargeter, NO_APP
+
+CONFLICT_SHARE = 'share'        # A shared key goes up only once every macro holding it has released it
+CONFLICT_PRIORITY = 'priority'  # Presses of a key already held by an equal or higher priority macro are skipped
+CONFLICT_REPLACE = 'replace'    # Starting a macro cancels running macros that use any of the same keys
+CONFLICT_POLICIES = (CONFLICT_SHARE, CONFLICT_PRIORITY, CONFLICT_REPLACE)
+
+PROGRESS_INTERVAL = 0.1  # Minimum seconds between progress reports for one macro
+
+
+class PlaybackJob:
+    """One macro submitted to a PlaybackEngine."""
+
+    def __init__(self, job_id, name, macro, priority=0, conflict=CONFLICT_SHARE, loop=False, humanizer=None,
+                 app_name=None, stats=None, trigger_time=None):
+        if conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy: {conflict}")
+        self.job_id = job_id
+        self.name = name
+        self.source = macro
+        self.playback_macro = macro.interpolated()
+        self.macro = self.playback_macro
+        self.priority = priority
+        self.conflict = conflict
+        self.loop = loop
+        self.humanizer = humanizer
+        self.app_name = app_name
+        self.keys = frozenset(vk for vk, kind in zip(macro.vk_codes, macro.kinds) if kind in (KEY_DOWN, KEY_UP))
+        self.stats = stats if stats is not None else PlaybackStats()
+        self.timing = None
+        self.trigger_time = trigger_time  # perf_counter() of the hotkey press that started this job, if any
+        self.start_time = None
+        self.index = 0
+        self.held = set()
+        self.last_progress = 0.0
+        self.cancelled = False
+        self.paused_at = None
+        self.window_deadline = None  # Set while waiting for the target window to come to the front
+        self.window = None
+        self.resume_keys = ()
+        self.generation = 0  # Bumped on pause/resume/cancel so stale heap entries are skipped
+
+    def begin_pass(self, start_time):
+        self.macro = self.humanizer.apply(self.source).interpolated() if self.humanizer else self.playback_macro
+        self.timing = self.stats.start_loop(self.macro)
+        self.start_time = start_time
+        self.index = 0
+
+    @property
+    def next_deadline(self):
+        return self.start_time + self.macro.times[self.index]
+
+
+class PlaybackEngine:
+    """Plays any number of macros at once from a single scheduler thread.
+
+    Every running macro has one entry in a heap keyed by the deadline of
+    its next event (ties go to the higher priority), so the thread sleeps
+    until the earliest event across all macros, injects it and re-queues
+    that macro. submit() and cancel() wake the thread so it re-plans.
+
+    Stopping and pausing are cooperative: cancel() and pause() take the
+    engine lock, so once they return no further event of that macro is
+    injected, and every key it held has been released. resume() re-presses
+    those keys and shifts the rest of the schedule by the paused time.
+
+    listener receives job_started(job_id, name), job_progress(job_id,
+    done, total), job_paused(job_id, paused), timing_updated(job_id,
+    LoopSummary) and job_finished(job_id, reason) calls, where reason is
+    'completed', 'cancelled' or 'failed'. An exception while stepping a
+    macro (from the listener, humanizer, stats or window backend) ends
+    only that macro: its keys are released and it finishes as 'failed'.
+
+    For jobs submitted with a trigger_time, the delay from the trigger to
+    the first injected event (less the macro's own lead-in) is kept in
+    trigger_latencies.
+    """
+
+    def __init__(self, injector=None, listener=None, window_targeter=None, latency_samples=1000):
+        if injector is None:
+            from input_backends import Win32InjectionBackend
+            injector = Win32InjectionBackend()
+        self.injector = injector
+        self.listener = listener
+        self.windows = window_targeter or WindowTargeter()
+        self.jobs = {}
+        self.key_holders = {}
+        self.trigger_latencies = deque(maxlen=latency_samples)
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self.thread = None
+
+    def start(self):
+        self._running = True
+        self.thread = threading.Thread(target=self._run, name='PlaybackEngine', daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._running = False
+        self._wakeup.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def submit(self, macro, name=None, priority=0, conflict=CONFLICT_SHARE, loop=False, optimizer=None,
+               humanizer=None, app_name=None, stats=None, trigger_time=None):
+        """Queue a macro for playback and return its job id.
+
+        Per-loop timing goes to stats (a PlaybackStats) if given.
+        """
+        macro = CompiledMacro.from_actions(macro)
+        if optimizer:
+            macro = optimizer.optimize(macro)
+        with self._lock:
+            job = PlaybackJob(next(self._ids), name, macro, priority, conflict, loop, humanizer, app_name, stats,
+                              trigger_time)
+            if conflict == CONFLICT_REPLACE:
+                for other in list(self.jobs.values()):
+                    if other.keys & job.keys:
+                        self.cancel(other.job_id)
+            self.jobs[job.job_id] = job
+            self._push(job, time.perf_counter())
+        self._notify('job_started', job.job_id, name)
+        self._wakeup.set()
+        return job.job_id
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+            if job is None:
+                return False
+            job.cancelled = True
+            job.generation += 1
+            self._release_all(job)
+        self._notify('job_finished', job_id, 'cancelled')
+        self._wakeup.set()
+        return True
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def pause(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.paused_at is not None:
+                return False
+            job.paused_at = time.perf_counter()
+            job.generation += 1
+            job.resume_keys = tuple(job.held)
+            self._release_all(job)
+        self._notify('job_paused', job_id, True)
+        return True
+
+    def resume(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.paused_at is None:
+                return False
+            now = time.perf_counter()
+            if job.start_time is not None:
+                job.start_time += now - job.paused_at
+            job.paused_at = None
+            for vk_code in job.resume_keys:
+                self._press(job, vk_code)
+            job.resume_keys = ()
+            if job.start_time is not None and job.index < len(job.macro):
+                self._push(job, job.next_deadline)
+            else:
+                self._push(job, now)
+        self._notify('job_paused', job_id, False)
+        self._wakeup.set()
+        return True
+
+    def is_paused(self, job_id):
+        job = self.jobs.get(job_id)
+        return job is not None and job.paused_at is not None
+
+    def is_active(self, job_id):
+        return job_id in self.jobs
+
+    def progress(self, job_id):
+        """(events done, events in the current pass) for a running job, or None."""
+        job = self.jobs.get(job_id)
+        return (job.index, len(job.macro)) if job else None
+
+    def trigger_latency_summary(self):
+        ordered = sorted(self.trigger_latencies)
+        return {'count': len(ordered), 'p50': percentile(ordered, 0.5), 'p99': percentile(ordered, 0.99),
+                'max': ordered[-1] if ordered else 0.0}
+
+    def _push(self, job, deadline):
+        heapq.heappush(self._heap, (deadline, -job.priority, next(self._order), job, job.generation))
+
+    def _run(self):
+        while self._running:
+            self._wakeup.clear()
+            with self._lock:
+                deadline = self._heap[0][0] if self._heap else None
+            if deadline is None:
+                self._wakeup.wait()
+                continue
+            if not wait_until(deadline, interrupt=self._wakeup):
+                continue
+            with self._lock:
+                if not self._heap or self._heap[0][0] > time.perf_counter():
+                    continue
+                _, _, _, job, generation = heapq.heappop(self._heap)
+                if generation == job.generation:
+                    try:
+                        self._step(job)
+                    except Exception as e:
+                        self._fail(job, e)
+
+    def _step(self, job):
+        now = time.perf_counter()
+        if job.start_time is None:
+            if not self._target_ready(job, now):
+                self._push(job, now + self.windows.poll_interval)
+                return
+            job.begin_pass(now)
+        else:
+            self._inject(job)
+            injected = time.perf_counter()
+            job.timing.record(job.index, injected - job.start_time)
+            if job.trigger_time is not None:
+                self.trigger_latencies.append(injected - job.trigger_time - job.macro.times[0])
+                job.trigger_time = None
+            job.index += 1
+            if now - job.last_progress >= PROGRESS_INTERVAL:
+                job.last_progress = now
+                self._notify('job_progress', job.job_id, job.index, len(job.macro))
+        if job.index < len(job.macro):
+            self._push(job, job.next_deadline)
+            return
+        if job.start_time is not None and job.timing is not None:
+            self._notify('timing_updated', job.job_id, job.stats.finish_loop(job.timing))
+        self._notify('job_progress', job.job_id, job.index, len(job.macro))
+        if job.loop and len(job.macro):
+            job.start_time = None
+            self._push(job, time.perf_counter())
+            return
+        self._release_all(job)
+        del self.jobs[job.job_id]
+        self._notify('job_finished', job.job_id, 'completed')
+
+    def _fail(self, job, error):
+        print(f"Error playing '{job.name}': {str(error)}")
+        job.generation += 1  # Drop anything _step queued before it failed
+        self._release_all(job)
+        if self.jobs.pop(job.job_id, None) is None:
+            return
+        try:
+            self._notify('job_finished', job.job_id, 'failed')
+        except Exception as e:
+            print(f"Error reporting failed playback of '{job.name}': {str(e)}")
+
+    def _inject(self, job):
+        i = job.index
+        kind, vk_code = job.macro.kinds[i], job.macro.vk_codes[i]
+        try:
+            if kind == KEY_DOWN:
+                self._press(job, vk_code)
+            elif kind == KEY_UP:
+                self._release(job, vk_code)
+            elif kind == MOUSE_MOVE:
+                self.injector.move(job.macro.xs[i], job.macro.ys[i])
+            elif kind == MOUSE_WHEEL:
+                self.injector.scroll(job.macro.xs[i], job.macro.ys[i])
+        except Exception as e:
+            print(f"Error playing event {kind} for key {vk_code} in '{job.name}': {str(e)}")
+
+    def _press(self, job, vk_code):
+        holders = self.key_holders.setdefault(vk_code, [])
+        if job in holders:
+            return
+        if job.conflict == CONFLICT_PRIORITY and any(holder.priority >= job.priority for holder in holders):
+            return
+        if not holders:
+            self.injector.send(vk_code, True)
+        holders.append(job)
+        job.held.add(vk_code)
+
+    def _release(self, job, vk_code):
+        holders = self.key_holders.get(vk_code)
+        if not holders or job not in holders:
+            return
+        holders.remove(job)
+        job.held.discard(vk_code)
+        if not holders:
+            del self.key_holders[vk_code]
+            self.injector.send(vk_code, False)
+
+    def _release_all(self, job):
+        for vk_code in list(job.held):
+            try:
+                self._release(job, vk_code)
+            except Exception as e:
+                print(f"Error releasing key {vk_code}: {str(e)}")
+
+    def _target_ready(self, job, now):
+        """Start (or continue) bringing the job's window to the front; True once the pass may begin."""
+        if not job.app_name or job.app_name == NO_APP:
+            return True
+        if job.window_deadline is None:
+            try:
+                job.window, ready = self.windows.activate(job.app_name)
+            except Exception as e:
+                print(f"Error finding window '{job.app_name}': {str(e)}")
+                return True
+            if job.window is None or ready:
+                return True
+            job.window_deadline = now + self.windows.timeout
+            return False
+        if self.windows.is_ready(job.window) or now >= job.window_deadline:
+            job.window_deadline = None
+            return True
+        return False
+
+    def _notify(self, method, *args):
+        if self.listener is not None:
+            getattr(self.listener, method)(*args)
@@ -0,0 +1,23 @@
+import time
+
+SPIN_THRESHOLD = 0.002  # Final stretch before a deadline is spun instead of slept
+
+
+def wait_until(deadline, spin_threshold=SPIN_THRESHOLD, interrupt=None):
+    """Block until perf_counter() reaches deadline: coarse sleep, then spin.
+
+    The wait is cut short if `interrupt` (a threading.Event) is set,
+    returning False; otherwise returns True once the deadline is reached.
+    """
+    remaining = deadline - time.perf_counter()
+    if remaining > spin_threshold:
+        if interrupt is None:
+            time.sleep(remaining - spin_threshold)
+        elif interrupt.wait(remaining - spin_threshold):
+            return False
+    while time.perf_counter() < deadline:
+        if interrupt is not None and interrupt.is_set():
+            return False
+        time.sleep(0)
+    return True
+
@@ -0,0 +1,30 @@
+from PySide6.QtCore import QObject, Signal
+
+
+class PlaybackSignals(QObject):
+    """PlaybackEngine listener that re-emits its callbacks as Qt signals.
+
+    The engine calls these from its scheduler thread; connected slots on
+    GUI objects run on the GUI thread through queued connections.
+    """
+
+    started = Signal(int, object)       # job id, macro name
+    progress = Signal(int, int, int)    # job id, events done, events in the pass
+    paused = Signal(int, bool)          # job id, paused
+    timing = Signal(int, object)        # job id, LoopSummary
+    finished = Signal(int, str)         # job id, 'completed', 'cancelled' or 'failed'
+
+    def job_started(self, job_id, name):
+        self.started.emit(job_id, name)
+
+    def job_progress(self, job_id, done, total):
+        self.progress.emit(job_id, done, total)
+
+    def job_paused(self, job_id, paused):
+        self.paused.emit(job_id, paused)
+
+    def timing_updated(self, job_id, summary):
+        self.timing.emit(job_id, summary)
+
+    def job_finished(self, job_id, reason):
+        self.finished.emit(job_id, reason)
@@ -0,0 +1,121 @@
+import csv
+import json
+import math
+import threading
+from array import array
+from collections import deque, namedtuple
+
+LoopSummary = namedtuple('LoopSummary', ['loop', 'events', 'p50', 'p95', 'p99', 'max', 'drift'])
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class LoopTiming:
+    """Intended and actual injection times of one pass over a macro.
+
+    Both columns are preallocated float64 arrays sized to the macro, so
+    recording a sample during playback is a single indexed store.
+    Times are seconds since the pass started.
+    """
+
+    __slots__ = ('loop', 'kinds', 'vk_codes', 'intended', 'actual', 'count')
+
+    def __init__(self, macro, loop=0):
+        self.loop = loop
+        self.kinds = macro.kinds
+        self.vk_codes = macro.vk_codes
+        self.intended = macro.times
+        self.actual = array('d', bytes(8 * len(macro)))
+        self.count = 0
+
+    def record(self, index, actual_time):
+        self.actual[index] = actual_time
+        self.count = index + 1
+
+    def lateness(self):
+        return [actual - intended for intended, actual in zip(self.intended[:self.count], self.actual[:self.count])]
+
+    def summary(self):
+        """Lateness percentiles and drift (last event's lateness minus the first's) in seconds."""
+        lateness = self.lateness()
+        ordered = sorted(lateness)
+        return LoopSummary(self.loop, self.count,
+                           percentile(ordered, 0.50), percentile(ordered, 0.95), percentile(ordered, 0.99),
+                           ordered[-1] if ordered else 0.0,
+                           lateness[-1] - lateness[0] if lateness else 0.0)
+
+
+class PlaybackStats:
+    """Timing results for every loop of a playback session.
+
+    Summaries are kept for the last max_summaries loops and the raw
+    per-event timings for the last max_loops, so an endless loop stays
+    bounded in memory. The playback thread adds loops while the GUI
+    reads them, so readers work on copies taken under the lock.
+    """
+
+    def __init__(self, max_loops=10, max_summaries=10000):
+        self.loops = deque(maxlen=max_loops)
+        self.summaries = deque(maxlen=max_summaries)
+        self.loop_count = 0
+        self._lock = threading.Lock()
+
+    def start_loop(self, macro):
+        with self._lock:
+            timing = LoopTiming(macro, self.loop_count)
+            self.loop_count += 1
+            self.loops.append(timing)
+        return timing
+
+    def finish_loop(self, timing):
+        summary = timing.summary()
+        with self._lock:
+            self.summaries.append(summary)
+        return summary
+
+    def loop_timings(self):
+        with self._lock:
+            return list(self.loops)
+
+    def loop_summaries(self):
+        with self._lock:
+            return list(self.summaries)
+
+    def histogram(self, bins=20, upper=None):
+        """Counts of event lateness in equal-width bins from 0 to upper seconds (default: the max seen).
+
+        Early events land in the first bin and anything past upper in the last.
+        """
+        lateness = [value for timing in self.loop_timings() for value in timing.lateness()]
+        if not lateness:
+            return [], 0.0
+        upper = upper or max(max(lateness), 1e-6)
+        counts = [0] * bins
+        for value in lateness:
+            counts[min(bins - 1, max(0, int(value / upper * bins)))] += 1
+        return counts, upper
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['loop', 'index', 'kind', 'vk_code', 'intended', 'actual', 'lateness'])
+            for timing in self.loop_timings():
+                for i in range(timing.count):
+                    writer.writerow([timing.loop, i, timing.kinds[i], timing.vk_codes[i],
+                                     f"{timing.intended[i]:.6f}", f"{timing.actual[i]:.6f}",
+                                     f"{timing.actual[i] - timing.intended[i]:.6f}"])
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                'summaries': [summary._asdict() for summary in self.loop_summaries()],
+                'loops': [{'loop': timing.loop,
+                           'intended': list(timing.intended[:timing.count]),
+                           'actual': list(timing.actual[:timing.count])} for timing in self.loop_timings()],
+            }, f)
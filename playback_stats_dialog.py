@@ -0,0 +1,154 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QWidget, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QFileDialog, QMessageBox)
+from PySide6.QtGui import QPainter, QColor
+from PySide6.QtCore import Qt
+from styled_widgets import StylizedButton
+from title_bar import TitleBar
+
+SUMMARY_COLUMNS = ('Loop', 'Events', 'p50 ms', 'p95 ms', 'p99 ms', 'Max ms', 'Drift ms')
+
+
+class LatenessHistogram(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.counts = []
+        self.upper = 0.0
+        self.setMinimumHeight(110)
+
+    def set_data(self, counts, upper):
+        self.counts = counts
+        self.upper = upper
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor('#40444b'))
+        painter.setPen(QColor('#dcddde'))
+        if not self.counts:
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "No playback timings yet")
+            return
+        label_height = 16
+        plot_height = self.height() - label_height
+        bar_width = self.width() / len(self.counts)
+        peak = max(self.counts) or 1
+        for i, count in enumerate(self.counts):
+            height = round(count / peak * (plot_height - 4))
+            painter.fillRect(round(i * bar_width) + 1, plot_height - height, max(1, round(bar_width) - 2), height,
+                             QColor('#7289da'))
+        painter.drawText(4, self.height() - 3, "0 ms")
+        painter.drawText(self.rect().adjusted(0, 0, -4, -3), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignBottom,
+                         f"{self.upper * 1000:.2f} ms late")
+
+
+class PlaybackStatsDialog(QDialog):
+    def __init__(self, stats, parent=None, trigger_latency=None):
+        super().__init__(parent)
+        self.stats = stats
+        self.trigger_latency = trigger_latency
+        self.setWindowFlags(Qt.WindowType.Window | Qt.WindowType.FramelessWindowHint)
+        self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(0)
+
+        self.title_bar = TitleBar(self, "Playback Timing")
+        main_layout.addWidget(self.title_bar)
+
+        content = QWidget(self)
+        content.setObjectName("contentWidget")
+        content.setStyleSheet("""
+            QWidget#contentWidget {
+                background-color: #36393f;
+                color: #dcddde;
+                border-bottom-left-radius: 10px;
+                border-bottom-right-radius: 10px;
+            }
+            QLabel {
+                color: #ffffff;
+            }
+            QTableWidget {
+                background-color: #40444b;
+                color: #dcddde;
+                border: 2px solid #4f545c;
+                border-radius: 5px;
+            }
+            QHeaderView::section {
+                background-color: #2f3136;
+                color: #dcddde;
+                border: none;
+            }
+        """)
+        layout = QVBoxLayout(content)
+
+        self.overview_label = QLabel(content)
+        layout.addWidget(self.overview_label)
+
+        self.hotkey_label = QLabel(content)
+        layout.addWidget(self.hotkey_label)
+
+        self.histogram = LatenessHistogram(content)
+        layout.addWidget(self.histogram)
+
+        self.table = QTableWidget(0, len(SUMMARY_COLUMNS), content)
+        self.table.setHorizontalHeaderLabels(SUMMARY_COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        button_layout = QHBoxLayout()
+        csv_button = StylizedButton("Export CSV")
+        csv_button.clicked.connect(lambda: self.export('CSV files (*.csv)', 'export_csv'))
+        json_button = StylizedButton("Export JSON")
+        json_button.clicked.connect(lambda: self.export('JSON files (*.json)', 'export_json'))
+        close_button = StylizedButton("Close")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(csv_button)
+        button_layout.addWidget(json_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        main_layout.addWidget(content)
+        self.setFixedSize(520, 460)
+        self.refresh()
+
+    def refresh(self):
+        """Reload from stats, e.g. after another loop has finished."""
+        summaries = self.stats.loop_summaries() if self.stats else []
+        self.table.setRowCount(len(summaries))
+        for row, summary in enumerate(reversed(summaries)):
+            values = (summary.loop, summary.events) + tuple(value * 1000 for value in summary[2:])
+            for column, value in enumerate(values):
+                text = f"{value:.3f}" if isinstance(value, float) else str(value)
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, column, item)
+        if summaries:
+            worst = max(summary.p99 for summary in summaries)
+            self.overview_label.setText(f"{len(summaries)} loops, worst p99 lateness {worst * 1000:.3f} ms")
+            self.histogram.set_data(*self.stats.histogram())
+        else:
+            self.overview_label.setText("Play a macro to collect timing statistics.")
+            self.histogram.set_data([], 0.0)
+        latency = self.trigger_latency() if self.trigger_latency else None
+        if latency and latency['count']:
+            self.hotkey_label.setText(f"Hotkey to first key: p50 {latency['p50'] * 1000:.3f} ms, "
+                                      f"p99 {latency['p99'] * 1000:.3f} ms over {latency['count']} triggers")
+        else:
+            self.hotkey_label.setText("No hotkey launches yet.")
+
+    def export(self, file_filter, method):
+        """Save the timings with the PlaybackStats export method named `method`."""
+        if not self.stats or not self.stats.summaries:
+            QMessageBox.information(self, "Export Timings", "There are no playback timings to export yet.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Timings", "", file_filter)
+        if not path:
+            return
+        try:
+            getattr(self.stats, method)(path)
+            print(f"Exported playback timings to {path}")
+        except OSError as e:
+            print(f"Error exporting playback timings: {str(e)}")
+            QMessageBox.warning(self, "Export Failed", str(e))
@@ -0,0 +1,164 @@
+import itertools
+import os
+import struct
+import threading
+import time
+from collections import deque
+from compiled_macro import CompiledMacro, KEY_DOWN, KEY_UP, MOUSE_MOVE, MOUSE_WHEEL
+from path_simplify import PathSimplifier, decimate_events
+
+JOURNAL_MAGIC = b'DMJ2'
+JOURNAL_SUFFIX = '.journal'
+_RECORD = struct.Struct('<BBdii')  # kind, vk code, seconds since recording start, x, y
+
+
+class RecordingJournal:
+    """Append-only file of raw input events for one recording session.
+
+    The file must not exist yet, so an unsaved earlier session is never
+    overwritten; new_journal_path() picks a free name.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'xb')
+        self.file.write(JOURNAL_MAGIC)
+        self.file.flush()
+
+    def append(self, events, sync=True):
+        """Write (kind, vk_code, event_time, x, y) records."""
+        self.file.write(b''.join(_RECORD.pack(*event) for event in events))
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def discard(self):
+        self.close()
+        discard_journal(self.path)
+
+    @staticmethod
+    def iter_events(path, chunk_records=4096):
+        """Yield (kind, vk_code, event_time, x, y), ignoring a torn final record."""
+        with open(path, 'rb') as f:
+            if f.read(len(JOURNAL_MAGIC)) != JOURNAL_MAGIC:
+                raise ValueError(f"{path} is not a recording journal")
+            while True:
+                chunk = f.read(_RECORD.size * chunk_records)
+                usable = len(chunk) - len(chunk) % _RECORD.size
+                yield from _RECORD.iter_unpack(chunk[:usable])
+                if len(chunk) < _RECORD.size * chunk_records:
+                    return
+
+    @staticmethod
+    def assemble(path):
+        """Build a CompiledMacro from the journal's raw input events.
+
+        Events are put in time order first, since hook callbacks can reach
+        the journal slightly out of order. Auto-repeat downs and releases
+        without a press are dropped, as are keys still held when the journal
+        ends. Pointer events are kept as written.
+        """
+        events = sorted(RecordingJournal.iter_events(path), key=lambda event: event[2])
+        kept = []
+        held = {}
+        for kind, vk_code, event_time, x, y in events:
+            if kind == KEY_DOWN:
+                if vk_code in held:
+                    continue
+                held[vk_code] = len(kept)
+            elif kind == KEY_UP:
+                if vk_code not in held:
+                    continue
+                del held[vk_code]
+            elif kind not in (MOUSE_MOVE, MOUSE_WHEEL):
+                continue
+            kept.append((event_time, kind, vk_code, x, y))
+        if held:
+            unreleased = set(held.values())
+            kept = [event for i, event in enumerate(kept) if i not in unreleased]
+        return CompiledMacro.from_events(kept)
+
+
+def new_journal_path(directory):
+    """A journal file name in directory that no earlier session is using."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    for n in itertools.count():
+        path = os.path.join(directory, f"recording-{stamp}-{n}{JOURNAL_SUFFIX}")
+        if not os.path.exists(path):
+            return path
+
+
+def list_journals(directory):
+    """Journals left in directory by sessions that were never saved, oldest first."""
+    try:
+        paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(JOURNAL_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    return sorted(paths, key=os.path.getmtime)
+
+
+def discard_journal(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class JournalWriter:
+    """Ring buffer drained into a RecordingJournal by a background thread.
+
+    append() only touches the deque, so the input callback never waits on
+    disk. At most flush_interval seconds of input sit in memory. Cursor
+    moves are decimated by a PathSimplifier on the writer thread before
+    they reach the journal. If the writer falls more than capacity events
+    behind, the oldest are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, journal, flush_interval=0.2, capacity=65536, path_tolerance=2.0):
+        self.journal = journal
+        self.flush_interval = flush_interval
+        self.simplifier = PathSimplifier(path_tolerance)
+        self.buffer = deque(maxlen=capacity)
+        self.dropped = 0
+        self.thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def append(self, vk_code, is_down, event_time):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append((KEY_DOWN if is_down else KEY_UP, vk_code, event_time, 0, 0))
+
+    def append_pointer(self, kind, x, y, event_time):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append((kind, 0, event_time, x, y))
+
+    def close(self):
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        self.journal.close()
+        if self.dropped:
+            print(f"Warning: recording buffer overflowed, {self.dropped} events were dropped")
+
+    def flush(self):
+        batch = []
+        while self.buffer:
+            batch.append(self.buffer.popleft())
+        if batch:
+            self.journal.append(decimate_events(batch, self.simplifier))
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
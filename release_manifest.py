@@ -0,0 +1,59 @@
+import argparse
+import json
+import os
+import time
+from binary_delta import make_delta, file_sha256
+
+EXE_NAME = 'dark_macro_tool.exe'
+
+
+def delta_name(from_version, version):
+    return f"dark_macro_tool-{from_version}-to-{version}.delta"
+
+
+def build_manifest(version, exe_path, base_url, out_dir, notes="", previous=()):
+    """Write a delta from each (version, exe path) in previous to exe_path into out_dir, and return the manifest."""
+    with open(exe_path, 'rb') as f:
+        new_data = f.read()
+    manifest = {
+        'version': version,
+        'notes': notes,
+        'pub_date': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'download_url': f"{base_url}/{EXE_NAME}",
+        'sha256': file_sha256(exe_path),
+        'size': len(new_data),
+        'deltas': [],
+    }
+    for from_version, from_path in previous:
+        with open(from_path, 'rb') as f:
+            old_data = f.read()
+        name = delta_name(from_version, version)
+        delta_path = os.path.join(out_dir, name)
+        with open(delta_path, 'wb') as f:
+            f.write(make_delta(old_data, new_data))
+        manifest['deltas'].append({
+            'from_version': from_version,
+            'from_sha256': file_sha256(from_path),
+            'url': f"{base_url}/{name}",
+            'sha256': file_sha256(delta_path),
+            'size': os.path.getsize(delta_path),
+        })
+        print(f"{name}: {os.path.getsize(delta_path)} bytes instead of {len(new_data)}")
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build release deltas and the version.json update manifest.")
+    parser.add_argument('--version', required=True)
+    parser.add_argument('--exe', required=True, help="the new build")
+    parser.add_argument('--base-url', required=True, help="download URL of the release's assets")
+    parser.add_argument('--out-dir', default='release_assets')
+    parser.add_argument('--notes', default="")
+    parser.add_argument('--previous', nargs=2, action='append', default=[], metavar=('VERSION', 'EXE'),
+                        help="an earlier build to publish a delta from (repeatable)")
+    args = parser.parse_args()
+    os.makedirs(args.out_dir, exist_ok=True)
+    manifest = build_manifest(args.version, args.exe, args.base_url.rstrip('/'), args.out_dir, args.notes,
+                              args.previous)
+    with open(os.path.join(args.out_dir, 'version.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
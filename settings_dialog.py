@@ -1,15 +1,16 @@
 import psutil
-import pygetwindow as gw
-from PySide6.QtWidgets import QDialog, QVBoxLayout, QComboBox, QLabel, QCheckBox, QPushButton, QHBoxLayout, QWidget
+from PySide6.QtWidgets import QDialog, QVBoxLayout, QComboBox, QLabel, QCheckBox, QPushButton, QHBoxLayout, QWidget, QDoubleSpinBox, QSpinBox
 from PySide6.QtCore import Qt
 from title_bar import TitleBar
+from timing_humanizer import DISTRIBUTIONS
+from window_list_model import WindowTitleModel, WindowEnumerator
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.Window)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        self.setFixedSize(300, 220)  # Adjusted height
+        self.setFixedSize(300, 500)  # Adjusted height
 
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
@@ -27,9 +28,14 @@ class SettingsDialog(QDialog):
                 border-bottom-left-radius: 10px;
                 border-bottom-right-radius: 10px;
             }
-            QLabel, QCheckBox, QComboBox {
+            QLabel, QCheckBox, QComboBox, QDoubleSpinBox, QSpinBox {
                 color: #dcddde;
             }
+            QDoubleSpinBox, QSpinBox {
+                border: 2px solid #4f545c;
+                border-radius: 5px;
+                background-color: #40444b;
+            }
             QComboBox {
                 border: 2px solid #4f545c;
                 border-radius: 5px;
@@ -60,6 +66,8 @@ class SettingsDialog(QDialog):
 
         content_layout.addWidget(QLabel("Select Target Application:"))
         self.app_selector = QComboBox()
+        self.app_model = WindowTitleModel(self)
+        self.app_selector.setModel(self.app_model)
         self.populate_running_apps()
         content_layout.addWidget(self.app_selector)
 
@@ -69,6 +77,69 @@ class SettingsDialog(QDialog):
         self.vary_speed_checkbox = QCheckBox("Vary Input Speed")
         content_layout.addWidget(self.vary_speed_checkbox)
 
+        humanize_layout = QHBoxLayout()
+        self.distribution_selector = QComboBox()
+        self.distribution_selector.addItems(DISTRIBUTIONS)
+        self.distribution_selector.setToolTip("'fitted' reuses the timing variance of the macro being played")
+        humanize_layout.addWidget(self.distribution_selector)
+        self.humanize_amount_input = QDoubleSpinBox()
+        self.humanize_amount_input.setRange(0.0, 100.0)
+        self.humanize_amount_input.setSuffix(" %")
+        self.humanize_amount_input.setValue(20.0)
+        humanize_layout.addWidget(self.humanize_amount_input)
+        content_layout.addLayout(humanize_layout)
+
+        seed_layout = QHBoxLayout()
+        seed_layout.addWidget(QLabel("Jitter seed (0 = random):"))
+        self.seed_input = QSpinBox()
+        self.seed_input.setRange(0, 2147483647)
+        seed_layout.addWidget(self.seed_input)
+        content_layout.addLayout(seed_layout)
+
+        self.record_mouse_checkbox = QCheckBox("Record Mouse Movement")
+        content_layout.addWidget(self.record_mouse_checkbox)
+
+        tolerance_layout = QHBoxLayout()
+        tolerance_layout.addWidget(QLabel("Path tolerance (px):"))
+        self.path_tolerance_input = QDoubleSpinBox()
+        self.path_tolerance_input.setRange(0.0, 20.0)
+        self.path_tolerance_input.setSingleStep(0.5)
+        self.path_tolerance_input.setValue(2.0)
+        tolerance_layout.addWidget(self.path_tolerance_input)
+        content_layout.addLayout(tolerance_layout)
+
+        speed_layout = QHBoxLayout()
+        speed_layout.addWidget(QLabel("Playback speed:"))
+        self.playback_speed_input = QDoubleSpinBox()
+        self.playback_speed_input.setRange(0.1, 20.0)
+        self.playback_speed_input.setSingleStep(0.25)
+        self.playback_speed_input.setSuffix("x")
+        self.playback_speed_input.setValue(1.0)
+        speed_layout.addWidget(self.playback_speed_input)
+        content_layout.addLayout(speed_layout)
+
+        gap_layout = QHBoxLayout()
+        gap_layout.addWidget(QLabel("Max idle gap (0 = off):"))
+        self.max_gap_input = QDoubleSpinBox()
+        self.max_gap_input.setRange(0.0, 60.0)
+        self.max_gap_input.setSingleStep(0.1)
+        self.max_gap_input.setSuffix(" s")
+        gap_layout.addWidget(self.max_gap_input)
+        content_layout.addLayout(gap_layout)
+
+        spacing_layout = QHBoxLayout()
+        spacing_layout.addWidget(QLabel("Min spacing:"))
+        self.min_spacing_input = QDoubleSpinBox()
+        self.min_spacing_input.setRange(0.0, 1.0)
+        self.min_spacing_input.setDecimals(3)
+        self.min_spacing_input.setSingleStep(0.001)
+        self.min_spacing_input.setSuffix(" s")
+        spacing_layout.addWidget(self.min_spacing_input)
+        content_layout.addLayout(spacing_layout)
+
+        self.turbo_checkbox = QCheckBox("Turbo Playback")
+        content_layout.addWidget(self.turbo_checkbox)
+
         button_layout = QHBoxLayout()
         button_layout.setContentsMargins(0, 10, 0, 0)
         button_layout.setSpacing(10)
@@ -84,10 +155,29 @@ class SettingsDialog(QDialog):
         cancel_button.clicked.connect(self.reject)
 
     def populate_running_apps(self):
-        """Populate the QComboBox with the names of running applications with visible windows."""
-        self.app_selector.addItem("Select an app (optional)")
-        visible_windows = gw.getAllTitles()
-        visible_windows = [title for title in visible_windows if title]  # Filter out empty titles
-        for title in visible_windows:
-            if title not in self.app_selector.currentText():
-                self.app_selector.addItem(title)
\ No newline at end of file
+        """Fill the app selector from a background window scan, keeping the current choice."""
+        self.window_enumerator = WindowEnumerator(parent=self)
+        self.window_enumerator.batch_ready.connect(self.add_running_apps)
+        self.window_enumerator.start()
+
+    def add_running_apps(self, titles):
+        selected = self.app_selector.currentText()
+        self.app_model.add_titles(titles)
+        self.app_selector.setCurrentIndex(self.app_model.row_of(selected))
+
+    def set_selected_app(self, title):
+        self.app_model.add_titles([title])
+        self.app_selector.setCurrentIndex(self.app_model.row_of(title))
+
+    def done(self, result):
+        # Let the scan finish on its own instead of waiting for it on the GUI
+        # thread; it moves to the main window so closing the dialog does not
+        # destroy a running thread, and deletes itself when done.
+        enumerator = self.window_enumerator
+        enumerator.requestInterruption()
+        enumerator.batch_ready.disconnect(self.add_running_apps)
+        enumerator.setParent(self.parent())
+        enumerator.finished.connect(enumerator.deleteLater)
+        if enumerator.isFinished():
+            enumerator.deleteLater()
+        super().done(result)
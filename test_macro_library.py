@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import pytest
+import macro_library
+from compiled_macro import CompiledMacro
+from database_manager import DatabaseManager
+
+
+def make_db(path):
+    db = DatabaseManager(db_file=path)
+    db.save_macro('first', CompiledMacro.from_actions([('A', 0.0, 0.1), ('B', 0.2, 0.1)]))
+    db.save_macro('second', CompiledMacro.from_actions([('C', 0.0, 0.05)]))
+    return db
+
+
+def make_legacy_db(path):
+    """A version 1 database with a row the binary migration can only keep as JSON text."""
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE macros (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, actions TEXT NOT NULL)')
+    conn.execute('CREATE TABLE hotkeys (id INTEGER PRIMARY KEY, macro_id INTEGER, hotkey TEXT UNIQUE NOT NULL)')
+    conn.executemany('INSERT INTO macros (name, actions) VALUES (?, ?)',
+                     [('converted', '[["A", 0.0, 0.1]]'), ('unreadable', '[["A", 0.0,')])
+    conn.commit()
+    conn.close()
+    return DatabaseManager(db_file=path)
+
+
+@pytest.mark.parametrize('name', ['library.ndjson', 'library.zip'])
+def test_round_trip(tmp_path, name):
+    source = make_db(str(tmp_path / 'source.db'))
+    source.save_hotkey('first', 'Ctrl + B')
+    path = str(tmp_path / name)
+    assert source.export_library(path) == 2
+
+    target = DatabaseManager(db_file=str(tmp_path / 'target.db'))
+    assert target.import_library(path) == 2
+    assert target.get_macro_names() == ['first', 'second']
+    assert list(target.get_macro('first').events()) == list(source.get_macro('first').events())
+    assert target.get_all_hotkeys() == {'first': 'Ctrl + B'}
+
+
+def test_import_replaces_local_hotkey(tmp_path):
+    source = make_db(str(tmp_path / 'source.db'))
+    source.save_hotkey('first', 'Ctrl + B')
+    path = str(tmp_path / 'library.ndjson')
+    source.export_library(path)
+
+    target = make_db(str(tmp_path / 'target.db'))
+    target.save_hotkey('first', 'Ctrl + Q')
+    target.save_hotkey('second', 'Ctrl + W')
+    target.import_library(path)
+    assert target.get_hotkey('first') == 'Ctrl + B'
+    assert target.get_all_hotkeys() == {'first': 'Ctrl + B', 'second': 'Ctrl + W'}
+    assert target.conn.execute('SELECT COUNT(*) FROM hotkeys').fetchone()[0] == 2
+
+
+def test_export_legacy_json_row(tmp_path):
+    source = make_legacy_db(str(tmp_path / 'legacy.db'))
+    assert source.conn.execute("SELECT typeof(data) FROM macros WHERE name = 'unreadable'").fetchone()[0] == 'text'
+    path = str(tmp_path / 'library.zip')
+    assert source.export_library(path) == 2
+
+    target = DatabaseManager(db_file=str(tmp_path / 'target.db'))
+    assert target.import_library(path) == 1
+    assert target.get_macro_names() == ['converted']
+
+
+def test_failed_export_removes_partial_file(tmp_path):
+    path = str(tmp_path / 'library.ndjson')
+
+    def records():
+        yield 'first', b'data', []
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        macro_library.write_library(path, records(), 2)
+    assert not os.path.exists(path)
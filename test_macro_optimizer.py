@@ -0,0 +1,15 @@
+import pytest
+from compiled_macro import CompiledMacro
+from macro_optimizer import MacroOptimizer
+
+
+def test_max_gap_keeps_holds():
+    macro = CompiledMacro.from_actions([('W', 0.0, 5.0), ('A', 10.0, 0.1)])
+    optimized = MacroOptimizer(max_gap=0.25).optimize(macro)
+    assert list(optimized.times) == pytest.approx([0.0, 5.0, 5.25, 5.35])
+
+
+def test_min_spacing_applies_to_every_gap():
+    macro = CompiledMacro.from_actions([('A', 0.0, 0.0), ('B', 0.0, 0.0)])
+    optimized = MacroOptimizer(min_spacing=0.01).optimize(macro)
+    assert list(optimized.times) == pytest.approx([0.0, 0.01, 0.02, 0.03])
@@ -0,0 +1,121 @@
+import threading
+import time
+import pytest
+from compiled_macro import CompiledMacro
+from input_backends import RecordingInjectionBackend
+from playback_engine import PlaybackEngine
+
+STOP_BOUND = 0.001  # cancel() must return within a millisecond of the stop request
+
+
+class Watcher:
+    def __init__(self):
+        self.finished = {}
+        self._done = threading.Condition()
+
+    def job_started(self, job_id, name):
+        pass
+
+    def job_progress(self, job_id, done, total):
+        pass
+
+    def job_paused(self, job_id, paused):
+        pass
+
+    def timing_updated(self, job_id, summary):
+        pass
+
+    def job_finished(self, job_id, reason):
+        with self._done:
+            self.finished[job_id] = reason
+            self._done.notify_all()
+
+    def wait(self, job_id, timeout=5.0):
+        with self._done:
+            self._done.wait_for(lambda: job_id in self.finished, timeout)
+        return self.finished.get(job_id)
+
+
+@pytest.fixture
+def injector():
+    return RecordingInjectionBackend()
+
+
+@pytest.fixture
+def watcher():
+    return Watcher()
+
+
+@pytest.fixture
+def engine(injector, watcher):
+    engine = PlaybackEngine(injector, watcher)
+    engine.start()
+    yield engine
+    engine.shutdown()
+
+
+def keys_down(sent):
+    down = set()
+    for vk_code, is_down, _ in sent:
+        if isinstance(vk_code, int):
+            (down.add if is_down else down.discard)(vk_code)
+    return down
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_cancel_returns_within_bound(engine, injector, watcher):
+    macro = CompiledMacro.from_actions((0x41 + i % 26, i * 0.001, 0.008) for i in range(2000))
+    latencies = []
+    for _ in range(20):
+        injector.sent.clear()
+        job_id = engine.submit(macro)
+        wait_for(lambda: len(injector.sent) > 20)
+        requested = time.perf_counter()
+        assert engine.cancel(job_id)
+        halted = time.perf_counter()
+        latencies.append(halted - requested)
+        assert watcher.wait(job_id) == 'cancelled'
+        assert not [event for event in injector.sent if event[1] is True and event[2] > halted]
+    latencies.sort()
+    assert latencies[len(latencies) // 2] < STOP_BOUND
+
+
+def test_cancel_releases_held_keys(engine, injector, watcher):
+    macro = CompiledMacro.from_actions([('Ctrl', 0.0, 10.0), ('Shift', 0.0, 10.0), ('A', 0.01, 10.0)])
+    job_id = engine.submit(macro)
+    wait_for(lambda: len(keys_down(injector.sent)) == 3)
+    engine.cancel(job_id)
+    assert keys_down(injector.sent) == set()
+    assert engine.key_holders == {}
+    assert not engine.is_active(job_id)
+
+
+def test_pause_releases_and_resume_represses_keys(engine, injector):
+    macro = CompiledMacro.from_actions([('A', 0.0, 10.0)])
+    job_id = engine.submit(macro)
+    wait_for(lambda: keys_down(injector.sent) == {0x41})
+    assert engine.pause(job_id)
+    assert keys_down(injector.sent) == set()
+    assert engine.resume(job_id)
+    assert keys_down(injector.sent) == {0x41}
+    engine.cancel(job_id)
+
+
+def test_pause_shifts_remaining_deadlines(engine, injector, watcher):
+    gap, paused_for = 0.1, 0.15
+    macro = CompiledMacro.from_actions([('A', 0.0, 0.01), ('B', gap, 0.01)])
+    job_id = engine.submit(macro)
+    wait_for(lambda: injector.sent)
+    first_sent = injector.sent[0][2]
+    engine.pause(job_id)
+    time.sleep(paused_for)
+    engine.resume(job_id)
+    assert watcher.wait(job_id) == 'completed'
+    b_down = next(sent_at for vk_code, is_down, sent_at in injector.sent if vk_code == 0x42 and is_down)
+    assert b_down - first_sent == pytest.approx(gap + paused_for, abs=0.02)
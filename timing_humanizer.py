@@ -0,0 +1,86 @@
+import random
+from array import array
+from itertools import accumulate
+from statistics import median
+from compiled_macro import CompiledMacro, KEY_DOWN
+
+DISTRIBUTIONS = ('uniform', 'gaussian', 'lognormal', 'fitted')
+MIN_FACTOR = 0.05  # A jittered gap never shrinks below 5% of its recorded length
+FIT_WINDOW = 3  # Neighbours on each side used as the local tempo when fitting a profile
+MAX_FIT_RATIO = 3.0  # Longer pauses in a recording are hesitation, not timing variance
+
+
+class TimingHumanizer:
+    """Seeded timing jitter applied to a whole macro at once.
+
+    Every gap between consecutive timeline events is multiplied by a
+    positive factor, so event order is always preserved. All factors for
+    one pass are drawn in a single batch before playback starts, so the
+    playback loop itself does no random number generation.
+
+    amount is the spread: uniform draws within ±amount, gaussian and
+    lognormal use amount / 2 as the standard deviation. The fitted
+    distribution resamples the relative timing deviations measured in a
+    real recording and ignores amount.
+    """
+
+    def __init__(self, distribution='uniform', amount=0.2, seed=None, profile=None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution: {distribution}")
+        if distribution == 'fitted' and not profile:
+            raise ValueError("The fitted distribution needs a profile, see fit_profile()")
+        self.distribution = distribution
+        self.amount = amount
+        self.seed = seed
+        self.profile = profile
+        self.rng = random.Random(seed)
+
+    def reset(self):
+        self.rng.seed(self.seed)
+
+    def factors(self, count):
+        rng = self.rng
+        if self.distribution == 'uniform':
+            factors = [1.0 + rng.uniform(-self.amount, self.amount) for _ in range(count)]
+        elif self.distribution == 'gaussian':
+            sigma = self.amount / 2
+            factors = [rng.gauss(1.0, sigma) for _ in range(count)]
+        elif self.distribution == 'lognormal':
+            sigma = self.amount / 2
+            factors = [rng.lognormvariate(-sigma * sigma / 2, sigma) for _ in range(count)]  # Mean 1
+        else:
+            factors = rng.choices(self.profile, k=count)
+        return [factor if factor > MIN_FACTOR else MIN_FACTOR for factor in factors]
+
+    def apply(self, macro):
+        macro = CompiledMacro.from_actions(macro)
+        if not macro:
+            return macro
+        gaps = [b - a for a, b in zip([0.0] + list(macro.times), macro.times)]
+        times = array('d', accumulate(gap * factor for gap, factor in zip(gaps, self.factors(len(gaps)))))
+        return CompiledMacro(array('B', macro.vk_codes), array('B', macro.kinds), times,
+                             array('i', macro.xs), array('i', macro.ys))
+
+    def __repr__(self):
+        return f"TimingHumanizer({self.distribution}, amount={self.amount}, seed={self.seed})"
+
+
+def fit_profile(macro, min_samples=8):
+    """Measure how a real recording deviates from its own local tempo.
+
+    Returns the ratios of each inter-press gap and hold duration to the
+    median of its neighbours, for use as a fitted TimingHumanizer profile.
+    """
+    macro = CompiledMacro.from_actions(macro)
+    presses = [event_time for event_time, kind in zip(macro.times, macro.kinds) if kind == KEY_DOWN]
+    gaps = [b - a for a, b in zip(presses, presses[1:])]
+    holds = [action.duration for action in macro.to_actions()]
+    profile = []
+    for values in (gaps, holds):
+        for i, value in enumerate(values):
+            local = median(values[max(0, i - FIT_WINDOW):i + FIT_WINDOW + 1])
+            if local > 0:
+                profile.append(min(value / local, MAX_FIT_RATIO))
+    if len(profile) < min_samples:
+        raise ValueError(f"Recording is too short to fit a timing profile ({len(profile)} samples)")
+    return profile
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import zipfile
+import psutil
+
+CONFIG_NAME = 'update_config.json'
+STAGING_DIR = '.update_staging'
+BUFFER_SIZE = 1024 * 1024
+REPLACE_TIMEOUT = 10.0  # How long a file still held open by the exiting app is retried
+EXIT_TIMEOUT = 30.0  # How long the updater waits for the app to exit
+
+
+class UpdateApplyError(Exception):
+    pass
+
+
+def parent_process():
+    """The process that started this one, or None if it has already gone (its PID may have been reused)."""
+    try:
+        current = psutil.Process()
+        parent = psutil.Process(os.getppid())
+        return parent if parent.create_time() <= current.create_time() else None
+    except psutil.Error:
+        return None
+
+
+def wait_for_exit(process, timeout=EXIT_TIMEOUT):
+    """Block until process (a psutil.Process) has exited; returns False on timeout."""
+    try:
+        process.wait(timeout)
+    except psutil.NoSuchProcess:
+        pass
+    except psutil.TimeoutExpired:
+        return False
+    return True
+
+
+def replace(src, dest, timeout=REPLACE_TIMEOUT):
+    """os.replace, retried for a while if Windows still has dest open."""
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        try:
+            os.replace(src, dest)
+            return
+        except PermissionError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+
+class FileSwap:
+    """Moves staged files into place as one unit.
+
+    Each destination is renamed to a .bak before its replacement is
+    renamed in, so every step is an atomic rename on one volume.
+    rollback() puts every original back; commit() deletes the backups.
+    """
+
+    def __init__(self):
+        self.installed = []
+
+    def install(self, staged_path, dest):
+        backup = None
+        if os.path.exists(dest):
+            backup = dest + '.bak'
+            replace(dest, backup)
+        try:
+            replace(staged_path, dest)
+        except OSError:
+            if backup:
+                os.replace(backup, dest)
+            raise
+        self.installed.append((dest, backup))
+
+    def rollback(self):
+        for dest, backup in reversed(self.installed):
+            try:
+                if backup:
+                    replace(backup, dest)
+                else:
+                    os.remove(dest)
+            except OSError as e:
+                print(f"Error restoring {dest}: {str(e)}")
+        self.installed = []
+
+    def commit(self):
+        for _, backup in self.installed:
+            if backup:
+                try:
+                    os.remove(backup)
+                except OSError:
+                    pass  # Still in use, e.g. the running executable; overwritten by the next update
+        self.installed = []
+
+
+def _stage(archive, name, path):
+    sha256 = hashlib.sha256()
+    with archive.open(name) as src, open(path, 'wb') as dst:  # The archive checks each entry's CRC as it is read
+        for chunk in iter(lambda: src.read(BUFFER_SIZE), b""):
+            sha256.update(chunk)
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    return sha256.hexdigest()
+
+
+def apply_package(zip_path, install_dir='.'):
+    """Install an update.zip built by the release workflow; returns its update_config.
+
+    Each file is streamed straight from the archive into a staging
+    directory inside install_dir (so the final renames stay on one
+    volume) and hashed on the way; a "sha256" listed for it in
+    update_config.json must match. Only once everything is staged are
+    the files swapped in. If a swap or the post-update script fails,
+    every file already replaced is restored, so the install is never
+    left half updated.
+    """
+    staging = os.path.join(install_dir, STAGING_DIR)
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    swap = FileSwap()
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            config = json.loads(archive.read(CONFIG_NAME))
+            staged = []
+            for i, file_update in enumerate(config['file_updates']):
+                staged_path = os.path.join(staging, str(i))
+                digest = _stage(archive, file_update['src'], staged_path)
+                expected = file_update.get('sha256')
+                if expected and digest != expected.lower():
+                    raise UpdateApplyError(f"{file_update['src']} is corrupt: SHA-256 {digest}, expected {expected}")
+                staged.append((staged_path, os.path.join(install_dir, file_update['dest'])))
+            script = config.get('post_update_script')
+            if script:
+                script_path = os.path.join(staging, os.path.basename(script))
+                _stage(archive, script, script_path)
+        for staged_path, dest in staged:
+            os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+            swap.install(staged_path, dest)
+        if script:
+            subprocess.run([sys.executable, script_path], check=True)
+        swap.commit()
+    except Exception:
+        swap.rollback()
+        raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return config
@@ -0,0 +1,141 @@
+import json
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+CHECK_INTERVAL = 3600  # Seconds between background update checks
+RETRY_DELAY = 60  # First retry after a failed check; doubles with each further failure
+MAX_BACKOFF = 6 * 3600
+REQUEST_TIMEOUT = (5, 15)  # Connect and read timeouts in seconds
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def compare_versions(version1, version2):
+    """True if version1 is newer than version2, e.g. "1.0.10" over "1.0.9"."""
+    v1_parts = [int(part) for part in version1.split('.')]
+    v2_parts = [int(part) for part in version2.split('.')]
+    return v1_parts > v2_parts
+
+
+def get_session():
+    """The app-wide requests session, so update checks and downloads reuse pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session.headers['User-Agent'] = 'dark_macro_tool'
+        return _session
+
+
+class RateLimited(requests.RequestException):
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limited by the update server, retrying in {round(retry_after)} s")
+        self.retry_after = retry_after
+
+
+class UpdateChecker:
+    """Looks up the latest GitHub release with conditional requests.
+
+    The release JSON and its ETag are cached in cache_path, so a check
+    that finds nothing new is a bodiless 304 (which GitHub does not count
+    against the rate limit), even across restarts. Rate-limit responses
+    set retry_at from Retry-After or X-RateLimit-Reset; other failures
+    back off exponentially through next_delay().
+    """
+
+    def __init__(self, current_version, github_repo, cache_path=None, session=None, api_url=None):
+        self.current_version = current_version
+        self.api_url = api_url or f"https://api.github.com/repos/{github_repo}/releases/latest"
+        self.cache_path = cache_path
+        self.session = session or get_session()
+        self.etag = None
+        self.release = None
+        self.failures = 0
+        self.retry_at = 0.0
+        self.load_cache()
+
+    def load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+            if cache.get('url') == self.api_url:
+                self.etag, self.release = cache.get('etag'), cache.get('release')
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable release cache: {str(e)}")
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        temp_path = self.cache_path + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({'url': self.api_url, 'etag': self.etag, 'release': self.release}, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Error saving release cache: {str(e)}")
+
+    def check(self):
+        """Return (is_newer, release); raises requests.RequestException (RateLimited while backing off)."""
+        now = time.time()
+        if now < self.retry_at:
+            raise RateLimited(self.retry_at - now)
+        headers = {'Accept': 'application/vnd.github+json'}
+        if self.etag and self.release:
+            headers['If-None-Match'] = self.etag
+        try:
+            response = self.session.get(self.api_url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 304:
+                release = self.release
+            else:
+                retry_after = self._rate_limit_delay(response)
+                if retry_after is not None:
+                    self.retry_at = time.time() + retry_after
+                    raise RateLimited(retry_after)
+                response.raise_for_status()
+                release = response.json()
+                self.etag, self.release = response.headers.get('ETag'), release
+                self.save_cache()
+            latest_version = release['tag_name'].lstrip('v')
+        except (KeyError, TypeError, ValueError) as e:
+            self.failures += 1
+            raise requests.RequestException(f"Unexpected release data: {str(e)}")
+        except requests.RequestException:
+            self.failures += 1
+            raise
+        self.failures = 0
+        return compare_versions(latest_version, self.current_version), release
+
+    def next_delay(self, interval=CHECK_INTERVAL):
+        """Seconds until the next background check should run."""
+        wait = self.retry_at - time.time()
+        if wait > 0:
+            return wait
+        if not self.failures:
+            return interval
+        return min(MAX_BACKOFF, RETRY_DELAY * 2 ** (self.failures - 1)) * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def _rate_limit_delay(response):
+        if response.status_code not in (403, 429):
+            return None
+        if 'Retry-After' in response.headers:
+            try:
+                return max(1.0, float(response.headers['Retry-After']))
+            except ValueError:
+                return RETRY_DELAY
+        if response.headers.get('X-RateLimit-Remaining') == '0':
+            try:
+                return max(1.0, float(response.headers['X-RateLimit-Reset']) - time.time())
+            except (KeyError, ValueError):
+                return RETRY_DELAY
+        return None
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import time
+import requests
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+from update_checker import get_session, REQUEST_TIMEOUT
+from binary_delta import apply_delta, file_sha256, DeltaError
+
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+FIRST_CHUNK = 64 * 1024
+FAST_READ = 0.05  # A read quicker than this doubles the chunk size, one slower than SLOW_READ halves it
+SLOW_READ = 0.25
+PROGRESS_INTERVAL = 0.1  # Minimum seconds between progress callbacks
+RETRIES = 3
+
+
+class DownloadCancelled(Exception):
+    pass
+
+
+class ChecksumMismatch(Exception):
+    def __init__(self, expected, actual):
+        super().__init__(f"Downloaded file is corrupt: SHA-256 {actual}, expected {expected}")
+        self.expected = expected
+        self.actual = actual
+
+
+EXE_ASSET = 'dark_macro_tool.exe'
+MANIFEST_ASSET = 'version.json'
+
+
+def release_asset(release, name):
+    return next((asset for asset in release.get('assets', []) if asset.get('name') == name), None)
+
+
+def release_sha256(release, asset=None):
+    """SHA-256 of a release asset as published by GitHub ("digest": "sha256:..."), or None."""
+    assets = [asset] if asset else release.get('assets', [])[:1]
+    for item in assets:
+        digest = item.get('digest') or ''
+        if digest.startswith('sha256:'):
+            return digest[len('sha256:'):]
+    return None
+
+
+class Download:
+    """Fetches url to path, resuming and verifying as it goes.
+
+    Data is written to path + '.part'. If a download is interrupted, the
+    next attempt (in this run or a later one) asks only for the missing
+    bytes with an HTTP Range request, guarded by If-Range so a changed
+    file on the server restarts from zero instead of being spliced. The
+    SHA-256 is computed while the data streams in and checked against
+    sha256 before the file is moved into place; a mismatch deletes it.
+    Reads grow from FIRST_CHUNK towards MAX_CHUNK while the network keeps
+    up and shrink when it doesn't. progress(done, total) is called at
+    most every PROGRESS_INTERVAL seconds, plus once at the end.
+    """
+
+    def __init__(self, url, path, sha256=None, session=None, progress=None, is_cancelled=None, retries=RETRIES):
+        self.url = url
+        self.path = path
+        self.part_path = path + '.part'
+        self.meta_path = path + '.part.json'
+        self.sha256 = sha256.lower() if sha256 else None
+        self.session = session or get_session()
+        self.progress = progress
+        self.is_cancelled = is_cancelled
+        self.retries = retries
+        self.chunk_size = FIRST_CHUNK
+        self.total = 0
+        self.done = 0
+        self.received = 0  # Bytes actually transferred in this run
+        self.resumed_from = 0
+        self.last_progress = 0.0
+
+    def run(self):
+        """Download and verify; returns path. Raises requests.RequestException, ChecksumMismatch or DownloadCancelled."""
+        attempt = 0
+        while True:
+            try:
+                digest = self._fetch()
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise
+                print(f"Download interrupted ({str(e)}), resuming in {attempt} s")
+                time.sleep(attempt)
+        if self.sha256 and digest != self.sha256:
+            self.discard()
+            raise ChecksumMismatch(self.sha256, digest)
+        os.replace(self.part_path, self.path)
+        self._remove(self.meta_path)
+        self._report(final=True)
+        return self.path
+
+    def discard(self):
+        self._remove(self.part_path)
+        self._remove(self.meta_path)
+
+    def _fetch(self):
+        sha256 = hashlib.sha256()
+        headers = {}
+        validator = self._load_validator()
+        offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        if offset and validator:
+            headers['Range'] = f"bytes={offset}-"
+            headers['If-Range'] = validator
+        with self.session.get(self.url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            if response.status_code == 416 and offset:
+                self.discard()  # The partial file is longer than the artifact
+                return self._fetch()
+            response.raise_for_status()
+            if response.status_code == 206:
+                self.resumed_from = offset
+                with open(self.part_path, 'rb') as f:  # Hash the part we already have
+                    for chunk in iter(lambda: f.read(MAX_CHUNK), b""):
+                        sha256.update(chunk)
+                mode = 'ab'
+            else:
+                offset = 0
+                mode = 'wb'
+            self._save_validator(response.headers.get('ETag') or response.headers.get('Last-Modified'))
+            length = int(response.headers.get('content-length', 0))
+            self.total = offset + length if length else 0
+            self.done = offset
+            with open(self.part_path, mode) as f:
+                while True:
+                    if self.is_cancelled and self.is_cancelled():
+                        raise DownloadCancelled("Download cancelled")
+                    started = time.perf_counter()
+                    try:
+                        data = response.raw.read(self.chunk_size, decode_content=True)
+                    except (ProtocolError, ReadTimeoutError) as e:
+                        raise requests.ConnectionError(e)
+                    if not data:
+                        break
+                    self._adapt(time.perf_counter() - started, len(data))
+                    f.write(data)
+                    sha256.update(data)
+                    self.done += len(data)
+                    self.received += len(data)
+                    self._report()
+        if self.total and self.done < self.total:
+            raise requests.exceptions.ChunkedEncodingError(f"Connection closed after {self.done} of {self.total} bytes")
+        return sha256.hexdigest()
+
+    def _adapt(self, elapsed, size):
+        if size < self.chunk_size:
+            return
+        if elapsed < FAST_READ:
+            self.chunk_size = min(MAX_CHUNK, self.chunk_size * 2)
+        elif elapsed > SLOW_READ:
+            self.chunk_size = max(MIN_CHUNK, self.chunk_size // 2)
+
+    def _report(self, final=False):
+        if not self.progress:
+            return
+        now = time.perf_counter()
+        if final or now - self.last_progress >= PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.progress(self.done, self.total)
+
+    def _load_validator(self):
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            return meta.get('validator') if meta.get('url') == self.url else None
+        except (OSError, ValueError):
+            return None
+
+    def _save_validator(self, validator):
+        try:
+            with open(self.meta_path, 'w') as f:
+                json.dump({'url': self.url, 'validator': validator}, f)
+        except OSError as e:
+            print(f"Error saving download state: {str(e)}")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def download_file(url, path, sha256=None, progress=None, is_cancelled=None, session=None):
+    return Download(url, path, sha256, session, progress, is_cancelled).run()
+
+
+def fetch_update(download_url, path, sha256=None, manifest_url=None, installed_path=None, session=None,
+                 progress=None, is_cancelled=None):
+    """Fetch a new build to path, through a binary delta when one applies; returns 'delta' or 'full'.
+
+    The release manifest (releases/version.json) lists deltas by the
+    SHA-256 of the build they start from. If the installed file matches
+    one, only that delta is downloaded and the new build is rebuilt and
+    verified locally; if anything about that fails, the full build is
+    downloaded instead. Without a sha256 from the release, the manifest's
+    sha256 checks whichever way the build arrives.
+    """
+    session = session or get_session()
+    manifest = {}
+    if manifest_url:
+        try:
+            manifest = _fetch_manifest(manifest_url, session)
+        except (requests.RequestException, ValueError) as e:
+            print(f"Could not read the release manifest ({str(e)})")
+    sha256 = sha256 or manifest.get('sha256')
+    if manifest and installed_path:
+        try:
+            if _fetch_by_delta(path, sha256, manifest, installed_path, session, progress, is_cancelled):
+                return 'delta'
+        except DownloadCancelled:
+            raise
+        except (requests.RequestException, ChecksumMismatch, DeltaError, OSError, KeyError, TypeError, ValueError) as e:
+            print(f"Delta update failed ({str(e)}), downloading the full update")
+    Download(download_url, path, sha256, session, progress, is_cancelled).run()
+    return 'full'
+
+
+def _fetch_manifest(manifest_url, session):
+    response = session.get(manifest_url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    manifest = response.json()
+    if not isinstance(manifest, dict):
+        raise ValueError("manifest is not a JSON object")
+    return manifest
+
+
+def _fetch_by_delta(path, sha256, manifest, installed_path, session, progress, is_cancelled):
+    installed_sha256 = file_sha256(installed_path)
+    delta = next((delta for delta in manifest.get('deltas', []) if delta['from_sha256'] == installed_sha256), None)
+    if delta is None:
+        return False
+    delta_path = path + '.delta'
+    Download(delta['url'], delta_path, delta.get('sha256'), session, progress, is_cancelled).run()
+    try:
+        with open(delta_path, 'rb') as f:
+            rebuilt_sha256 = apply_delta(installed_path, f.read(), path)
+    finally:
+        os.remove(delta_path)
+    if sha256 and rebuilt_sha256 != sha256.lower():
+        os.remove(path)
+        raise ChecksumMismatch(sha256, rebuilt_sha256)
+    return True
@@ -0,0 +1,62 @@
+import threading
+import requests
+from PySide6.QtCore import QObject, QTimer, Signal
+from update_checker import CHECK_INTERVAL, RateLimited
+
+
+class UpdateCheckService(QObject):
+    """Runs UpdateChecker off the GUI thread, hourly and on request.
+
+    Results arrive as signals on the GUI thread; `manual` tells a check
+    the user asked for apart from a background one. Background checks
+    are rescheduled with the checker's backoff after failures.
+    """
+
+    update_available = Signal(str, object, bool)  # version, release JSON, manual
+    up_to_date = Signal(str, bool)                # latest version, manual
+    check_failed = Signal(str, bool)              # error message, manual
+    _check_done = Signal()
+
+    def __init__(self, checker, interval=CHECK_INTERVAL, parent=None):
+        super().__init__(parent)
+        self.checker = checker
+        self.interval = interval
+        self.thread = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(lambda: self.check_now(manual=False))
+        self._check_done.connect(self._schedule)
+
+    def start(self):
+        self._schedule()
+
+    def stop(self):
+        self.timer.stop()
+
+    def check_now(self, manual=True):
+        """Start a check unless one is already running; returns immediately."""
+        if self.thread and self.thread.is_alive():
+            return False
+        self.timer.stop()
+        self.thread = threading.Thread(target=self._run, args=(manual,), name='UpdateCheck', daemon=True)
+        self.thread.start()
+        return True
+
+    def _run(self, manual):
+        try:
+            is_newer, release = self.checker.check()
+            version = release['tag_name'].lstrip('v')
+            if is_newer:
+                self.update_available.emit(version, release, manual)
+            else:
+                self.up_to_date.emit(version, manual)
+        except RateLimited as e:
+            self.check_failed.emit(str(e), manual)
+        except requests.RequestException as e:
+            print(f"Error checking for updates: {e}")
+            self.check_failed.emit(str(e), manual)
+        finally:
+            self._check_done.emit()
+
+    def _schedule(self):
+        self.timer.start(round(self.checker.next_delay(self.interval) * 1000))
@@ -1,56 +1,61 @@
 import sys
 import os
 import requests
-import time
 import subprocess
 from PySide6.QtWidgets import QApplication, QProgressDialog
 from PySide6.QtCore import Qt, QThread, Signal
+from update_download import fetch_update, ChecksumMismatch, DownloadCancelled
+from update_apply import FileSwap, parent_process, wait_for_exit
 
 class DownloadThread(QThread):
     progress = Signal(int)
     finished = Signal(bool)
 
-    def __init__(self, url, path):
+    def __init__(self, url, path, sha256=None, manifest_url=None, installed_path=None):
         super().__init__()
         self.url = url
         self.path = path
+        self.sha256 = sha256
+        self.manifest_url = manifest_url
+        self.installed_path = installed_path
 
     def run(self):
         try:
-            response = requests.get(self.url, stream=True)
-            total_size = int(response.headers.get('content-length', 0))
-            block_size = 1024
-            wrote = 0
-
-            with open(self.path, 'wb') as f:
-                for data in response.iter_content(block_size):
-                    wrote = wrote + len(data)
-                    f.write(data)
-                    if total_size > 0:
-                        self.progress.emit(int(wrote / total_size * 100))
-
+            method = fetch_update(self.url, self.path, self.sha256, self.manifest_url, self.installed_path,
+                                  progress=self.report_progress, is_cancelled=self.isInterruptionRequested)
+            print(f"Update downloaded ({method})")
             self.finished.emit(True)
-        except Exception:
+        except (requests.RequestException, ChecksumMismatch, DownloadCancelled, OSError) as e:
+            print(f"Download failed: {str(e)}")
             self.finished.emit(False)
 
+    def report_progress(self, done, total):
+        if total > 0:
+            self.progress.emit(int(done / total * 100))
+
 class Updater(QApplication):
     def __init__(self, args):
         super().__init__(args)
         
         if len(args) < 3:
-            print("Usage: updater.exe <download_url> <current_exe_path>")
+            print("Usage: updater.exe <download_url> <current_exe_path> [sha256] [manifest_url]")
             sys.exit(1)
 
+        self.app_process = parent_process()  # Taken now, while the app that launched us is still running
         self.download_url = args[1]
         self.current_exe_path = args[2]
         self.new_exe_path = self.current_exe_path + ".new"
+        self.sha256 = args[3] if len(args) > 3 and args[3] else None
+        self.manifest_url = args[4] if len(args) > 4 and args[4] else None
 
         self.progress_dialog = QProgressDialog("Downloading update...", "Cancel", 0, 100)
         self.progress_dialog.setWindowModality(Qt.WindowModal)
         self.progress_dialog.setWindowTitle("Updating")
         
-        self.download_thread = DownloadThread(self.download_url, self.new_exe_path)
+        self.download_thread = DownloadThread(self.download_url, self.new_exe_path, self.sha256, self.manifest_url,
+                                              self.current_exe_path)
         self.download_thread.progress.connect(self.progress_dialog.setValue)
+        self.progress_dialog.canceled.connect(self.download_thread.requestInterruption)
         self.download_thread.finished.connect(self.on_download_finished)
         
         self.download_thread.start()
@@ -67,14 +72,20 @@ class Updater(QApplication):
     def replace_and_restart(self):
         try:
             # Wait for the original process to exit
-            time.sleep(2)
-            
-            # Replace the old executable with the new one
-            os.replace(self.new_exe_path, self.current_exe_path)
-            
-            # Start the new version
-            subprocess.Popen([self.current_exe_path])
-            
+            if self.app_process and not wait_for_exit(self.app_process):
+                print("The application is still running, update not applied")
+                sys.exit(1)
+
+            # Replace the old executable with the new one, keeping the old one until the new one has started
+            swap = FileSwap()
+            swap.install(self.new_exe_path, self.current_exe_path)
+            try:
+                subprocess.Popen([self.current_exe_path])
+            except OSError:
+                swap.rollback()
+                raise
+            swap.commit()
+
             # Exit the updater
             sys.exit(0)
         except Exception as e:
@@ -0,0 +1,63 @@
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt, QThread, Signal
+from window_targeting import window_titles, NO_APP
+
+
+class WindowTitleModel(QAbstractListModel):
+    """Combo box model of window titles that grows as batches arrive.
+
+    The first row is always the "no target" placeholder. Titles are
+    deduplicated with a set, so appending a batch costs O(batch).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.titles = [NO_APP]
+        self.seen = {NO_APP}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.titles)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return self.titles[index.row()]
+        return None
+
+    def add_titles(self, titles):
+        new_titles = []
+        for title in titles:
+            if title and title not in self.seen:
+                self.seen.add(title)
+                new_titles.append(title)
+        if new_titles:
+            first = len(self.titles)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_titles) - 1)
+            self.titles.extend(new_titles)
+            self.endInsertRows()
+
+    def row_of(self, title):
+        try:
+            return self.titles.index(title)
+        except ValueError:
+            return -1
+
+
+class WindowEnumerator(QThread):
+    """Lists window titles off the GUI thread, emitting them in batches."""
+
+    batch_ready = Signal(list)
+
+    def __init__(self, batch_size=50, max_age=None, parent=None):
+        super().__init__(parent)
+        self.batch_size = batch_size
+        self.max_age = max_age
+
+    def run(self):
+        try:
+            titles = window_titles.get(self.max_age)
+        except Exception as e:
+            print(f"Error listing windows: {str(e)}")
+            return
+        for start in range(0, len(titles), self.batch_size):
+            if self.isInterruptionRequested():
+                return
+            self.batch_ready.emit(titles[start:start + self.batch_size])
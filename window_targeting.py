@@ -0,0 +1,218 @@
+import threading
+import time
+
+NO_APP = "Select an app (optional)"  # Target selector entry meaning "inject globally"
+
+FOREGROUND_TIMEOUT = 0.5  # Longest wait for a target window to come to the front
+POLL_INTERVAL = 0.005  # How often the foreground window is checked while waiting
+
+
+class WindowBackend:
+    """Access to top-level windows, identified by opaque handles."""
+
+    def find_windows(self, title):
+        """Handles of visible windows whose title contains `title`, in Z order."""
+        raise NotImplementedError
+
+    def is_window(self, handle):
+        raise NotImplementedError
+
+    def get_title(self, handle):
+        raise NotImplementedError
+
+    def activate(self, handle):
+        raise NotImplementedError
+
+    def foreground(self):
+        raise NotImplementedError
+
+    def list_titles(self):
+        raise NotImplementedError
+
+
+class Win32WindowBackend(WindowBackend):
+    def __init__(self):
+        import win32gui
+        import win32con
+        self._win32gui = win32gui
+        self._restore = win32con.SW_RESTORE
+
+    def _visible_windows(self):
+        windows = []
+
+        def collect(handle, _):
+            if self._win32gui.IsWindowVisible(handle):
+                title = self._win32gui.GetWindowText(handle)
+                if title:
+                    windows.append((handle, title))
+            return True
+
+        self._win32gui.EnumWindows(collect, None)
+        return windows
+
+    def find_windows(self, title):
+        return [handle for handle, window_title in self._visible_windows() if title in window_title]
+
+    def is_window(self, handle):
+        return bool(self._win32gui.IsWindow(handle))
+
+    def get_title(self, handle):
+        return self._win32gui.GetWindowText(handle)
+
+    def activate(self, handle):
+        if self._win32gui.IsIconic(handle):
+            self._win32gui.ShowWindow(handle, self._restore)
+        self._win32gui.SetForegroundWindow(handle)
+
+    def foreground(self):
+        return self._win32gui.GetForegroundWindow()
+
+    def list_titles(self):
+        return [title for _, title in self._visible_windows()]
+
+
+class FakeWindowBackend(WindowBackend):
+    """In-memory desktop for tests and benchmarks.
+
+    activate() makes a window foreground only after activation_delay
+    seconds, like a real window manager. Each full window scan takes
+    scan_delay seconds and is counted in `enumerations`.
+    """
+
+    def __init__(self, titles=(), activation_delay=0.0, scan_delay=0.0):
+        self.windows = {handle: title for handle, title in enumerate(titles, 1)}
+        self.activation_delay = activation_delay
+        self.scan_delay = scan_delay
+        self.enumerations = 0
+        self._foreground = None
+        self._pending = None
+
+    def open(self, title):
+        handle = max(self.windows, default=0) + 1
+        self.windows[handle] = title
+        return handle
+
+    def close(self, handle):
+        self.windows.pop(handle, None)
+        if self._foreground == handle:
+            self._foreground = None
+
+    def _scan(self):
+        self.enumerations += 1
+        if self.scan_delay:
+            time.sleep(self.scan_delay)
+
+    def find_windows(self, title):
+        self._scan()
+        return [handle for handle, window_title in self.windows.items() if title in window_title]
+
+    def is_window(self, handle):
+        return handle in self.windows
+
+    def get_title(self, handle):
+        return self.windows.get(handle, "")
+
+    def activate(self, handle):
+        self._pending = (handle, time.perf_counter() + self.activation_delay)
+
+    def foreground(self):
+        if self._pending and time.perf_counter() >= self._pending[1]:
+            self._foreground, self._pending = self._pending[0], None
+        return self._foreground if self._foreground in self.windows else None
+
+    def list_titles(self):
+        self._scan()
+        return list(self.windows.values())
+
+
+class WindowTargeter:
+    """Resolves and focuses a macro's target window.
+
+    The handle found for a title is cached and only re-resolved once the
+    window is closed or retitled. activate() never sleeps: it returns the
+    handle and whether the window is already in front, and callers poll
+    is_ready() until it is or FOREGROUND_TIMEOUT passes.
+    """
+
+    def __init__(self, backend=None, timeout=FOREGROUND_TIMEOUT, poll_interval=POLL_INTERVAL):
+        self._backend = backend
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.handles = {}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = Win32WindowBackend()
+        return self._backend
+
+    def resolve(self, title):
+        handle = self.handles.get(title)
+        if handle is not None and self.backend.is_window(handle) and title in self.backend.get_title(handle):
+            return handle
+        self.handles.pop(title, None)
+        windows = self.backend.find_windows(title)
+        if not windows:
+            return None
+        self.handles[title] = windows[0]
+        return windows[0]
+
+    def invalidate(self, title=None):
+        if title is None:
+            self.handles.clear()
+        else:
+            self.handles.pop(title, None)
+
+    def activate(self, title):
+        """Bring the window for title to the front; returns (handle, already_foreground)."""
+        handle = self.resolve(title)
+        if handle is None:
+            return None, False
+        if self.backend.foreground() == handle:
+            return handle, True
+        try:
+            self.backend.activate(handle)
+        except Exception as e:
+            print(f"Error activating '{title}': {str(e)}")
+            self.handles.pop(title, None)
+            return None, False
+        return handle, False
+
+    def is_ready(self, handle):
+        return self.backend.foreground() == handle
+
+
+class WindowTitleCache:
+    """Visible window titles, rescanned at most once per ttl seconds.
+
+    Thread-safe, so one instance can be shared by every part of the app
+    that lists windows.
+    """
+
+    def __init__(self, backend=None, ttl=2.0):
+        self._backend = backend
+        self.ttl = ttl
+        self.titles = None
+        self.scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = Win32WindowBackend()
+        return self._backend
+
+    def get(self, max_age=None):
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            if self.titles is None or time.monotonic() - self.scanned_at > max_age:
+                self.titles = self.backend.list_titles()
+                self.scanned_at = time.monotonic()
+            return self.titles
+
+    def invalidate(self):
+        with self._lock:
+            self.titles = None
+
+
+window_titles = WindowTitleCache()